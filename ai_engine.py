@@ -1,21 +1,46 @@
 import os
+import copy
 import json
+import time
+import asyncio
+import hashlib
+import threading
+import functools
 import traceback
-from dotenv import load_dotenv
-from typing import Annotated, TypedDict, List, Dict
+from collections import deque
+from typing import Annotated, TypedDict, List, Dict, Optional
 
-# 상위 디렉토리와 현재 디렉토리 모두에서 .env 검색
-load_dotenv()
-load_dotenv(os.path.join(os.path.dirname(__file__), "..", ".env"))
-from langgraph.graph import StateGraph, START, END
+# .env는 진입점(server.py/asgi.py)에서 한 번만 로드합니다.
+# langgraph와 langchain_google_genai는 무거우므로 실제로 쓰는 시점(build_graph/create_llm)에 import합니다.
 from langchain_core.messages import BaseMessage, HumanMessage, AIMessage
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.prompts import ChatPromptTemplate
-from game_engine import SECTOR_DATA # Legacy data for logic
+from game_engine import SECTOR_DATA, ENDING_KEY, MOVE_MSG, UNKNOWN_MSG, apply_rule, find_exit # Legacy data for logic
+from hint_solver import hint_solver, describe_step
+from keyword_matcher import SECTOR_MATCHERS
+from intent_resolver import intent_resolver
+from llm_pool import LLMClientPool
+from image_assets import image_assets
+from narrative_cache import NarrativeCache, narrative_fingerprint
+from llm_coalescer import SingleFlight, prompt_fingerprint
+from llm_scheduler import LLMScheduler, LLMBusy
+from llm_deadline import DeadlineRunner, LLMTimeout
+from request_profiler import span, traced
+from metrics import timed_node, record_llm_usage, observe_history, NODE_SECONDS, LLM_REQUESTS, LLM_PROVIDER_CALLS, ERRORS, INTENT_FALLBACKS
+
+# 세션별로 보관하는 대화 기록(링 버퍼)의 길이
+HISTORY_SIZE = int(os.environ.get("SESSION_HISTORY_SIZE", 20))
+# LLM 구현: "gemini" / "fake" (오프라인 부하 테스트용, fake_llm.py)
+LLM_BACKEND = os.environ.get("LLM_BACKEND", "gemini").lower()
+# /api/actions 한 번에 받을 수 있는 명령 수와, 배치 내레이션 프롬프트에 넣을 최근 결과 줄 수
+BATCH_MAX_COMMANDS = int(os.environ.get("BATCH_MAX_COMMANDS", 256))
+BATCH_NARRATIVE_LINES = 8
+# 턴 실행기: "direct" (logic -> narrative 직접 호출) / "langgraph" (컴파일된 StateGraph)
+PIPELINE_RUNNER = os.environ.get("PIPELINE_RUNNER", "direct").lower()
 
 # --- State Definition ---
 class GameState(TypedDict):
     messages: Annotated[List[BaseMessage], "The conversation history"]
+    command: str # 이번 턴의 플레이어 입력 (그래프에는 기록 대신 이것만 넘깁니다)
+    deadline: Optional[float] # 요청 마감 시각 (time.monotonic 기준, None이면 무제한)
     current_sector: int
     inventory: List[str]
     sector_states: Dict[str, str]
@@ -23,6 +48,9 @@ class GameState(TypedDict):
     last_action: str
     next_step: str # Determining which node to hit next
     api_key: str # User provided API key
+    log_seq: int # 마지막으로 부여한 로그 시퀀스 번호 (메시지 id에 기록)
+    ui_seq: int # 상태/이미지 블록이 마지막으로 바뀐 시점의 log_seq
+    ui_hash: str # 상태/이미지 블록의 지문
 
 # --- Persona Prompts ---
 INTENT_PROMPT = """너는 '디지털 감옥' 게임의 명령어 분석기다. 
@@ -45,8 +73,10 @@ HINT_PROMPT = """너는 플레이어의 비공식적인 도우미, [시스템 
 구역 설명: {location_desc}
 인벤토리: {inventory}
 구역 상태: {sector_states}
+해킹된 해답 로그: {solution}
 
-플레이어가 막힌 부분을 분석하여 다음 단계에 대한 힌트를 1문장으로 제시하라."""
+플레이어가 막힌 부분을 분석하여 다음 단계에 대한 힌트를 1문장으로 제시하라.
+해답 로그의 내용을 벗어나지 말되, 너의 말투로 바꾸어 전달하라."""
 
 SCENARIO_PROMPT = """너는 '디지털 감옥'의 시스템 관리자 AI, [시나리오 마스터]다. 
 세계를 감시하고 냉소적이며 차가운 말투를 사용한다. 
@@ -60,111 +90,340 @@ SCENARIO_PROMPT = """너는 '디지털 감옥'의 시스템 관리자 AI, [시
 
 위 정보를 바탕으로 플레이어에게 상황을 설명하라. 한국어로 대답하라."""
 
+# --- LLM Outcome ---
+class NodeCall:
+    """노드 하나의 LLM 호출 결과 처리. 동기/비동기 노드가 같은 것을 씁니다.
+
+    키가 없거나 캐시에 있으면 prompt가 None이고 text가 이미 정해져 있습니다.
+    아니면 호출자가 call_llm(또는 await acall_llm)의 결과로 succeeded(), 예외로 failed()를 부르며,
+    캐시 기록, busy/timeout 대체 문장, 지표 기록은 여기서 합니다.
+    """
+
+    __slots__ = ("node", "llm", "api_key", "deadline", "prompt", "text", "prefix", "fallback", "show_error", "cache", "cache_key")
+
+    def __init__(self, node, state, llm, prompt, fallback, prefix="", show_error=False, cache=None, cache_key=None):
+        self.node = node
+        self.llm = llm
+        self.api_key = state.get('api_key')
+        self.deadline = state.get('deadline')
+        self.prompt = None
+        self.text = fallback
+        self.prefix = prefix
+        self.fallback = fallback
+        self.show_error = show_error
+        self.cache = cache
+        self.cache_key = cache_key
+        if llm is None:
+            LLM_REQUESTS.inc(node, "no_key")
+            return
+        cached = cache.get(cache_key) if cache is not None else None
+        if cached is not None:
+            LLM_REQUESTS.inc(node, "cached")
+            self.text = cached
+            return
+        self.prompt = prompt()
+
+    def succeeded(self, response):
+        if self.cache is not None:
+            self.cache.add(self.cache_key, response.content)
+        LLM_REQUESTS.inc(self.node, "ok")
+        self.text = f"{self.prefix}{response.content}"
+
+    def failed(self, e):
+        if isinstance(e, (LLMBusy, LLMTimeout)):
+            # 대기 예산/마감 초과: 오류 없이 결정적인 대체 문장을 씁니다.
+            LLM_REQUESTS.inc(self.node, "busy" if isinstance(e, LLMBusy) else "timeout")
+            return
+        LLM_REQUESTS.inc(self.node, "error")
+        ERRORS.inc(f"{self.node}_node")
+        print(f"{self.node.upper()} NODE ERROR: {traceback.format_exc()}")
+        if self.show_error:
+            self.text = f"{self.fallback}\n(AI 오류: {str(e)})"
+
+    def messages(self):
+        return {"messages": [AIMessage(content=self.text)]}
+
+
 # --- AI Engine Class ---
 class DigitalPrisonAIEngine:
     def __init__(self):
-        # We don't initialize a global LLM anymore, we create it per-request if a key is provided
-        pass
+        # We don't initialize a global LLM anymore; clients are pooled per API key
+        self.llm_pool = LLMClientPool(self.create_llm)
+        # 같은 게임 문맥의 내레이션은 플레이어 간에 재사용합니다.
+        self.narrative_cache = NarrativeCache()
+        # 같은 프롬프트로 동시에 나가는 호출은 하나로 합칩니다.
+        self.coalescer = SingleFlight()
+        # API 키별 호출 속도 제한 (토큰 버킷 + 공정 대기열)
+        self.scheduler = LLMScheduler()
+        # 요청 마감 시각 안에서만 응답을 기다림 (선택적으로 헤지 요청)
+        self.deadlines = DeadlineRunner()
+
+    def create_llm(self, api_key: str):
+        if LLM_BACKEND == "fake":
+            from fake_llm import FakeChatModel
+            return FakeChatModel()
+        from langchain_google_genai import ChatGoogleGenerativeAI
+        # Reverting to 2.0-flash as it was working, intent node removal will handle the speed
+        return ChatGoogleGenerativeAI(model="gemini-2.0-flash", google_api_key=api_key)
 
     def get_llm(self, api_key: str):
         if not api_key:
             return None
-        # Reverting to 2.0-flash as it was working, intent node removal will handle the speed
-        return ChatGoogleGenerativeAI(model="gemini-2.0-flash", google_api_key=api_key)
+        return self.llm_pool.get(api_key)
+
+    def queue_budget(self, deadline):
+        # 스케줄러 대기도 요청의 남은 시간을 넘길 수 없습니다.
+        if deadline is None:
+            return None
+        return min(self.scheduler.budget, max(0.0, deadline - time.monotonic()))
+
+    def call_llm(self, llm, prompt, api_key, deadline=None):
+        """LLM 호출의 공통 경로.
+
+        동시에 진행 중인 같은 키·같은 프롬프트 호출과 성공한 결과를 공유하고, 실제 호출은 키별 스케줄러의 허가를 받아
+        deadline(monotonic)까지만 기다립니다. 허가를 받지 못하면 LLMBusy, 마감을 넘기면 LLMTimeout이 올라갑니다.
+        허가는 DeadlineRunner가 호출이 실제로 끝날 때 돌려주므로, 마감 뒤에도 진행 중인 호출은 허가를 쥐고 있습니다.
+        """
+        def run():
+            with span("llm.queue"):
+                self.scheduler.acquire(api_key, self.queue_budget(deadline))
+            with span("llm.invoke"):
+                return self.deadlines.call(
+                    lambda: self.invoke_llm(llm, prompt), deadline,
+                    hedge_permit=lambda: self.scheduler.try_acquire(api_key), release=self.scheduler.release)
+        with span("llm"):
+            return self.coalescer.call(prompt_fingerprint(prompt, api_key or ""), run, deadline)
+
+    async def acall_llm(self, llm, prompt, api_key, deadline=None):
+        async def run():
+            with span("llm.queue"):
+                await self.scheduler.aacquire(api_key, self.queue_budget(deadline))
+            with span("llm.invoke"):
+                return await self.deadlines.acall(
+                    lambda: self.ainvoke_llm(llm, prompt), deadline,
+                    hedge_permit=lambda: self.scheduler.try_acquire(api_key), release=self.scheduler.release)
+        with span("llm"):
+            return await self.coalescer.acall(prompt_fingerprint(prompt, api_key or ""), run, deadline)
+
+    def invoke_llm(self, llm, prompt):
+        """모델 호출 한 번. (합치기 뒤, 헤지 포함) 실제로 나간 호출과 토큰 수를 셉니다."""
+        LLM_PROVIDER_CALLS.inc()
+        response = llm.invoke(prompt)
+        record_llm_usage(response)
+        return response
+
+    async def ainvoke_llm(self, llm, prompt):
+        LLM_PROVIDER_CALLS.inc()
+        response = await llm.ainvoke(prompt)
+        record_llm_usage(response)
+        return response
 
     # --- Nodes ---
+    @timed_node("logic")
+    @traced("node.logic")
     def logic_node(self, state: GameState):
         """의도 또는 키워드를 기반으로 게임 규칙을 처리합니다."""
-        last_msg = state['messages'][-1].content if state['messages'] else ""
+        last_msg = state.get('command', '')
         current_sector = state['current_sector']
-        sector_info = SECTOR_DATA.get(current_sector, {})
-        
-        result = "무엇을 해야 할지 모르겠습니다."
-        new_inventory = list(state['inventory'])
-        new_sector_states = dict(state['sector_states'])
         unlocked = state.get('unlocked', False)
-        next_sector = current_sector
-
-        # logic processing
-        keywords = sector_info.get("keywords", {})
-        for key, data in keywords.items():
-            if key in last_msg:
-                if "get_item" in data:
-                    item = data["get_item"]
-                    if item not in new_inventory:
-                        new_inventory.append(item)
-                        result = data.get("msg", f"{item}을 획득했습니다.")
-                
-                if data.get("unlock"):
-                    unlocked = True
-                    result = data.get("msg", "탈출구가 열렸습니다.")
-                
-                if "next" in sector_info.get("exits", {}) and "이동" in last_msg and unlocked:
-                    next_sector = sector_info["exits"]["이동"]
-                    unlocked = False 
-                    result = "다음 구역으로 진입했습니다."
-                break
 
-        return {
-            "inventory": new_inventory,
-            "sector_states": new_sector_states,
-            "unlocked": unlocked,
-            "current_sector": next_sector,
-            "last_action": result
-        }
+        # 출구가 열려 있으면 이동 명령이 키워드보다 우선합니다.
+        next_sector = find_exit(current_sector, last_msg) if unlocked else None
+        if next_sector is not None:
+            return {
+                "inventory": list(state['inventory']),
+                "sector_states": dict(state['sector_states']),
+                "unlocked": False,
+                "current_sector": next_sector,
+                "last_action": MOVE_MSG
+            }
+
+        # logic processing: 우선순위 순 매칭, 가장 긴 키워드 우선
+        matcher = SECTOR_MATCHERS.get(current_sector)
+        key = matcher.best(last_msg) if matcher else None
+        if key is None and matcher:
+            # 키워드가 그대로 없으면 조사/동의어/오타를 로컬에서 풀어 봅니다. (LLM 호출 없음)
+            resolved = intent_resolver.resolve(current_sector, last_msg)
+            INTENT_FALLBACKS.inc("resolved" if resolved else "miss")
+            if resolved is not None:
+                word, confidence = resolved
+                # 구역 이동은 되돌릴 수 없으므로 오타 추정(신뢰도 < 1.0)으로는 움직이지 않습니다.
+                next_sector = find_exit(current_sector, word) if unlocked and confidence >= 1.0 else None
+                if next_sector is not None:
+                    return {
+                        "inventory": list(state['inventory']),
+                        "sector_states": dict(state['sector_states']),
+                        "unlocked": False,
+                        "current_sector": next_sector,
+                        "last_action": MOVE_MSG
+                    }
+                if word in matcher.keywords:
+                    key = word
+        if key is None:
+            return {
+                "inventory": list(state['inventory']),
+                "sector_states": dict(state['sector_states']),
+                "unlocked": unlocked,
+                "current_sector": current_sector,
+                "last_action": UNKNOWN_MSG
+            }
+        return apply_rule(current_sector, key, state['inventory'], state['sector_states'], unlocked)
+
+    def solve_hint(self, state: GameState):
+        """규칙 그래프 솔버 색인에서 다음 단계를 찾아 가이드 문장으로 돌려줍니다. (LLM 불필요)"""
+        step = hint_solver.next_step(state['current_sector'], state['inventory'], state['sector_states'], state.get('unlocked', False))
+        return describe_step(step, state['current_sector'], state['sector_states'].get(ENDING_KEY))
+
+    def build_hint_prompt(self, state: GameState, solution: str):
+        sector_info = SECTOR_DATA.get(state['current_sector'], {})
+        return HINT_PROMPT.format(
+            location_name=sector_info.get("name"),
+            location_desc=sector_info.get("desc"),
+            inventory=", ".join(state['inventory']),
+            sector_states=state['sector_states'],
+            solution=solution
+        )
+
+    def hint_call(self, state: GameState):
+        solution = self.solve_hint(state)
+        return NodeCall("hint", state, self.get_llm(state.get('api_key')), lambda: self.build_hint_prompt(state, solution),
+                        f"[GUIDE]: {solution}", prefix="[GUIDE]: ")
 
+    @timed_node("hint")
+    @traced("node.hint")
     def hint_node(self, state: GameState):
-        """동적 힌트를 생성합니다."""
-        current_sector = state['current_sector']
-        sector_info = SECTOR_DATA.get(current_sector, {})
-        api_key = state.get('api_key')
-        llm = self.get_llm(api_key)
-        
-        if llm:
+        """동적 힌트를 생성합니다. LLM은 솔버가 찾은 다음 단계를 다듬는 용도로만 씁니다."""
+        call = self.hint_call(state)
+        if call.prompt is not None:
             try:
-                prompt = HINT_PROMPT.format(
-                    location_name=sector_info.get("name"),
-                    location_desc=sector_info.get("desc"),
-                    inventory=", ".join(state['inventory']),
-                    sector_states=state['sector_states']
-                )
-                response = llm.invoke(prompt)
-                return {"messages": [AIMessage(content=f"[GUIDE]: {response.content}")]}
+                call.succeeded(self.call_llm(call.llm, call.prompt, call.api_key, call.deadline))
             except Exception as e:
-                print(f"HINT NODE ERROR: {traceback.format_exc()}")
-                return {"messages": [AIMessage(content=f"[GUIDE]: 연결 오류 - {str(e)}")]}
-        return {"messages": [AIMessage(content="[GUIDE]: API 키가 설정되지 않았습니다.")]}
+                call.failed(e)
+        return call.messages()
 
-    def narrative_node(self, state: GameState):
-        """페르소나 리스폰스 생성"""
-        current_sector = state['current_sector']
-        sector_info = SECTOR_DATA.get(current_sector, {})
-        api_key = state.get('api_key')
-        llm = self.get_llm(api_key)
-        
-        prompt = SCENARIO_PROMPT.format(
+    @timed_node("hint")
+    @traced("node.hint")
+    async def ahint_node(self, state: GameState):
+        """hint_node의 비동기 버전 (LLM 대기 중 이벤트 루프를 막지 않음)."""
+        call = self.hint_call(state)
+        if call.prompt is not None:
+            try:
+                call.succeeded(await self.acall_llm(call.llm, call.prompt, call.api_key, call.deadline))
+            except Exception as e:
+                call.failed(e)
+        return call.messages()
+
+    def build_narrative_prompt(self, state: GameState):
+        sector_info = SECTOR_DATA.get(state['current_sector'], {})
+        return SCENARIO_PROMPT.format(
             location_name=sector_info.get("name", "Unknown"),
             location_desc=sector_info.get("desc", ""),
             inventory=", ".join(state['inventory']),
             action_result=state['last_action']
         )
-        
-        if llm:
+
+    def narrative_cache_key(self, state: GameState):
+        sector_info = SECTOR_DATA.get(state['current_sector'], {})
+        return narrative_fingerprint(
+            sector_info.get("name", "Unknown"),
+            sector_info.get("desc", ""),
+            state['inventory'],
+            state['last_action']
+        )
+
+    def narrative_call(self, state: GameState):
+        llm = self.get_llm(state.get('api_key'))
+        return NodeCall("narrative", state, llm, lambda: self.build_narrative_prompt(state),
+                        f"[SYSTEM]: {state['last_action']}", show_error=True,
+                        cache=self.narrative_cache, cache_key=self.narrative_cache_key(state) if llm else None)
+
+    @timed_node("narrative")
+    @traced("node.narrative")
+    def narrative_node(self, state: GameState):
+        """페르소나 리스폰스 생성"""
+        call = self.narrative_call(state)
+        if call.prompt is not None:
             try:
-                response = llm.invoke(prompt)
-                return {"messages": [AIMessage(content=response.content)]}
+                call.succeeded(self.call_llm(call.llm, call.prompt, call.api_key, call.deadline))
             except Exception as e:
-                print(f"NARRATIVE NODE ERROR: {traceback.format_exc()}")
-                return {"messages": [AIMessage(content=f"[SYSTEM]: {state['last_action']}\n(AI 오류: {str(e)})")]}
-        else:
-            return {"messages": [AIMessage(content=f"[SYSTEM]: {state['last_action']}")]}
+                call.failed(e)
+        return call.messages()
+
+    @timed_node("narrative")
+    @traced("node.narrative")
+    async def anarrative_node(self, state: GameState):
+        """narrative_node의 비동기 버전."""
+        call = self.narrative_call(state)
+        if call.prompt is not None:
+            try:
+                call.succeeded(await self.acall_llm(call.llm, call.prompt, call.api_key, call.deadline))
+            except Exception as e:
+                call.failed(e)
+        return call.messages()
+
+    async def alogic_node(self, state: GameState):
+        # 순수 CPU 작업이므로 스레드 풀로 넘기지 않고 바로 실행합니다.
+        return self.logic_node(state)
+
+    def narrative_stream(self, state: GameState):
+        """narrative_node의 스트리밍 버전. 생성되는 대로 텍스트 조각을 yield합니다."""
+        api_key = state.get('api_key')
+        llm = self.get_llm(api_key)
+
+        if not llm:
+            LLM_REQUESTS.inc("narrative_stream", "no_key")
+            yield f"[SYSTEM]: {state['last_action']}"
+            return
+        cache_key = self.narrative_cache_key(state)
+        cached = self.narrative_cache.get(cache_key)
+        if cached is not None:
+            LLM_REQUESTS.inc("narrative_stream", "cached")
+            yield cached
+            return
+        deadline = state.get('deadline')
+        try:
+            self.scheduler.acquire(api_key, self.queue_budget(deadline))
+        except LLMBusy:
+            LLM_REQUESTS.inc("narrative_stream", "busy")
+            yield f"[SYSTEM]: {state['last_action']}"
+            return
+        parts = []
+        started = time.perf_counter()
+        prompt = self.build_narrative_prompt(state)
+        try:
+            LLM_PROVIDER_CALLS.inc()
+            # 조각 사이의 대기도 마감에 묶입니다. 허가는 제공자 스트림이 실제로 끝날 때 돌려줍니다.
+            for chunk in self.deadlines.stream(lambda: llm.stream(prompt), deadline, release=self.scheduler.release):
+                record_llm_usage(chunk)
+                if isinstance(chunk.content, str) and chunk.content:
+                    parts.append(chunk.content)
+                    yield chunk.content
+            self.narrative_cache.add(cache_key, "".join(parts))
+            LLM_REQUESTS.inc("narrative_stream", "ok")
+        except LLMTimeout:
+            LLM_REQUESTS.inc("narrative_stream", "timeout")
+            # 마감 초과: 받은 조각까지만 쓰고, 하나도 없으면 narrative_node처럼 시스템 문장으로 대체합니다.
+            if not parts:
+                yield f"[SYSTEM]: {state['last_action']}"
+        except Exception as e:
+            LLM_REQUESTS.inc("narrative_stream", "error")
+            ERRORS.inc("narrative_stream")
+            print(f"NARRATIVE STREAM ERROR: {traceback.format_exc()}")
+            prefix = "\n" if parts else f"[SYSTEM]: {state['last_action']}\n"
+            yield f"{prefix}(AI 오류: {str(e)})"
+        finally:
+            NODE_SECONDS.observe(time.perf_counter() - started, "narrative_stream")
 
     # --- Graph Building ---
     def build_graph(self):
+        from langgraph.graph import StateGraph, START, END
+        from langchain_core.runnables import RunnableLambda
+
         builder = StateGraph(GameState)
-        builder.add_node("logic", self.logic_node)
-        builder.add_node("narrative", self.narrative_node)
-        builder.add_node("hint", self.hint_node)
+        # 각 노드는 invoke용 동기 함수와 ainvoke용 비동기 함수를 함께 가집니다.
+        builder.add_node("logic", RunnableLambda(self.logic_node, afunc=self.alogic_node, name="logic"))
+        builder.add_node("narrative", RunnableLambda(self.narrative_node, afunc=self.anarrative_node, name="narrative"))
+        builder.add_node("hint", RunnableLambda(self.hint_node, afunc=self.ahint_node, name="hint"))
         
         builder.add_edge(START, "logic")
         builder.add_edge("logic", "narrative")
@@ -175,32 +434,182 @@ class DigitalPrisonAIEngine:
 
     def get_initial_state(self):
         return {
-            "messages": [AIMessage(content="[SYSTEM]: 시스템 재부팅 완료. 격리 구역 0에서 각성되었습니다. 탈출 경로를 탐색하십시오.")],
+            "messages": deque([AIMessage(content="[SYSTEM]: 시스템 재부팅 완료. 격리 구역 0에서 각성되었습니다. 탈출 경로를 탐색하십시오.", id="1")], maxlen=HISTORY_SIZE),
             "current_sector": 0,
             "inventory": [],
             "sector_states": {},
             "unlocked": False,
             "last_action": "게임이 시작되었습니다.",
             "next_step": "logic",
-            "api_key": ""
+            "api_key": "",
+            "log_seq": 1,
+            "ui_seq": 0,
+            "ui_hash": ""
         }
 
+# 그래프에 넘기는 게임 필드. 대화 기록은 세션에 두고 그래프로 복사하지 않습니다.
+TURN_FIELDS = ("current_sector", "inventory", "sector_states", "unlocked", "last_action", "api_key")
+
+class DirectPipeline:
+    """START -> logic -> narrative -> END 경로를 LangGraph 없이 실행하는 실행기.
+
+    ai_graph와 같은 invoke/ainvoke 인터페이스와 병합 규칙(노드 출력이 키 단위로 덮어씀)을 따릅니다.
+    """
+
+    def __init__(self, engine):
+        self.steps = [engine.logic_node, engine.narrative_node]
+        self.asteps = [engine.alogic_node, engine.anarrative_node]
+
+    def invoke(self, state):
+        state = dict(state)
+        for step in self.steps:
+            state.update(step(state))
+        return state
+
+    async def ainvoke(self, state):
+        state = dict(state)
+        for step in self.asteps:
+            state.update(await step(state))
+        return state
+
+
+def build_pipeline(engine, runner=PIPELINE_RUNNER):
+    if runner == "langgraph":
+        return engine.build_graph()
+    if runner != "direct":
+        print(f"WARNING: unknown PIPELINE_RUNNER '{runner}', using 'direct'")
+    return DirectPipeline(engine)
+
+
 # Singleton instance
+# 모듈 import 시점에 한 번만 만듭니다. gunicorn --preload에서는 마스터가 만들고 워커들이 copy-on-write로 공유합니다.
 ai_engine_instance = DigitalPrisonAIEngine()
-ai_graph = ai_engine_instance.build_graph()
+ai_graph = build_pipeline(ai_engine_instance)
+
+
+# --- UI Fragments ---
+@functools.lru_cache(maxsize=None)
+def sector_fragments(sector, image_key):
+    """(구역 이름, 이미지 블록). 구역과 이미지 키에만 달려 있으므로 한 번 만들어 모든 세션이 공유합니다.
+
+    돌려받은 dict는 공유 객체이니 고치지 마십시오. (구역 21개 x 이미지 키 몇 개라 캐시 크기는 작습니다)
+    """
+    sector_info = SECTOR_DATA.get(sector, {})
+    return sector_info.get("name", "Unknown"), {
+        "agent": "비주얼 일러스트레이터",
+        "content": sector_info.get("short_desc", sector_info.get("desc", "격리 구역 시각화 중...")),
+        "type": "image",
+        **image_assets.fields(image_key)
+    }
+
+
+def engine_error(name, e, agent="SYSTEM", label="CORE ENGINE ERROR"):
+    """세션 요청 처리 중 예외: 지표와 로그를 남기고 UI에 보낼 오류 로그를 돌려줍니다."""
+    ERRORS.inc(name)
+    print(f"{name.upper().replace('_', ' ')} ERROR: {traceback.format_exc()}")
+    return {
+        "logs": [{
+            "agent": agent,
+            "text": f"{label}: {str(e)}",
+            "type": "error"
+        }]
+    }
+
 
 class GameSessionManager:
     def __init__(self):
         self.state = ai_engine_instance.get_initial_state()
+        # 같은 세션에 대한 동시 요청을 직렬화합니다.
+        self.lock = threading.RLock()
+        # 비동기(ASGI) 모드에서 쓰는 세션 락
+        self.alock = asyncio.Lock()
+        # 공유 세션 백엔드에 기록된 상태의 버전 (SessionStore가 관리)
+        self.version = 0
+        # 마지막 저장 이후의 변경 기록. 다른 워커가 먼저 저장했으면 그 상태 위에 replay()로 다시 적용합니다.
+        self.journal = []
 
     def reset(self):
         self.state = ai_engine_instance.get_initial_state()
+        # 초기화는 이전 변경을 모두 덮으므로 기록도 새로 시작합니다.
+        self.journal = [("reset",)]
+        return self.state
+
+    def load_state(self, state):
+        """외부(백엔드, 세이브)에서 온 상태를 받아 대화 기록을 링 버퍼로 바꿔 둡니다."""
+        state["messages"] = deque(state.get("messages", []), maxlen=HISTORY_SIZE)
+        self.state = state
+        return self.state
+
+    def restore(self, fields):
+        """세이브에서 복원한 게임 필드로 새로 시작합니다. 기록은 비우되 로그 seq는 이어 갑니다."""
+        log_seq = self.state.get("log_seq", 0)
+        api_key = self.state.get("api_key", "")
+        self.state = ai_engine_instance.get_initial_state()
+        self.state.update(fields)
+        self.state["messages"].clear()
+        self.state["log_seq"] = log_seq
+        self.state["api_key"] = api_key
+        self.state["last_action"] = "세이브 데이터를 불러왔습니다."
+        self.journal.append(("restore", copy.deepcopy(fields)))
+        sector_name = SECTOR_DATA.get(self.state["current_sector"], {}).get("name", "Unknown")
+        self.append_message(AIMessage(content=f"[SYSTEM]: 세이브 데이터 복원 완료. [{sector_name}]에서 재개합니다."))
         return self.state
 
-    def format_state_for_ui(self):
+    def append_message(self, message):
+        """메시지에 단조 증가하는 시퀀스 번호를 붙여 기록에 추가합니다. (오래된 것은 링 버퍼에서 밀려남)"""
+        self.state["log_seq"] = self.state.get("log_seq", 0) + 1
+        message.id = str(self.state["log_seq"])
+        self.state["messages"].append(message)
+
+    def turn_input(self, user_input, deadline=None):
+        """그래프 입력: 이번 명령과 게임 필드, 요청 마감 시각만 담은 작은 dict."""
+        turn = {field: self.state[field] for field in TURN_FIELDS}
+        turn["command"] = user_input
+        turn["deadline"] = deadline
+        return turn
+
+    def record_turn(self, commands, messages):
+        """규칙을 적용한 명령들과 이미 생성된 내레이션을 변경 기록에 남깁니다. 나중에 붙일 내레이션 목록을 돌려줍니다."""
+        texts = [msg.content for msg in messages]
+        self.journal.append(("turn", list(commands), texts))
+        return texts
+
+    def replay(self, journal):
+        """변경 기록을 현재 상태 위에 다시 적용합니다. 규칙은 다시 처리하고 내레이션은 기록된 텍스트를 씁니다. (LLM 호출 없음)"""
+        for op, *args in journal:
+            if op == "reset":
+                self.reset()
+            elif op == "restore":
+                self.restore(args[0])
+            elif op == "turn":
+                commands, texts = args
+                turn, results = self.batch_turn(commands)
+                self.apply_turn({**turn, "last_action": results[-1]["last_action"],
+                                 "messages": [AIMessage(content=text) for text in texts]})
+            elif op == "say":
+                for text in args[0]:
+                    self.append_message(AIMessage(content=text))
+
+    def apply_turn(self, result):
+        """그래프 결과의 게임 필드를 반영하고 새 메시지를 기록에 추가합니다."""
+        for field in TURN_FIELDS:
+            self.state[field] = result[field]
+        for msg in result.get("messages", ()):
+            self.append_message(msg)
+
+    @traced("format_state_for_ui")
+    def format_state_for_ui(self, cursor=None, always_blocks=True):
+        """UI용 로그를 만듭니다.
+
+        cursor가 주어지면 그보다 뒤의 로그만 보내고, 상태/이미지 블록은 always_blocks가 아니면
+        클라이언트가 마지막으로 받은 뒤에 바뀐 경우에만 보냅니다.
+        """
         try:
             ui_logs = []
             for msg in self.state["messages"]:
+                seq = int(msg.id) if msg.id else 0
+                if cursor is not None and seq <= cursor:
+                    continue
                 agent = "Scenario Master" if isinstance(msg, AIMessage) else "USER"
                 log_type = "message"
                 if "[GUIDE]" in msg.content:
@@ -209,28 +618,33 @@ class GameSessionManager:
                 ui_logs.append({
                     "agent": agent,
                     "text": msg.content,
-                    "type": log_type
+                    "type": log_type,
+                    "seq": seq
                 })
 
-            sector_info = SECTOR_DATA.get(self.state["current_sector"], {})
-            ui_logs.append({
+            image_key = self.image_key()
+            location, image_block = sector_fragments(self.state["current_sector"], image_key)
+            blocks = [{
                 "agent": "SYSTEM",
                 "text": "",
                 "type": "ui_update",
                 "status": "SYSTEM ONLINE" if not self.state["unlocked"] else "EXIT UNLOCKED",
                 "inventory": self.state.get("inventory", []),
-                "location": sector_info.get("name", "Unknown")
-            })
-            
-            ui_logs.append({
-                "agent": "비주얼 일러스트레이터",
-                "content": sector_info.get("short_desc", sector_info.get("desc", "격리 구역 시각화 중...")),
-                "type": "image",
-                "url": f"/assets/sector_{self.state.get('current_sector', 0)}.png"
-            })
+                "location": location
+            }, image_block]
 
-            return {"logs": ui_logs}
+            ui_key = f"{image_key}|{int(self.state['unlocked'])}|{'|'.join(self.state.get('inventory', []))}"
+            ui_hash = hashlib.blake2b(ui_key.encode("utf-8"), digest_size=8).hexdigest()
+            if ui_hash != self.state.get("ui_hash"):
+                self.state["ui_hash"] = ui_hash
+                self.state["ui_seq"] = self.state.get("log_seq", 0)
+            if always_blocks or cursor is None or cursor < self.state["ui_seq"]:
+                ui_logs.extend(blocks)
+
+            observe_history(self.state["messages"])
+            return {"logs": ui_logs, "cursor": self.state.get("log_seq", 0)}
         except Exception as e:
+            ERRORS.inc("format_state_for_ui")
             print(f"ERROR in format_state_for_ui: {str(e)}")
             traceback.print_exc()
             return {
@@ -241,37 +655,154 @@ class GameSessionManager:
                 }]
             }
 
-    def process_action(self, user_input):
+    def image_key(self):
+        """현재 화면 이미지: 엔딩에 도달했으면 엔딩 이미지, 아니면 구역 이미지."""
+        ending = self.state["sector_states"].get(ENDING_KEY)
+        if ending:
+            return f"ending_{ending}"
+        return f"sector_{self.state.get('current_sector', 0)}"
+
+    def etag(self):
+        """로그/상태 블록이 바뀔 때만 달라지는 ETag 값."""
+        return f"{self.state.get('log_seq', 0)}-{self.state.get('ui_hash', '')}"
+
+    def ui_cursor(self, cursor):
+        """(cursor, always_blocks). cursor가 없으면 (기존 클라이언트) 지금 이후에 생기는 로그와 상태 블록 전체를 보냅니다."""
+        if cursor is None:
+            return self.state.get("log_seq", 0), True
+        return cursor, False
+
+    @traced("process_action")
+    def process_action(self, user_input, cursor=None, deadline=None):
+        """명령을 처리합니다. cursor가 없으면 (기존 클라이언트) 이번 명령에 대한 응답 로그만 돌려줍니다."""
         try:
-            if len(self.state["messages"]) > 20:
-                 self.state["messages"] = self.state["messages"][-20:]
+            self.append_message(HumanMessage(content=user_input))
+            cursor, always_blocks = self.ui_cursor(cursor)
+            with span("pipeline"):
+                result = ai_graph.invoke(self.turn_input(user_input, deadline))
+            self.apply_turn(result)
+            self.record_turn([user_input], result.get("messages", ()))
+            return self.format_state_for_ui(cursor, always_blocks)
+        except Exception as e:
+            return engine_error("process_action", e)
 
-            self.state["messages"].append(HumanMessage(content=user_input))
-            self.state = ai_graph.invoke(self.state)
-            return self.format_state_for_ui()
+    @traced("process_action")
+    async def aprocess_action(self, user_input, cursor=None, deadline=None):
+        """process_action의 비동기 버전 (ai_graph.ainvoke 사용)."""
+        try:
+            self.append_message(HumanMessage(content=user_input))
+            cursor, always_blocks = self.ui_cursor(cursor)
+            with span("pipeline"):
+                result = await ai_graph.ainvoke(self.turn_input(user_input, deadline))
+            self.apply_turn(result)
+            self.record_turn([user_input], result.get("messages", ()))
+            return self.format_state_for_ui(cursor, always_blocks)
         except Exception as e:
-            print(f"PROCESS ACTION ERROR: {traceback.format_exc()}")
-            return {
-                "logs": [{
-                    "agent": "SYSTEM",
-                    "text": f"CORE ENGINE ERROR: {str(e)}",
-                    "type": "error"
-                }]
-            }
+            return engine_error("process_action", e)
+
+    def batch_turn(self, commands, deadline=None):
+        """명령들을 logic_node로 차례로 적용합니다. (내레이션 없이)
+
+        (마지막 턴 상태, 명령별 결과)를 돌려줍니다. 턴 상태의 last_action은 내레이션 한 번으로
+        배치 전체를 다루도록 최근 결과들을 묶은 요약입니다.
+        """
+        turn = self.turn_input("", deadline)
+        results = []
+        for command in commands:
+            self.append_message(HumanMessage(content=command))
+            turn["command"] = command
+            turn.update(ai_engine_instance.logic_node(turn))
+            results.append({
+                "command": command,
+                "last_action": turn["last_action"],
+                "current_sector": turn["current_sector"],
+                "unlocked": turn["unlocked"],
+                "ending": turn["sector_states"].get(ENDING_KEY)
+            })
+        recent = results[-BATCH_NARRATIVE_LINES:]
+        if len(results) == 1:
+            turn["last_action"] = results[0]["last_action"]
+        else:
+            lines = [f"'{result['command']}' -> {result['last_action']}" for result in recent]
+            if len(results) > len(recent):
+                lines.insert(0, f"(앞의 명령 {len(results) - len(recent)}개 생략)")
+            turn["last_action"] = "\n".join(lines)
+        return turn, results
+
+    def finish_batch(self, turn, results, narrative, cursor, always_blocks):
+        self.apply_turn({**turn, "last_action": results[-1]["last_action"], "messages": narrative["messages"]})
+        self.record_turn([result["command"] for result in results], narrative["messages"])
+        ui_data = self.format_state_for_ui(cursor, always_blocks)
+        ui_data["results"] = results
+        return ui_data
 
-    def get_hint(self):
+    @traced("process_actions")
+    def process_actions(self, commands, cursor=None, deadline=None):
+        """명령 목록을 한 번에 처리합니다. 규칙은 명령마다 적용하고 내레이션은 배치 전체에 대해 한 번만 만듭니다."""
         try:
-            hint_state = ai_engine_instance.hint_node(self.state)
-            self.state["messages"].extend(hint_state["messages"])
-            return self.format_state_for_ui()
+            cursor, always_blocks = self.ui_cursor(cursor)
+            turn, results = self.batch_turn(commands, deadline)
+            return self.finish_batch(turn, results, ai_engine_instance.narrative_node(turn), cursor, always_blocks)
         except Exception as e:
-            print(f"GET HINT ERROR: {traceback.format_exc()}")
-            return {
-                "logs": [{
-                    "agent": "시스템 가이드",
-                    "text": f"HINT ERROR: {str(e)}",
-                    "type": "error"
-                }]
+            return engine_error("process_actions", e)
+
+    @traced("process_actions")
+    async def aprocess_actions(self, commands, cursor=None, deadline=None):
+        """process_actions의 비동기 버전."""
+        try:
+            cursor, always_blocks = self.ui_cursor(cursor)
+            turn, results = self.batch_turn(commands, deadline)
+            return self.finish_batch(turn, results, await ai_engine_instance.anarrative_node(turn), cursor, always_blocks)
+        except Exception as e:
+            return engine_error("process_actions", e)
+
+    def stream_action(self, user_input, cursor=None, deadline=None):
+        """process_action의 스트리밍 버전. (event, data) 튜플을 순서대로 yield합니다.
+
+        logic 결과 -> narrative 토큰들 -> 최종 UI 블록 순서입니다.
+        """
+        try:
+            self.append_message(HumanMessage(content=user_input))
+            cursor, always_blocks = self.ui_cursor(cursor)
+            turn = self.turn_input(user_input, deadline)
+            turn.update(ai_engine_instance.logic_node(turn))
+            self.apply_turn(turn)
+            texts = self.record_turn([user_input], ())
+            yield "logic", {
+                "last_action": self.state["last_action"],
+                "current_sector": self.state["current_sector"],
+                "inventory": self.state["inventory"],
+                "unlocked": self.state["unlocked"]
             }
 
-session_manager = GameSessionManager()
+            parts = []
+            for text in ai_engine_instance.narrative_stream(turn):
+                parts.append(text)
+                yield "token", {"text": text}
+            self.append_message(AIMessage(content="".join(parts)))
+            texts.append("".join(parts))
+            yield "final", self.format_state_for_ui(cursor, always_blocks)
+        except Exception as e:
+            yield "error", engine_error("stream_action", e)
+
+    def add_hint(self, hint_state, cursor, always_blocks):
+        for msg in hint_state["messages"]:
+            self.append_message(msg)
+        self.journal.append(("say", [msg.content for msg in hint_state["messages"]]))
+        return self.format_state_for_ui(cursor, always_blocks)
+
+    @traced("get_hint")
+    def get_hint(self, cursor=None, deadline=None):
+        try:
+            cursor, always_blocks = self.ui_cursor(cursor)
+            return self.add_hint(ai_engine_instance.hint_node({**self.state, "deadline": deadline}), cursor, always_blocks)
+        except Exception as e:
+            return engine_error("get_hint", e, agent="시스템 가이드", label="HINT ERROR")
+
+    @traced("get_hint")
+    async def aget_hint(self, cursor=None, deadline=None):
+        try:
+            cursor, always_blocks = self.ui_cursor(cursor)
+            return self.add_hint(await ai_engine_instance.ahint_node({**self.state, "deadline": deadline}), cursor, always_blocks)
+        except Exception as e:
+            return engine_error("get_hint", e, agent="시스템 가이드", label="HINT ERROR")
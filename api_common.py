@@ -0,0 +1,113 @@
+"""server.py(Flask)와 asgi.py(ASGI)가 함께 쓰는 요청 처리 도우미.
+
+두 진입점은 요청/응답 객체와 락(threading / asyncio)만 다르고, 요청 값 해석과 응답 본문은 여기서 만듭니다.
+함수들은 (status, payload) 튜플이나 dict를 돌려주며, 프레임워크 응답으로 바꾸는 것은 각 진입점의 몫입니다.
+"""
+from ai_engine import ai_engine_instance, BATCH_MAX_COMMANDS
+from llm_deadline import request_deadline
+from save_codec import decode_save, SaveError, MAX_SAVE_REQUEST_BYTES
+
+HEALTH_TEXT = "🕸️ 404: THE DIGITAL PRISON - BACKEND SYSTEM ONLINE 🕸️"
+PING = {"status": "pong", "message": "Connection stable"}
+NOT_FOUND = {"error": "Not Found"}
+
+
+def request_context(header):
+    """(API 키, 요청 마감 시각). header는 헤더 이름으로 값(없으면 None 또는 "")을 돌려주는 함수입니다."""
+    return header("X-Gemini-API-Key") or "", request_deadline(header("X-Request-Timeout"))
+
+
+def session_token(header, data):
+    """X-Session-Id 헤더, 없으면 JSON 본문의 session_id."""
+    return header("X-Session-Id") or data.get("session_id", "")
+
+
+def get_cursor(value):
+    """클라이언트가 마지막으로 받은 로그 seq. 없거나 잘못된 값이면 None (전체/기존 동작)."""
+    try:
+        return int(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def get_commands(data):
+    """배치 요청의 명령 목록. 형식이 틀리면 (None, 오류 메시지)."""
+    commands = data.get('commands')
+    if not isinstance(commands, list) or not commands or not all(isinstance(command, str) for command in commands):
+        return None, "commands는 비어 있지 않은 문자열 배열이어야 합니다."
+    if len(commands) > BATCH_MAX_COMMANDS:
+        return None, f"한 번에 보낼 수 있는 명령은 {BATCH_MAX_COMMANDS}개까지입니다."
+    return commands, None
+
+
+def session_expired():
+    return 404, {
+        "error": "session_expired",
+        "logs": [{
+            "agent": "SYSTEM",
+            "text": "세션이 만료되었거나 존재하지 않습니다. RECONNECT로 새 세션을 시작하십시오.",
+            "type": "error"
+        }]
+    }
+
+
+def stats_payload(session_store):
+    return {
+        "sessions": session_store.stats(),
+        "llm_pool": ai_engine_instance.llm_pool.stats(),
+        "narrative_cache": ai_engine_instance.narrative_cache.stats(),
+        "llm_coalescer": ai_engine_instance.coalescer.stats(),
+        "llm_scheduler": ai_engine_instance.scheduler.stats(),
+        "llm_deadline": ai_engine_instance.deadlines.stats()
+    }
+
+
+def save_too_large():
+    return 413, {"success": False, "error": "세이브 데이터가 너무 큽니다."}
+
+
+def parse_save(content_length, data):
+    """/api/load 본문의 세이브를 해석합니다. (필드, None) 또는 (None, (status, payload))."""
+    # 세이브는 고정 길이의 짧은 문자열이므로 큰 본문은 읽지도 않고 거절합니다.
+    if content_length is None:
+        return None, (411, {"success": False, "error": "Content-Length가 필요합니다."})
+    if content_length > MAX_SAVE_REQUEST_BYTES:
+        return None, save_too_large()
+    try:
+        return decode_save(data().get('state')), None
+    except SaveError as e:
+        return None, (400, {"success": False, "error": str(e)})
+
+
+# --- Session Work (세션 락을 잡은 상태에서 호출) ---
+def reset_session(session_manager, api_key):
+    session_manager.reset()
+    session_manager.state['api_key'] = api_key
+    return session_manager.format_state_for_ui()
+
+
+def load_session(session_manager, fields, api_key):
+    session_manager.restore(fields)
+    session_manager.state['api_key'] = api_key
+    ui_data = session_manager.format_state_for_ui()
+    ui_data["success"] = True
+    return ui_data
+
+
+def log_payload(session_manager, etag_matches, cursor):
+    """폴링 응답. 변화가 없으면 (None, etag), 있으면 (UI 데이터, etag)."""
+    etag = session_manager.etag()
+    if etag_matches(etag):
+        return None, etag
+    ui_data = session_manager.format_state_for_ui(cursor, always_blocks=False)
+    # 블록 해시가 갱신되었을 수 있으므로 다시 계산합니다.
+    return ui_data, session_manager.etag()
+
+
+def etag_in(header, etag):
+    """If-None-Match 헤더에 etag가 있는지 (약한 비교: W/ 접두어 무시)."""
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == f'"{etag}"' for tag in header.split(","))
@@ -0,0 +1,379 @@
+"""비동기(ASGI) 실행 모드.
+
+server.py(Flask, 동기 워커)와 같은 API를 asyncio 위에서 제공합니다.
+LLM 응답을 기다리는 동안 워커를 점유하지 않으므로 한 프로세스가 수백 개의 요청을 동시에 처리할 수 있습니다.
+
+    uvicorn asgi:app --host 0.0.0.0 --port $PORT
+    gunicorn -k uvicorn.workers.UvicornWorker asgi:app
+"""
+import os
+import json
+import time
+import asyncio
+import inspect
+import mimetypes
+import traceback
+from urllib.parse import parse_qs
+from dotenv import load_dotenv
+
+# 여러 모듈이 import 시점에 환경 변수를 읽으므로 다른 import보다 먼저 로드합니다.
+# 예전 ai_engine과 같이 ./.env(위로 검색)와 프로젝트 상위 디렉토리의 ../.env를 모두 읽습니다. (먼저 읽은 값이 우선)
+load_dotenv()
+load_dotenv(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".env"))
+
+from save_codec import encode_save, MAX_SAVE_REQUEST_BYTES
+from metrics import metrics, is_local, REQUEST_SECONDS, ERRORS, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from image_assets import image_assets, ASSET_BUILD_DIR, IMMUTABLE_CACHE_CONTROL
+import request_profiler
+import response_codec
+from request_profiler import span, PROFILE_HEADER, PROFILE_ID_HEADER
+import api_common
+from api_common import get_cursor, get_commands, request_context, session_expired
+from session_store import SessionStore, SESSION_TTL
+from session_backend import create_backend
+
+session_store = SessionStore(backend=create_backend(ttl=SESSION_TTL))
+metrics.gauge("game_active_sessions", "Sessions held in this worker's session registry.", lambda: len(session_store))
+
+CORS_HEADERS = [
+    (b"access-control-allow-origin", b"*"),
+    (b"access-control-allow-headers", b"*"),
+    (b"access-control-allow-methods", b"GET, POST, OPTIONS"),
+    (b"access-control-expose-headers", b"ETag, " + PROFILE_ID_HEADER.encode("latin-1")),
+]
+
+
+class Request:
+    def __init__(self, scope, body):
+        self.method = scope["method"]
+        self.path = scope["path"]
+        self.client = (scope.get("client") or ("",))[0]
+        self.args = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        self.headers = {name.decode("latin-1").lower(): value.decode("latin-1") for name, value in scope["headers"]}
+        self.body = body
+
+    def header(self, name, default=""):
+        return self.headers.get(name.lower(), default)
+
+    def get_json(self):
+        try:
+            data = json.loads(self.body or b"null")
+        except ValueError:
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def session_token(self):
+        return api_common.session_token(self.header, self.get_json())
+
+    def query(self, name, default=None):
+        return self.args.get(name, [default])[0]
+
+
+async def find_session(token):
+    # 백엔드 조회(SQLite 읽기, 상태 복원)는 블로킹이므로 이벤트 루프 밖에서 합니다.
+    return await asyncio.to_thread(session_store.get, token)
+
+
+async def run_in_session(request, api_key, work, save=True, token=None):
+    """요청의 세션을 찾아 세션 락 안에서 work(session_manager)를 실행하고 저장합니다. 세션이 없으면 404.
+
+    work는 값이나 awaitable(aprocess_action 등)을 돌려줍니다. 저장은 write-behind라 쓰기를 예약만 합니다.
+    """
+    if token is None:
+        token = request.session_token()
+    session_manager = await find_session(token)
+    if session_manager is None:
+        return session_expired()
+    async with session_manager.alock:
+        if api_key is not None:
+            session_manager.state['api_key'] = api_key
+        result = work(session_manager)
+        if inspect.isawaitable(result):
+            result = await result
+        if save:
+            session_store.save(token, session_manager)
+    return 200, result
+
+
+# --- Routes ---
+async def ping(request):
+    return 200, api_common.PING
+
+
+async def stats(request):
+    return 200, api_common.stats_payload(session_store)
+
+
+async def init_game(request):
+    api_key, _ = request_context(request.header)
+    token = request.session_token()
+    if await find_session(token) is None:
+        token, _ = await asyncio.to_thread(session_store.create)
+    return await run_in_session(request, None, lambda session_manager: {
+        **api_common.reset_session(session_manager, api_key), "session_id": token}, token=token)
+
+
+async def game_action(request):
+    api_key, deadline = request_context(request.header)
+    data = request.get_json()
+    user_input = data.get('command', '')
+    print(f"ACTION REQUEST: {user_input}")
+    return await run_in_session(request, api_key, lambda session_manager: session_manager.aprocess_action(
+        user_input, get_cursor(data.get('cursor')), deadline))
+
+
+async def game_actions(request):
+    api_key, deadline = request_context(request.header)
+    data = request.get_json()
+    commands, error = get_commands(data)
+    if commands is None:
+        return 400, {"error": error}
+    print(f"ACTIONS REQUEST: {len(commands)} commands")
+    return await run_in_session(request, api_key, lambda session_manager: session_manager.aprocess_actions(
+        commands, get_cursor(data.get('cursor')), deadline))
+
+
+async def game_action_stream(request, send):
+    """/api/action의 Server-Sent Events 버전 (logic -> token... -> final).
+
+    응답을 직접 보내므로 ROUTES가 아니라 STREAM_ROUTES에 등록합니다. 스트림을 시작하지 못하면 (status, payload)를 돌려줍니다.
+    stream_action은 동기 제너레이터(스케줄러 대기, 제공자 스트림)이므로 다음 이벤트는 스레드에서 꺼냅니다.
+    """
+    api_key, deadline = request_context(request.header)
+    data = request.get_json()
+    user_input = data.get('command', '')
+
+    token = request.session_token()
+    session_manager = await find_session(token)
+    if session_manager is None:
+        return session_expired()
+
+    print(f"ACTION STREAM REQUEST: {user_input}")
+    async with session_manager.alock:
+        session_manager.state['api_key'] = api_key
+        events = session_manager.stream_action(user_input, get_cursor(data.get('cursor')), deadline)
+        try:
+            await send({
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [(b"content-type", b"text/event-stream; charset=utf-8"), (b"cache-control", b"no-cache"),
+                            (b"x-accel-buffering", b"no")] + CORS_HEADERS,
+            })
+            while (item := await asyncio.to_thread(next, events, None)) is not None:
+                event, payload = item
+                chunk = f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+                await send({"type": "http.response.body", "body": chunk.encode("utf-8"), "more_body": True})
+            await send({"type": "http.response.body", "body": b""})
+        finally:
+            # 클라이언트가 도중에 끊어도(send 실패, 취소) 이미 반영된 logic 결과는 저장합니다.
+            await asyncio.to_thread(events.close)
+            session_store.save(token, session_manager)
+
+
+async def hint(request):
+    api_key, deadline = request_context(request.header)
+    cursor = get_cursor(request.get_json().get('cursor'))
+    return await run_in_session(request, api_key, lambda session_manager: session_manager.aget_hint(cursor, deadline))
+
+
+async def game_log(request):
+    """폴링용. cursor 이후의 로그와 바뀐 상태 블록만 돌려주고, 변화가 없으면 304."""
+    session_manager = await find_session(request.session_token())
+    if session_manager is None:
+        return session_expired()
+
+    if_none_match = request.header("If-None-Match")
+    async with session_manager.alock:
+        ui_data, etag = api_common.log_payload(
+            session_manager, lambda etag: api_common.etag_in(if_none_match, etag), get_cursor(request.query("cursor")))
+    return (304 if ui_data is None else 200), ui_data, [(b"etag", f'"{etag}"'.encode("latin-1"))]
+
+
+async def save_game(request):
+    return await run_in_session(request, None, lambda session_manager: {"success": True, "state": encode_save(session_manager.state)}, save=False)
+
+
+async def load_game(request):
+    api_key, _ = request_context(request.header)
+    fields, error = api_common.parse_save(len(request.body), request.get_json)
+    if error is not None:
+        return error
+    return await run_in_session(request, None, lambda session_manager: api_common.load_session(session_manager, fields, api_key))
+
+
+ROUTES = {
+    ("GET", "/api/ping"): ping,
+    ("GET", "/api/stats"): stats,
+    ("POST", "/api/init"): init_game,
+    ("POST", "/api/action"): game_action,
+    ("POST", "/api/actions"): game_actions,
+    ("POST", "/api/hint"): hint,
+    ("GET", "/api/log"): game_log,
+    ("POST", "/api/save"): save_game,
+    ("POST", "/api/load"): load_game,
+}
+
+STREAM_ROUTES = {
+    ("POST", "/api/action/stream"): game_action_stream,
+}
+
+# 본문 크기 상한이 있는 경로와 넘었을 때의 응답. 상한을 넘는 본문은 버퍼에 모으지 않습니다.
+BODY_LIMITS = {
+    "/api/load": (MAX_SAVE_REQUEST_BYTES, api_common.save_too_large),
+}
+
+
+# --- ASGI Entry Point ---
+async def read_body(receive, headers, limit=None):
+    """요청 본문을 읽습니다. limit을 넘으면 None.
+
+    content-length가 limit보다 크면 한 바이트도 읽지 않고, 없거나(chunked) 틀리면 읽은 만큼 세다가 넘는 순간 멈춥니다.
+    """
+    if limit is not None:
+        content_length = dict(headers).get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > limit:
+            return None
+    chunks = []
+    size = 0
+    while True:
+        message = await receive()
+        chunk = message.get("body", b"")
+        size += len(chunk)
+        if limit is not None and size > limit:
+            return None
+        chunks.append(chunk)
+        if not message.get("more_body"):
+            return b"".join(chunks)
+
+
+async def send_response(send, status, body, content_type=b"application/json", headers=()):
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", content_type), (b"content-length", str(len(body)).encode())] + list(headers) + CORS_HEADERS,
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def send_asset(scope, send, name):
+    """내용 해시가 붙은 빌드 이미지를 영구 캐시 헤더로 보냅니다.
+
+    서버가 http.response.zerocopy 확장을 지원하면 파일을 넘겨 복사 없이 보내고, 아니면 스레드에서 읽어 보냅니다.
+    """
+    path = os.path.join(ASSET_BUILD_DIR, name)
+    if not image_assets.is_built(name) or not os.path.isfile(path):
+        await send_response(send, 404, json.dumps(api_common.NOT_FOUND).encode("utf-8"))
+        return
+    content_type = (mimetypes.guess_type(name)[0] or "application/octet-stream").encode("latin-1")
+    headers = [(b"cache-control", IMMUTABLE_CACHE_CONTROL.encode("latin-1"))]
+    if "http.response.zerocopy" in scope.get("extensions", {}):
+        with open(path, "rb") as f:
+            await send({
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [(b"content-type", content_type), (b"content-length", str(os.fstat(f.fileno()).st_size).encode())] + headers + CORS_HEADERS,
+            })
+            await send({"type": "http.response.zerocopy", "file": f})
+        return
+    body = await asyncio.to_thread(lambda: open(path, "rb").read())
+    await send_response(send, 200, body, content_type, headers)
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+    if scope["type"] != "http":
+        return
+
+    limit, too_large = BODY_LIMITS.get(scope["path"], (None, None))
+    body = await read_body(receive, scope["headers"], limit)
+    if body is None:
+        status, payload = too_large()
+        await send_response(send, status, response_codec.dumps(payload))
+        return
+    request = Request(scope, body)
+    if request.method == "OPTIONS":
+        await send_response(send, 204, b"")
+        return
+    if request.method == "GET" and request.path == "/":
+        await send_response(send, 200, api_common.HEALTH_TEXT.encode("utf-8"), b"text/plain; charset=utf-8")
+        return
+
+    if request.method == "GET" and request.path.startswith("/assets/build/"):
+        await send_asset(scope, send, request.path[len("/assets/build/"):])
+        return
+
+    if request.method == "GET" and request.path == "/api/metrics":
+        # 운영 지표는 로컬에서만 봅니다. (METRICS_PUBLIC=1이면 어디서나)
+        if not is_local(request.client):
+            await send_response(send, 404, json.dumps(api_common.NOT_FOUND).encode("utf-8"))
+            return
+        await send_response(send, 200, metrics.render().encode("utf-8"), METRICS_CONTENT_TYPE.encode("latin-1"))
+        return
+
+    started = time.perf_counter()
+    stream = STREAM_ROUTES.get((request.method, request.path))
+    if stream is not None:
+        try:
+            result = await stream(request, send)
+        except Exception:
+            ERRORS.inc("server")
+            print(f"!!! SERVER ERROR !!!\n{traceback.format_exc()}")
+            raise
+        if result is None:
+            REQUEST_SECONDS.observe(time.perf_counter() - started, request.path, request.method, "200")
+            return
+        status, payload = result
+        await send_response(send, status, response_codec.dumps(payload))
+        REQUEST_SECONDS.observe(time.perf_counter() - started, request.path, request.method, str(status))
+        return
+
+    handler = ROUTES.get((request.method, request.path))
+    # 이벤트 루프에서는 cProfile이 다른 요청까지 함께 잡으므로 span만 모읍니다.
+    profile = request_profiler.start(f"{request.method} {request.path if handler else 'unmatched'}",
+                                     request.header(PROFILE_HEADER), use_cprofile=False)
+    headers = ()
+    if handler is None:
+        status, payload = 404, api_common.NOT_FOUND
+    else:
+        try:
+            # 핸들러는 (status, payload) 또는 (status, payload, headers)를 돌려줍니다.
+            status, payload, *extra = await handler(request)
+            if extra:
+                headers = extra[0]
+        except Exception as e:
+            ERRORS.inc("server")
+            error_trace = traceback.format_exc()
+            print(f"!!! SERVER ERROR !!!\n{error_trace}")
+            status, payload = 500, {
+                "error": "Internal Server Error",
+                "message": str(e),
+                "traceback": error_trace
+            }
+    route = request.path if handler else "unmatched"
+    if payload is not None:
+        encode_started = time.perf_counter()
+        with span("json_encode"):
+            body = response_codec.dumps(payload)
+        body, encoding, codec_headers = response_codec.finish(
+            body, request.header("Accept-Encoding"), time.perf_counter() - encode_started, route)
+        if encoding is not None:
+            # 압축한 표현은 바이트가 다르므로 약한 ETag로 바꿉니다.
+            headers = [(name, b"W/" + value if name == b"etag" and not value.startswith(b"W/") else value) for name, value in headers]
+        headers = list(headers) + [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in codec_headers]
+    else:
+        body = b""
+    if profile is not None:
+        profile = request_profiler.finish(profile)
+        headers = list(headers) + [(PROFILE_ID_HEADER.lower().encode("latin-1"), profile.id.encode("latin-1"))]
+    await send_response(send, status, body, headers=headers)
+    # 라벨은 등록된 라우트 경로만 씁니다. (임의 경로로 시계열 수가 늘지 않도록)
+    REQUEST_SECONDS.observe(time.perf_counter() - started, route, request.method, str(status))
+    if profile is not None:
+        await asyncio.to_thread(profile.dump)
@@ -0,0 +1,122 @@
+"""구역/엔딩 이미지 빌드 단계.
+
+frontend/public/assets의 원본(sector_*.png, ending_*.png)마다 내용 해시가 붙은 AVIF/WebP 파일과
+작은 흐림 placeholder(data URI)를 만들고, 결과를 asset_manifest.json에 기록합니다.
+파일 이름에 내용 해시가 들어가므로 이미지가 바뀌면 URL도 바뀌어, 한 번 받은 파일은 영구 캐시할 수 있습니다.
+
+    python build_assets.py            # 바뀐 원본만 다시 인코딩
+    python build_assets.py --force    # 전부 다시 인코딩
+
+Pillow가 필요합니다. (AVIF는 Pillow 11.2+ 또는 pillow-avif-plugin이 있을 때만 만듭니다)
+"""
+import os
+import sys
+import json
+import base64
+import hashlib
+import argparse
+
+from image_assets import ASSET_SOURCE_DIR, ASSET_BUILD_DIR, MANIFEST_PATH, MANIFEST_VERSION
+
+WEBP_QUALITY = 80
+AVIF_QUALITY = 55
+PLACEHOLDER_SIZE = 16  # px (긴 변)
+HASH_LENGTH = 10
+
+
+def content_hash(data):
+    return hashlib.blake2b(data, digest_size=16).hexdigest()[:HASH_LENGTH]
+
+
+def encode(image, fmt, **options):
+    from io import BytesIO
+    buffer = BytesIO()
+    image.save(buffer, fmt, **options)
+    return buffer.getvalue()
+
+
+def placeholder(image):
+    """긴 변 16px로 줄이고 살짝 흐린 WebP data URI. (수백 바이트)"""
+    from PIL import ImageFilter
+    small = image.copy()
+    small.thumbnail((PLACEHOLDER_SIZE, PLACEHOLDER_SIZE))
+    small = small.filter(ImageFilter.GaussianBlur(1))
+    return "data:image/webp;base64," + base64.b64encode(encode(small, "WEBP", quality=40)).decode("ascii")
+
+
+def write_once(path, data):
+    # 이름에 내용 해시가 있으므로 이미 있으면 같은 파일입니다.
+    if not os.path.exists(path):
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+
+def build(force=False):
+    try:
+        from PIL import Image, features
+    except ImportError:
+        sys.exit("build_assets.py에는 Pillow가 필요합니다: pip install pillow")
+    avif = features.check("avif")
+    if not avif:
+        print("WARNING: 이 Pillow에는 AVIF 인코더가 없어 WebP만 만듭니다.")
+
+    previous = {}
+    if os.path.exists(MANIFEST_PATH) and not force:
+        with open(MANIFEST_PATH, encoding="utf-8") as f:
+            previous = json.load(f).get("images", {})
+
+    os.makedirs(ASSET_BUILD_DIR, exist_ok=True)
+    images = {}
+    for name in sorted(os.listdir(ASSET_SOURCE_DIR)):
+        key, ext = os.path.splitext(name)
+        if ext.lower() not in (".png", ".jpg", ".jpeg") or not key.startswith(("sector_", "ending_")):
+            continue
+        with open(os.path.join(ASSET_SOURCE_DIR, name), "rb") as f:
+            source = f.read()
+        source_hash = content_hash(source)
+        entry = previous.get(key)
+        if entry and entry.get("source_hash") == source_hash and (entry.get("avif") or not avif) \
+                and all(os.path.exists(os.path.join(ASSET_BUILD_DIR, entry[fmt])) for fmt in ("webp", "avif") if entry.get(fmt)):
+            images[key] = entry
+            continue
+
+        image = Image.open(os.path.join(ASSET_SOURCE_DIR, name)).convert("RGB")
+        entry = {"source": name, "source_hash": source_hash, "width": image.width, "height": image.height,
+                 "placeholder": placeholder(image)}
+        outputs = [("webp", encode(image, "WEBP", quality=WEBP_QUALITY, method=6))]
+        if avif:
+            outputs.append(("avif", encode(image, "AVIF", quality=AVIF_QUALITY)))
+        for fmt, data in outputs:
+            filename = f"{key}.{content_hash(data)}.{fmt}"
+            write_once(os.path.join(ASSET_BUILD_DIR, filename), data)
+            entry[fmt] = filename
+            entry[fmt + "_bytes"] = len(data)
+        images[key] = entry
+        sizes = ", ".join(f"{fmt} {entry[fmt + '_bytes'] / 1024:.0f}KB" for fmt, _ in outputs)
+        print(f"{name}: {len(source) / 1024:.0f}KB -> {sizes}")
+
+    # 매니페스트에 없는 예전 해시 파일은 지웁니다.
+    keep = {entry[fmt] for entry in images.values() for fmt in ("webp", "avif") if entry.get(fmt)}
+    for name in os.listdir(ASSET_BUILD_DIR):
+        if name not in keep and name != os.path.basename(MANIFEST_PATH):
+            os.remove(os.path.join(ASSET_BUILD_DIR, name))
+
+    tmp = MANIFEST_PATH + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"version": MANIFEST_VERSION, "images": images}, f, ensure_ascii=False, indent=1, sort_keys=True)
+    os.replace(tmp, MANIFEST_PATH)
+    print(f"{len(images)} images -> {MANIFEST_PATH}")
+    return images
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--force", action="store_true", help="바뀌지 않은 원본도 다시 인코딩")
+    args = parser.parse_args()
+    build(args.force)
+
+
+if __name__ == "__main__":
+    main()
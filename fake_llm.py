@@ -0,0 +1,104 @@
+"""오프라인 부하 테스트/벤치마크용 가짜 채팅 모델.
+
+LLM_BACKEND=fake로 실행하면 get_llm이 Gemini 대신 이 모델을 돌려줍니다. (API 키 값은 무엇이든 됨)
+지연 분포와 응답 문구를 환경 변수로 정할 수 있고, 시드가 같으면 같은 결과를 냅니다.
+
+    FAKE_LLM_LATENCY=fixed:0.2 | uniform:0.1:0.5 | exp:0.3 | lognormal:0.3:0.5 (중앙값:시그마)
+    FAKE_LLM_RESPONSES=응답 목록 JSON 파일 경로 (문자열 배열)
+    FAKE_LLM_SEED=0
+"""
+import os
+import json
+import time
+import math
+import random
+import asyncio
+import threading
+
+from langchain_core.messages import AIMessage, AIMessageChunk
+
+# --- Fake Model Settings ---
+FAKE_LLM_LATENCY = os.environ.get("FAKE_LLM_LATENCY", "lognormal:0.4:0.5")
+FAKE_LLM_RESPONSES = os.environ.get("FAKE_LLM_RESPONSES", "")
+FAKE_LLM_SEED = int(os.environ.get("FAKE_LLM_SEED", 0))
+
+DEFAULT_RESPONSES = [
+    "[LOG]: 행동이 기록되었습니다. 감시 프로토콜은 계속됩니다.",
+    "[LOG]: 흥미롭군요. 당신의 발버둥은 시스템 부하 0.001%에 불과합니다.",
+    "[LOG]: 변화 감지. 그러나 탈출 확률은 여전히 계산 오차 범위 안에 있습니다.",
+    "[LOG]: 접근 기록 저장 완료. 다음 실수를 기다리겠습니다.",
+]
+
+
+def parse_latency(spec):
+    """지연 분포 문자열을 (rng -> 초) 함수로 바꿉니다."""
+    kind, *args = spec.split(":")
+    values = [float(arg) for arg in args]
+    if kind == "fixed":
+        return lambda rng: values[0]
+    if kind == "uniform":
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == "exp":
+        return lambda rng: rng.expovariate(1.0 / values[0])
+    if kind == "lognormal":
+        return lambda rng: rng.lognormvariate(math.log(values[0]), values[1])
+    raise ValueError(f"unknown latency distribution: {spec}")
+
+
+def load_responses(path):
+    if not path:
+        return list(DEFAULT_RESPONSES)
+    with open(path, encoding="utf-8") as f:
+        responses = json.load(f)
+    if not responses or not all(isinstance(text, str) for text in responses):
+        raise ValueError(f"{path}: 응답 목록은 비어 있지 않은 문자열 배열이어야 합니다.")
+    return responses
+
+
+class FakeChatModel:
+    """ChatGoogleGenerativeAI 대신 쓰는 모델. invoke/ainvoke/stream만 흉내 냅니다.
+
+    지연과 응답은 시드 고정 난수로 뽑으므로, 같은 시드와 같은 호출 순서면 같은 결과가 나옵니다.
+    (같은 프롬프트에도 다른 응답이 나올 수 있어 NarrativeCache가 실제처럼 변형을 모읍니다.)
+    """
+
+    def __init__(self, latency=FAKE_LLM_LATENCY, responses=None, seed=FAKE_LLM_SEED):
+        self.sample_latency = parse_latency(latency) if isinstance(latency, str) else latency
+        self.responses = responses or load_responses(FAKE_LLM_RESPONSES)
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    def _draw(self):
+        """(지연, 응답) 한 쌍을 뽑습니다."""
+        with self._lock:
+            self.calls += 1
+            return max(0.0, self.sample_latency(self._rng)), self._rng.choice(self.responses)
+
+    @staticmethod
+    def usage(prompt, text):
+        # 토크나이저 없이 글자 수 / 4로 어림한 토큰 수 (지표 확인용)
+        input_tokens, output_tokens = len(str(prompt)) // 4 + 1, len(text) // 4 + 1
+        return {"input_tokens": input_tokens, "output_tokens": output_tokens, "total_tokens": input_tokens + output_tokens}
+
+    def invoke(self, prompt):
+        latency, text = self._draw()
+        time.sleep(latency)
+        return AIMessage(content=text, usage_metadata=self.usage(prompt, text))
+
+    async def ainvoke(self, prompt):
+        latency, text = self._draw()
+        await asyncio.sleep(latency)
+        return AIMessage(content=text, usage_metadata=self.usage(prompt, text))
+
+    def stream(self, prompt):
+        # 첫 토큰까지 지연의 절반, 나머지를 단어 단위로 나눠 보냅니다.
+        latency, text = self._draw()
+        words = text.split(" ")
+        time.sleep(latency / 2)
+        for i, word in enumerate(words):
+            if i:
+                time.sleep(latency / 2 / len(words))
+            # 사용량은 실제 모델처럼 마지막 조각에만 붙입니다.
+            usage = self.usage(prompt, text) if i == len(words) - 1 else None
+            yield AIMessageChunk(content=word if i == 0 else " " + word, usage_metadata=usage)
@@ -23,6 +23,7 @@ function App() {
   const [loading, setLoading] = useState(false)
   const [audioEnabled, setAudioEnabled] = useState(false)
   const [apiKey, setApiKey] = useState(() => localStorage.getItem('gemini_api_key') || '')
+  const sessionId = useRef(sessionStorage.getItem('digital_prison_session') || '')
 
   useEffect(() => {
     localStorage.setItem('gemini_api_key', apiKey)
@@ -67,7 +68,7 @@ function App() {
 
       const res = await fetch(`${API_URL}/api/init`, {
         method: 'POST',
-        headers: { 'X-Gemini-API-Key': apiKey },
+        headers: { 'X-Gemini-API-Key': apiKey, 'X-Session-Id': sessionId.current },
         signal: controller.signal
       })
       clearTimeout(timeoutId);
@@ -77,6 +78,10 @@ function App() {
 
       const data = await res.json()
       console.log("GAME INIT: Data parsed:", data)
+      if (data && data.session_id) {
+        sessionId.current = data.session_id
+        sessionStorage.setItem('digital_prison_session', data.session_id)
+      }
 
       if (data && data.logs) {
         addLog(data.logs, true)
@@ -114,7 +119,8 @@ function App() {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
-          'X-Gemini-API-Key': apiKey
+          'X-Gemini-API-Key': apiKey,
+          'X-Session-Id': sessionId.current
         },
         body: JSON.stringify({ command: cmd }),
         signal: controller.signal
@@ -167,7 +173,8 @@ function App() {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
-          'X-Gemini-API-Key': apiKey
+          'X-Gemini-API-Key': apiKey,
+          'X-Session-Id': sessionId.current
         },
         signal: controller.signal
       })
@@ -222,7 +229,7 @@ function App() {
     try {
       const res = await fetch(`${API_URL}/api/save`, {
         method: 'POST',
-        headers: { 'X-Gemini-API-Key': apiKey }
+        headers: { 'X-Gemini-API-Key': apiKey, 'X-Session-Id': sessionId.current }
       })
       const data = await res.json()
       if (data.state) {
@@ -249,7 +256,8 @@ function App() {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
-          'X-Gemini-API-Key': apiKey
+          'X-Gemini-API-Key': apiKey,
+          'X-Session-Id': sessionId.current
         },
         body: JSON.stringify({ state: JSON.parse(savedState) })
       })
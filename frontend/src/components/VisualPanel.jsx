@@ -17,12 +17,23 @@ function VisualPanel({ imageData }) {
             <div className="w-full h-full flex items-center justify-center bg-[#050505] p-1 border border-cyber-dark relative z-10">
                 {imageData.url ? (
                     <div className="relative w-full h-full group">
-                        {/* Actual Image */}
-                        <img
-                            src={imageData.url}
-                            alt={imageData.content}
-                            className="w-full h-full object-cover filter contrast-125 brightness-90 saturate-50 sepia-[.3] opacity-90"
-                        />
+                        {/* Actual Image: AVIF/WebP(content-hashed) with blur placeholder underneath */}
+                        <picture
+                            className="block w-full h-full bg-cover bg-center"
+                            style={imageData.placeholder ? { backgroundImage: `url(${imageData.placeholder})` } : undefined}
+                        >
+                            {(imageData.sources || []).map(source => (
+                                <source key={source.url} srcSet={source.url} type={source.type} />
+                            ))}
+                            <img
+                                src={imageData.url}
+                                alt={imageData.content}
+                                width={imageData.width}
+                                height={imageData.height}
+                                decoding="async"
+                                className="w-full h-full object-cover filter contrast-125 brightness-90 saturate-50 sepia-[.3] opacity-90"
+                            />
+                        </picture>
 
                         {/* Overlay text on hover or always visible in a corner */}
                         <div className="absolute bottom-0 left-0 w-full bg-gradient-to-t from-black via-black/80 to-transparent p-6 pt-12 opacity-80 group-hover:opacity-100 transition-opacity duration-500">
@@ -2,6 +2,8 @@
 import time
 import random
 
+from rule_tables import RuleTables
+
 # --- GAME DATA DEFINITION ---
 SECTOR_DATA = {
     0: {
@@ -470,3 +472,66 @@ SECTOR_DATA = {
     }
 }
 
+
+
+# --- GAME RULES ---
+# SECTOR_DATA 키워드 규칙의 의미:
+#   req_item / req_state : 충족되지 않으면 fail_msg를 출력하고 아무 변화 없음
+#   get_item / remove_item : 인벤토리에 추가 / 제거
+#   set_state : 현재 구역의 상태 변경 (sector_states[str(sector)])
+#   unlock : 출구 개방, action "end_*" : 엔딩 도달 (sector_states["ending"])
+#   "default" 키를 가진 규칙은 구역 상태별 하위 규칙을 가짐 (예: 터미널)
+DEFAULT_FAIL_MSG = "아무 일도 일어나지 않습니다."
+MOVE_MSG = "다음 구역으로 진입했습니다."
+UNKNOWN_MSG = "무엇을 해야 할지 모르겠습니다."
+ENDING_KEY = "ending"
+
+
+# 검증 + 이름 인턴 + 비트마스크 규칙 표 (rule_tables.py). 내용 오류가 있으면 임포트 시점에 ValueError.
+RULES = RuleTables(SECTOR_DATA, default_msg=DEFAULT_FAIL_MSG)
+
+
+def find_exit(sector, text):
+    """입력에 출구 명령('이동' 등)이 있으면 도착 구역을 반환합니다."""
+    return RULES.find_exit(sector, text)
+
+
+def apply_rule(sector, keyword, inventory, sector_states, unlocked):
+    """키워드 규칙 하나를 적용한 결과를 logic_node 반환 형식으로 돌려줍니다.
+
+    규칙은 컴파일된 표(RULES.keywords)에서 상태 id로 바로 꺼내고, 세션의 인벤토리 이름 목록은 마스크로 바꾸지 않고 그대로 다룹니다.
+    (획득 순서 유지) 목록/dict는 바뀐 경우에만 새로 만듭니다.
+    """
+    state_key = str(sector)
+    current = sector_states.get(state_key)
+    rule = RULES.keywords[sector][keyword][RULES.state_ids.get(current, 0)]
+    result = {
+        "inventory": inventory,
+        "sector_states": sector_states,
+        "unlocked": unlocked,
+        "current_sector": sector,
+        "last_action": rule.fail_msg
+    }
+    if (rule.req_name and rule.req_name not in inventory) or (rule.req_state and current != RULES.states[rule.req_state]):
+        return result
+    if rule.already_msg and rule.get_name in inventory:
+        result["last_action"] = rule.already_msg
+        return result
+
+    result["last_action"] = rule.message
+    if rule.remove_name in inventory or (rule.get_name and rule.get_name not in inventory):
+        inventory = list(inventory)
+        if rule.remove_name in inventory:
+            inventory.remove(rule.remove_name)
+        if rule.get_name and rule.get_name not in inventory:
+            inventory.append(rule.get_name)
+        result["inventory"] = inventory
+    if rule.set_state or rule.ending:
+        sector_states = dict(sector_states)
+        if rule.set_state:
+            sector_states[state_key] = RULES.states[rule.set_state]
+        if rule.ending:
+            sector_states[ENDING_KEY] = RULES.endings[rule.ending]
+        result["sector_states"] = sector_states
+    result["unlocked"] = unlocked or rule.unlock
+    return result
@@ -0,0 +1,16 @@
+"""gunicorn 설정. (실행 디렉토리의 gunicorn.conf.py는 자동으로 읽힙니다)
+
+기본으로 앱을 마스터에서 한 번 import한 뒤 워커를 fork합니다. (--preload)
+SECTOR_DATA, 컴파일된 규칙 표, 힌트 색인, 턴 파이프라인은 워커들이 copy-on-write로 공유하고,
+워커가 죽어 다시 뜰 때도 import 없이 fork만 하므로 바로 요청을 받습니다.
+"""
+import gc
+import os
+
+preload_app = os.environ.get("GUNICORN_PRELOAD", "1") != "0"
+
+
+def when_ready(server):
+    # import 시점에 만든 객체들을 GC 추적에서 빼 둡니다. 워커의 GC가 이 객체들을 훑으며 공유 페이지를 복사하게 만들지 않도록.
+    if preload_app:
+        gc.freeze()
@@ -0,0 +1,186 @@
+import threading
+from collections import deque
+
+from game_engine import SECTOR_DATA, ENDING_KEY, apply_rule, find_exit
+
+
+def _rule_variants(rule):
+    if isinstance(rule.get("default"), dict):
+        return [sub for sub in rule.values() if isinstance(sub, dict)]
+    return [rule]
+
+
+def _future_sectors(sector_data):
+    """구역마다 그 구역에서 도달 가능한 구역(자기 자신 포함)의 집합."""
+    future = {}
+
+    def visit(sector):
+        if sector not in future:
+            future[sector] = {sector}
+            for command, target in sector_data.get(sector, {}).get("exits", {}).items():
+                if command != "next" and target in sector_data:
+                    future[sector] |= visit(target)
+        return future[sector]
+
+    for sector in sector_data:
+        visit(sector)
+    return future
+
+
+class HintSolver:
+    """SECTOR_DATA 규칙 그래프를 풀어서 상태별 '최단 경로의 다음 한 수'를 색인합니다.
+
+    상태는 (구역, 앞으로 쓸 일이 있는 아이템, 현재 구역 상태, 출구 개방, 엔딩)으로 정규화합니다.
+    앞으로 어떤 규칙의 req_item도 아닌 아이템은 진행에 영향을 주지 않으므로 버립니다.
+    """
+
+    MAX_ONLINE_STATES = 100000
+
+    def __init__(self, sector_data=SECTOR_DATA):
+        self.sector_data = sector_data
+        self.commands = []
+        self._command_ids = {}
+        self.index = {}
+        self._lock = threading.Lock()
+        self._built = False
+
+        future = _future_sectors(sector_data)
+        required = {
+            sector: {
+                variant["req_item"]
+                for rule in info.get("keywords", {}).values()
+                for variant in _rule_variants(rule)
+                if variant.get("req_item")
+            }
+            for sector, info in sector_data.items()
+        }
+        self._relevant = {
+            sector: frozenset().union(*(required[s] for s in future[sector]))
+            for sector in sector_data
+        }
+
+    # --- State Encoding ---
+    def canonical(self, sector, inventory, sector_states, unlocked):
+        relevant = self._relevant.get(sector, frozenset())
+        items = tuple(sorted(item for item in set(inventory) if item in relevant))
+        return (sector, items, sector_states.get(str(sector)), bool(unlocked), sector_states.get(ENDING_KEY))
+
+    def _command_id(self, command):
+        if command not in self._command_ids:
+            self._command_ids[command] = len(self.commands)
+            self.commands.append(command)
+        return self._command_ids[command]
+
+    def _successors(self, key):
+        sector, items, sector_state, unlocked, ending = key
+        if ending is not None:
+            return
+        states = {str(sector): sector_state} if sector_state is not None else {}
+        info = self.sector_data.get(sector, {})
+        if unlocked:
+            for command, target in info.get("exits", {}).items():
+                if command != "next":
+                    yield command, self.canonical(target, items, {}, False)
+        for keyword in info.get("keywords", {}):
+            if unlocked and find_exit(sector, keyword) is not None:
+                continue  # 출구가 열린 상태에선 이동 명령으로 해석됨
+            result = apply_rule(sector, keyword, items, states, unlocked)
+            successor = self.canonical(sector, result["inventory"], result["sector_states"], result["unlocked"])
+            if successor != key:
+                yield keyword, successor
+
+    # --- Offline Build ---
+    def build(self, start=None):
+        """시작 상태에서 도달 가능한 모든 상태를 열거하고 다음 한 수를 색인합니다."""
+        if start is None:
+            start = self.canonical(0, [], {}, False)
+        edges = {}
+        queue = deque([start])
+        edges[start] = None
+        order = []
+        while queue:
+            key = queue.popleft()
+            order.append(key)
+            successors = list(self._successors(key))
+            edges[key] = successors
+            for _, successor in successors:
+                if successor not in edges:
+                    edges[successor] = None
+                    queue.append(successor)
+
+        # 엔딩 상태에서 거꾸로 BFS 하여 목표까지의 거리를 구합니다.
+        reverse = {}
+        for key, successors in edges.items():
+            for _, successor in successors:
+                reverse.setdefault(successor, []).append(key)
+        distance = {key: 0 for key in edges if key[4] is not None}
+        queue = deque(distance)
+        while queue:
+            key = queue.popleft()
+            for previous in reverse.get(key, ()):
+                if previous not in distance:
+                    distance[previous] = distance[key] + 1
+                    queue.append(previous)
+
+        index = {}
+        for key in order:
+            if key not in distance or distance[key] == 0:
+                continue
+            for command, successor in edges[key]:
+                if distance.get(successor) == distance[key] - 1:
+                    index[key] = self._command_id(command)
+                    break
+        with self._lock:
+            self.index.update(index)
+            self._built = True
+        self.reachable_states = len(edges)
+        self.distance = distance
+        return self
+
+    def _solve_online(self, start):
+        # 색인에 없는 상태 (예: 외부에서 불러온 세이브)는 그 자리에서 BFS로 풉니다.
+        parent = {start: None}
+        queue = deque([start])
+        while queue and len(parent) < self.MAX_ONLINE_STATES:
+            key = queue.popleft()
+            if key[4] is not None:
+                while parent[key] is not None and parent[key][0] != start:
+                    key = parent[key][0]
+                return parent[key][1] if parent[key] is not None else None
+            for command, successor in self._successors(key):
+                if successor not in parent:
+                    parent[successor] = (key, command)
+                    queue.append(successor)
+        return None
+
+    # --- Lookup ---
+    def next_step(self, sector, inventory, sector_states, unlocked):
+        """최단 경로의 다음 명령어. 엔딩에 도달했거나 막힌 상태면 None."""
+        if not self._built:
+            self.build()
+        key = self.canonical(sector, inventory, sector_states, unlocked)
+        command_id = self.index.get(key)
+        if command_id is not None:
+            return self.commands[command_id]
+        if key[4] is not None:
+            return None
+        command = self._solve_online(key)
+        if command is not None:
+            with self._lock:
+                self.index[key] = self._command_id(command)
+        return command
+
+
+def describe_step(command, sector, ending=None):
+    """다음 한 수를 가이드 문장으로 바꿉니다."""
+    if ending is not None:
+        return "프로토콜이 이미 실행되었습니다. 더 이상의 경로는 없습니다."
+    if command is None:
+        return "이 구역에서 더 진행할 수 있는 경로가 감지되지 않습니다."
+    if command in SECTOR_DATA.get(sector, {}).get("exits", {}):
+        return f"출구가 열려 있습니다. '{command}' 명령으로 다음 구역으로 넘어가십시오."
+    return f"'{command}'에 주목하십시오. 그것이 다음 단계입니다."
+
+
+# 규칙 그래프가 작으므로 (수백 개 상태, 수 ms) 임포트 시점에 미리 풀어 둡니다.
+hint_solver = HintSolver().build()
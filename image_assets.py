@@ -0,0 +1,71 @@
+"""구역/엔딩 이미지 URL과 흐림 placeholder.
+
+build_assets.py가 만든 매니페스트가 있으면 내용 해시가 붙은 AVIF/WebP URL(영구 캐시 가능)과 placeholder를,
+없으면 예전처럼 원본 PNG 경로를 돌려줍니다. 매니페스트는 import 시점에 한 번 읽어 이미지 블록 필드를 미리 만들어 둡니다.
+"""
+import os
+import json
+import mimetypes
+
+# --- Asset Settings ---
+ASSET_SOURCE_DIR = os.environ.get("ASSET_SOURCE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "frontend", "public", "assets"))
+ASSET_BUILD_DIR = os.environ.get("ASSET_BUILD_DIR", os.path.join(ASSET_SOURCE_DIR, "build"))
+# 클라이언트에 보낼 URL 앞부분. 백엔드나 CDN에서 받게 하려면 절대 URL로 지정합니다.
+ASSET_URL_PREFIX = os.environ.get("ASSET_URL_PREFIX", "/assets").rstrip("/")
+
+MANIFEST_PATH = os.path.join(ASSET_BUILD_DIR, "asset_manifest.json")
+MANIFEST_VERSION = 1
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# 오래된 mimetypes 표에는 없는 형식
+mimetypes.add_type("image/avif", ".avif")
+mimetypes.add_type("image/webp", ".webp")
+
+
+def load_manifest(path=MANIFEST_PATH):
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"WARNING: asset manifest {path}를 읽지 못해 원본 이미지를 씁니다. ({e})")
+        return {}
+    if manifest.get("version") != MANIFEST_VERSION:
+        print("WARNING: asset manifest 버전이 맞지 않습니다. python build_assets.py를 다시 실행하십시오.")
+        return {}
+    return manifest.get("images", {})
+
+
+class ImageAssets:
+    """이미지 키(sector_0, ending_good 등) -> UI 이미지 블록 필드."""
+
+    def __init__(self, images, url_prefix=ASSET_URL_PREFIX):
+        self.url_prefix = url_prefix
+        self._fields = {}
+        self.files = set()
+        for key, entry in images.items():
+            sources = [{"type": f"image/{fmt}", "url": f"{url_prefix}/build/{entry[fmt]}"}
+                       for fmt in ("avif", "webp") if entry.get(fmt)]
+            self.files.update(entry[fmt] for fmt in ("avif", "webp") if entry.get(fmt))
+            self._fields[key] = {
+                # url은 기존 클라이언트용 (WebP는 모든 최신 브라우저가 지원)
+                "url": sources[-1]["url"] if sources else f"{url_prefix}/{entry['source']}",
+                "sources": sources,
+                "placeholder": entry.get("placeholder", ""),
+                "width": entry.get("width"),
+                "height": entry.get("height"),
+            }
+
+    def fields(self, key):
+        fields = self._fields.get(key)
+        if fields is None:
+            return {"url": f"{self.url_prefix}/{key}.png"}
+        return fields
+
+    def is_built(self, filename):
+        """매니페스트에 있는 해시 파일인지. (이것만 영구 캐시 헤더로 내보냅니다)"""
+        return filename in self.files
+
+
+image_assets = ImageAssets(load_manifest())
@@ -0,0 +1,209 @@
+"""키워드가 그대로 들어 있지 않은 자유 입력을 구역 키워드로 풀어 주는 오프라인 해석기.
+
+logic_node는 입력에 SECTOR_DATA 키워드가 부분 문자열로 있어야만 반응하므로 "매트리스를 뒤진다"는
+실패하고 "침대"는 성공합니다. KeywordMatcher가 아무것도 찾지 못했을 때만 이 해석기를 씁니다.
+
+1) 정규화: NFC 결합, 소문자, 낱자(ㅋㅋ, ㅠㅠ)·문장부호 제거, 어절 끝 조사 제거
+2) 동의어 표(SYNONYMS)와 공백을 뺀 키워드를 부분 문자열로 찾기 (신뢰도 1.0)
+3) 자모로 분해한 문자 bigram 색인으로 어절(조사를 뗀 것 포함)마다 가장 비슷한 별칭 찾기
+   (신뢰도 = Dice 계수, 오타 허용)
+
+구역 이동은 되돌릴 수 없으므로 logic_node는 신뢰도 1.0(별칭이 그대로 들어 있음)일 때만 출구로 씁니다.
+
+구역마다 색인을 import 시점에 한 번 만들어 두며, 한 번 해석하는 데 수십 µs입니다.
+"""
+import os
+import re
+import unicodedata
+
+from game_engine import SECTOR_DATA
+from keyword_matcher import KeywordMatcher
+
+# --- Resolver Settings ---
+# n-gram 유사도가 이 값보다 낮으면 해석하지 않습니다. (0.0 ~ 1.0)
+INTENT_MIN_CONFIDENCE = float(os.environ.get("INTENT_MIN_CONFIDENCE", 0.6))
+
+# 키워드(또는 출구 명령) -> 같은 뜻으로 받아들일 표현. 한 글자 표현은 오탐이 많아 넣지 않습니다.
+# 같은 키워드가 여러 구역에 있으면 동의어도 함께 씁니다. (구역에 없는 키워드의 동의어는 무시)
+SYNONYMS = {
+    # 구역 0
+    "침대": ("매트리스", "매트", "침상", "베드", "이불", "베개"),
+    "바닥": ("마룻바닥", "땅바닥", "마루", "바닥재", "먼지"),
+    "유니폼": ("죄수복", "제복", "작업복", "수의", "옷자락"),
+    "렌즈": ("렌즈닦기", "닦기", "닦는다", "닦아"),
+    "터미널": ("컴퓨터", "단말기", "모니터", "콘솔", "화면"),
+    "철사": ("와이어", "철삿줄", "회로", "수리"),
+    "genesis": ("제네시스", "창세기"),
+    # 구역 1
+    "벽": ("벽면", "낙서", "비밀번호", "패스워드", "password"),  # 비밀번호는 벽을 읽어야 알 수 있습니다.
+    "공구함": ("공구상자", "공구 상자", "연장통", "도구함", "툴박스"),
+    "전선": ("케이블선", "전깃줄", "스파크"),
+    "인두기": ("인두", "납땜인두"),
+    "쓰레기": ("쓰레기 더미", "잡동사니", "고물", "부품 더미"),
+    "퓨즈": ("납땜", "휴즈"),
+    "패널": ("판넬", "계기판", "입력판"),
+    # 구역 2
+    "서버": ("서버랙", "냉각"),
+    "빈 깡통": ("알루미늄 캔", "빈 캔", "빈캔"),
+    "깡통": ("알루미늄", "달구기", "달군다"),
+    "얼음": ("얼음덩어리", "빙판", "녹이기", "녹인다"),
+    "파이프": ("배관", "밸브"),
+    "질소": ("액체질소", "액화질소", "붓기", "붓는다"),
+    # 구역 3
+    "쇠막대기": ("쇠막대", "막대기", "쇠몽둥이", "철봉"),
+    "크리스탈": ("크리스털", "수정", "결정"),
+    "조합": ("합치기", "합친다", "결합", "끼우기", "만들기"),
+    "장치": ("공명", "흔들기", "흔든다"),
+    # 구역 4
+    "제어판": ("컨트롤 패널", "조종판", "콘솔"),
+    "코어": ("반사", "거울", "센서"),
+    # 구역 5
+    "크레인": ("기중기", "집게"),
+    "열쇠": ("낚시", "낚아", "끌어올리기", "구역 키"),
+    # 구역 7
+    "rgb": ("빨강 초록 파랑", "빨초파", "삼원색"),
+    # 구역 8
+    "돌멩이": ("돌조각", "자갈", "조약돌"),
+    "버튼": ("비상 버튼", "단추", "스위치"),
+    # 구역 9
+    "폐기통": ("쓰레기통", "휴지통", "수거함"),
+    "검문소": ("검문", "통과", "스캐너", "바코드"),
+    # 구역 10
+    "기록": ("404호", "서가", "책장"),
+    "정숙": ("쉿", "살금살금", "발소리", "까치발"),
+    "조용": ("조용히", "소리 죽여"),
+    # 구역 11
+    "램프": ("uv", "라이트", "손전등", "자외선"),
+    "문서": ("서류", "종이", "기밀문서", "읽기"),
+    # 구역 12
+    "마이크": ("마이크로폰", "mic"),
+    "스피커": ("확성기", "앰프", "증폭기"),
+    "설치": ("배치", "놓기", "세팅", "하울링"),
+    "켜기": ("켜다", "켠다", "켜자", "전원"),
+    # 구역 13
+    "디버거": ("디버그", "디버거 총"),
+    "케이블": ("패치 케이블", "연결선"),
+    "조준": ("겨누기", "겨눈다", "겨냥", "타겟"),
+    "발사": ("쏘기", "쏜다", "사격", "방아쇠"),
+    "패치": ("수정", "연결하기", "코드 수정"),
+    # 구역 14 ("바이러스"는 구역 20의 엔딩 선택이기도 해서 동의어를 두지 않습니다)
+    "장벽": ("스캔 장벽", "게이트", "입구"),
+    # 구역 15
+    "숨기": ("숨는다", "숨어", "숨자", "은신", "그림자", "엄폐"),
+    # 구역 16
+    "배터리": ("건전지", "축전지"),
+    "스위치": ("토글", "레버"),
+    "연결": ("잇기", "접속", "연결한다"),
+    "조작": ("작동", "조종", "논리 게이트"),
+    "true": ("트루", "참이다"),
+    # 구역 17
+    "돌": ("돌멩이", "자갈"),
+    "던지기": ("던진다", "던져", "투척"),
+    "왼쪽": ("왼편", "좌측", "왼쪽으로"),
+    # 구역 18
+    "파괴": ("부수기", "부순다", "박살"),
+    "초월": ("넘어서기", "승천", "관리자 슬롯"),
+    # 구역 19
+    "점검구": ("점검 패널", "나사", "드라이버"),
+    # 구역 20
+    "페이로드": ("바이러스 페이로드",),
+    "백업": ("백업 드라이브",),
+    "복구": ("복원", "되살리기"),
+    "관리자": ("관리자 키", "어드민", "admin"),
+    # 출구 명령
+    "이동": ("앞으로", "나가기", "나간다", "나가자", "전진", "다음 구역", "들어가기", "건너가기", "건넌다"),
+}
+
+# 긴 조사부터 떼어 냅니다. ("으로"를 "로"보다 먼저)
+JOSA = tuple(sorted((
+    "으로부터", "에서부터", "으로", "에서", "에게", "한테", "까지", "부터", "처럼", "보다", "이랑", "하고",
+    "을", "를", "이", "가", "은", "는", "에", "의", "로", "와", "과", "도", "만", "랑",
+), key=len, reverse=True))
+
+_NOISE = re.compile(r"[ㄱ-ㆎ]+|[^\w\s]+")  # 홀로 쓴 자모(ㅋㅋ, ㅠㅠ)와 문장부호
+_SPACES = re.compile(r"\s+")
+
+
+def normalize(text):
+    """NFC 결합, 소문자, 낱자/문장부호 제거, 공백 정리."""
+    text = unicodedata.normalize("NFC", text).lower()
+    return _SPACES.sub(" ", _NOISE.sub(" ", text)).strip()
+
+
+def strip_josa(word):
+    """어절 끝의 조사를 하나 떼어 냅니다. 떼고 나면 아무것도 안 남는 경우는 그대로 둡니다."""
+    for josa in JOSA:
+        if len(word) > len(josa) and word.endswith(josa):
+            return word[:-len(josa)]
+    return word
+
+
+def jamo_grams(word):
+    """자모로 분해한 문자열의 bigram 집합 (앞뒤 경계 표시 포함). 한 글자 오타가 bigram 두세 개만 바꿉니다."""
+    jamo = "^" + unicodedata.normalize("NFD", word) + "$"
+    return frozenset(jamo[i:i + 2] for i in range(len(jamo) - 1))
+
+
+class SectorIndex:
+    """한 구역의 별칭(키워드, 출구 명령, 동의어) 목록과 bigram 역색인."""
+
+    __slots__ = ("aliases", "targets", "matcher", "grams", "postings")
+
+    def __init__(self, words):
+        self.targets = {}  # 공백을 뺀 정규화 별칭 -> 원래 키워드 (먼저 나온 키워드 우선)
+        for word in words:
+            for alias in (word,) + SYNONYMS.get(word, ()):
+                self.targets.setdefault(normalize(alias).replace(" ", ""), word)
+        self.targets.pop("", None)
+        self.aliases = list(self.targets)
+        self.matcher = KeywordMatcher(self.aliases)
+        self.grams = [jamo_grams(alias) for alias in self.aliases]
+        self.postings = {}
+        for index, grams in enumerate(self.grams):
+            for gram in grams:
+                self.postings.setdefault(gram, []).append(index)
+
+    def resolve(self, text, min_confidence=INTENT_MIN_CONFIDENCE):
+        words = normalize(text).split()
+        if not words:
+            return None
+        # 1) 공백·대소문자만 다른 키워드나 동의어가 들어 있으면 확정입니다. (조사는 뒤에 붙으므로 상관없음)
+        alias = self.matcher.best("".join(words))
+        if alias is not None:
+            return self.targets[alias], 1.0
+
+        # 2) 어절마다 bigram을 공유하는 별칭만 세어 Dice 계수가 가장 높은 것을 고릅니다.
+        #    한 글자 어절("나", "뭐")은 bigram이 서너 개뿐이라 아무 별칭과도 점수가 높게 나오므로 건너뜁니다.
+        best, best_score = None, 0.0
+        for word in dict.fromkeys(form for word in words for form in (word, strip_josa(word)) if len(form) > 1):
+            grams = jamo_grams(word)
+            shared = {}
+            for gram in grams:
+                for index in self.postings.get(gram, ()):
+                    shared[index] = shared.get(index, 0) + 1
+            for index, count in shared.items():
+                score = 2.0 * count / (len(grams) + len(self.grams[index]))
+                if score > best_score:
+                    best, best_score = index, score
+        if best is None or best_score < min_confidence:
+            return None
+        return self.targets[self.aliases[best]], round(best_score, 3)
+
+
+class IntentResolver:
+    """구역 번호 -> SectorIndex. resolve()는 (키워드, 신뢰도) 또는 None을 돌려줍니다."""
+
+    def __init__(self, sector_data=SECTOR_DATA):
+        self.sectors = {
+            sector: SectorIndex(list(info.get("keywords", {})) + [exit for exit in info.get("exits", {}) if exit != "next"])
+            for sector, info in sector_data.items()
+        }
+
+    def resolve(self, sector, text, min_confidence=INTENT_MIN_CONFIDENCE):
+        index = self.sectors.get(sector)
+        if index is None or not text:
+            return None
+        return index.resolve(text, min_confidence)
+
+
+intent_resolver = IntentResolver()
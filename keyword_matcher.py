@@ -0,0 +1,34 @@
+from game_engine import SECTOR_DATA
+
+
+class KeywordMatcher:
+    """구역 키워드를 우선순위 순으로 미리 정렬해 둔 매칭 테이블.
+
+    여러 키워드가 동시에 등장하면 더 긴 키워드가 이깁니다 ("더러운 렌즈" > "렌즈").
+    길이가 같으면 SECTOR_DATA에 먼저 정의된 키워드가 이깁니다.
+    우선순위 순으로 정렬되어 있으므로 처음 발견된 키워드가 곧 승자입니다.
+    """
+
+    __slots__ = ("keywords", "_ordered")
+
+    def __init__(self, keywords):
+        self.keywords = list(keywords)
+        self._ordered = tuple(sorted(self.keywords, key=lambda key: -len(key)))  # stable: 정의 순서 유지
+
+    def best(self, text):
+        """가장 우선순위가 높은 키워드를 반환합니다. 없으면 None."""
+        for key in self._ordered:
+            if key in text:
+                return key
+        return None
+
+
+def build_sector_matchers(sector_data=SECTOR_DATA):
+    """구역별 KeywordMatcher를 미리 만들어 둡니다."""
+    return {
+        sector: KeywordMatcher(info.get("keywords", {}).keys())
+        for sector, info in sector_data.items()
+    }
+
+
+SECTOR_MATCHERS = build_sector_matchers()
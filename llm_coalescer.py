@@ -0,0 +1,148 @@
+import os
+import time
+import asyncio
+import hashlib
+import threading
+
+from llm_deadline import LLMTimeout
+
+# --- Coalescing Settings ---
+LLM_COALESCE = os.environ.get("LLM_COALESCE", "1") != "0"
+
+
+def prompt_fingerprint(prompt, api_key=""):
+    """합치기 키. 다른 API 키의 호출은 합치지 않습니다. (출력 토큰은 호출한 키로 과금되므로)"""
+    digest = hashlib.blake2b(api_key.encode("utf-8"), digest_size=16)
+    digest.update(b"\0")
+    digest.update(prompt.encode("utf-8"))
+    return digest.hexdigest()
+
+
+# leader가 실패했다는 표시. 대기자는 이것을 보면 자기 호출을 직접 실행합니다.
+_FAILED = object()
+
+
+class _Flight:
+    __slots__ = ("done", "result")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = _FAILED
+
+
+class SingleFlight:
+    """같은 프롬프트로 동시에 들어온 LLM 호출을 하나로 합칩니다.
+
+    먼저 온 호출(leader)만 실제로 실행하고, 실행 중에 같은 키로 온 호출은 성공한 결과만 함께 받습니다.
+    leader가 실패하면(LLMBusy, LLMTimeout, 오류) 대기자는 예외를 넘겨받지 않고 자기 func()를 직접 실행합니다.
+    (func는 호출자마다 자기 API 키, 스케줄러 허가, deadline으로 만든 것)
+    결과를 보관하지는 않으므로 실행이 끝난 뒤의 호출은 새로 실행됩니다. (재사용은 NarrativeCache의 몫)
+    스레드 모델은 call(), asyncio 모델은 acall()을 씁니다.
+    대기자는 자기 요청의 deadline(monotonic)까지만 기다리고, 넘으면 LLMTimeout을 받습니다.
+    """
+
+    def __init__(self, enabled=LLM_COALESCE):
+        self.enabled = enabled
+        self._flights = {}
+        self._aflights = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.executed = 0
+        self.merged = 0
+        self.errors = 0
+        self.retried = 0
+
+    def _retry(self):
+        with self._lock:
+            self.retried += 1
+
+    def call(self, key, func, deadline=None):
+        if not self.enabled:
+            return func()
+        with self._lock:
+            self.calls += 1
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.executed += 1
+            else:
+                self.merged += 1
+
+        if not leader:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if not flight.done.wait(timeout):
+                raise LLMTimeout("합쳐진 LLM 호출이 마감 시각을 넘겼습니다.")
+            if flight.result is _FAILED:
+                self._retry()
+                return func()
+            return flight.result
+
+        try:
+            result = func()
+            flight.result = result
+            return result
+        except BaseException:
+            with self._lock:
+                self.errors += 1
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    async def acall(self, key, func, deadline=None):
+        """call()의 비동기 버전. func는 코루틴을 돌려주는 함수입니다."""
+        if not self.enabled:
+            return await func()
+        with self._lock:
+            self.calls += 1
+            future = self._aflights.get(key)
+            leader = future is None
+            if leader:
+                future = self._aflights[key] = asyncio.get_running_loop().create_future()
+                self.executed += 1
+            else:
+                self.merged += 1
+
+        if not leader:
+            # shield: 대기자 하나가 취소되어도 공유 결과는 취소되지 않게 합니다.
+            if deadline is None:
+                result = await asyncio.shield(future)
+            else:
+                try:
+                    result = await asyncio.wait_for(asyncio.shield(future), max(0.0, deadline - time.monotonic()))
+                except asyncio.TimeoutError:
+                    raise LLMTimeout("합쳐진 LLM 호출이 마감 시각을 넘겼습니다.")
+            if result is _FAILED:
+                self._retry()
+                return await func()
+            return result
+
+        result = _FAILED
+        try:
+            result = await func()
+            return result
+        except BaseException:
+            # 취소를 포함해 실패는 대기자에게 넘기지 않습니다. (대기자가 각자 다시 호출)
+            with self._lock:
+                self.errors += 1
+            raise
+        finally:
+            with self._lock:
+                del self._aflights[key]
+            future.set_result(result)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "calls": self.calls,
+                "executed": self.executed,
+                "merged": self.merged,
+                # 실패한 leader를 기다렸다가 다시 호출한 경우는 합쳐진 것으로 치지 않습니다.
+                "merge_rate": (self.merged - self.retried) / self.calls if self.calls else 0.0,
+                "errors": self.errors,
+                "retried": self.retried,
+                "in_flight": len(self._flights) + len(self._aflights),
+            }
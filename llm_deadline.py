@@ -0,0 +1,251 @@
+import os
+import time
+import queue
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+# --- Deadline Settings ---
+LLM_DEADLINE = float(os.environ.get("LLM_DEADLINE", 20.0))  # 요청당 LLM 대기 한도 (초)
+LLM_HEDGE = os.environ.get("LLM_HEDGE", "0") == "1"  # p95를 넘기면 같은 요청을 한 번 더 보냄
+LLM_HEDGE_MIN_SAMPLES = int(os.environ.get("LLM_HEDGE_MIN_SAMPLES", 20))
+LLM_CALL_THREADS = int(os.environ.get("LLM_CALL_THREADS", 128))
+
+LATENCY_SAMPLES = 512
+
+_END = object()  # stream()의 끝 표시
+
+
+class LLMTimeout(Exception):
+    """요청의 마감 시각까지 LLM 응답을 받지 못한 경우."""
+
+
+def request_deadline(timeout=None, now=None):
+    """라우트에서 요청의 마감 시각(monotonic)을 정합니다.
+
+    timeout은 클라이언트가 보낸 X-Request-Timeout(초) 값이며 LLM_DEADLINE보다 길 수 없습니다.
+    """
+    try:
+        budget = max(0.0, min(float(timeout), LLM_DEADLINE)) if timeout else LLM_DEADLINE
+    except ValueError:
+        budget = LLM_DEADLINE
+    return (time.monotonic() if now is None else now) + budget
+
+
+class DeadlineRunner:
+    """마감 시각 안에서만 LLM 호출을 기다리고, 선택적으로 헤지(중복) 요청을 보냅니다.
+
+    스레드 모델(call)은 호출을 전용 스레드 풀에서 실행하고 마감이 지나면 결과를 버립니다. (스레드는 강제 종료할 수 없음)
+    asyncio 모델(acall)은 마감이 지나면 태스크를 취소합니다.
+    헤지는 최근 성공 지연의 p95가 지나도록 응답이 없을 때 한 번만 보내고, 먼저 끝난 쪽을 씁니다.
+
+    스케줄러 허가: 호출자는 첫 호출의 허가를 받은 뒤 release를 넘기고, 헤지는 hedge_permit()이 참일 때만 보냅니다.
+    release는 호출(헤지 포함)마다 그 호출이 실제로 끝날 때(future 완료 콜백) 한 번씩 불리므로,
+    마감이 지나 버려진 호출도 제공자 호출이 끝날 때까지 허가를 쥐고 있습니다.
+    """
+
+    def __init__(self, hedge=LLM_HEDGE, min_samples=LLM_HEDGE_MIN_SAMPLES, threads=LLM_CALL_THREADS, clock=time.monotonic):
+        self.hedge = hedge
+        self.min_samples = min_samples
+        self.clock = clock
+        self._executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="llm-call")
+        self._latencies = deque(maxlen=LATENCY_SAMPLES)
+        self._lock = threading.Lock()
+        self.outcomes = {"ok": 0, "hedged": 0, "hedge_won": 0, "hedge_denied": 0, "timeout": 0, "error": 0}
+
+    def _count(self, outcome):
+        with self._lock:
+            self.outcomes[outcome] += 1
+
+    def _observe(self, latency):
+        with self._lock:
+            self._latencies.append(latency)
+
+    def p95(self):
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return None
+            samples = sorted(self._latencies)
+        return samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+
+    def _hedge_after(self):
+        return self.p95() if self.hedge else None
+
+    def _timed(self, func):
+        started = self.clock()
+        result = func()
+        self._observe(self.clock() - started)
+        return result
+
+    async def _atimed(self, func):
+        started = self.clock()
+        result = await func()
+        self._observe(self.clock() - started)
+        return result
+
+    def _submit(self, func, release):
+        future = self._executor.submit(self._timed, func)
+        if release is not None:
+            future.add_done_callback(lambda _: release())
+        return future
+
+    def _atask(self, func, release):
+        task = asyncio.ensure_future(self._atimed(func))
+        if release is not None:
+            task.add_done_callback(lambda _: release())
+        return task
+
+    def _may_hedge(self, hedge_permit):
+        if hedge_permit is None or hedge_permit():
+            self._count("hedged")
+            return True
+        self._count("hedge_denied")
+        return False
+
+    def call(self, func, deadline=None, hedge_permit=None, release=None):
+        """func()를 deadline(monotonic)까지 기다립니다. 넘으면 LLMTimeout."""
+        if deadline is None:
+            try:
+                return self._timed(func)
+            finally:
+                if release is not None:
+                    release()
+        primary = self._submit(func, release)
+        pending = {primary}
+        hedge_after = self._hedge_after()
+        hedged = False
+        started = self.clock()
+        error = None
+        while pending:
+            remaining = deadline - self.clock()
+            if remaining <= 0:
+                break
+            timeout = remaining
+            if hedge_after is not None and not hedged:
+                timeout = min(timeout, max(0.0, started + hedge_after - self.clock()))
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    for other in pending:
+                        other.cancel()
+                    self._count("hedge_won" if future is not primary else "ok")
+                    return future.result()
+                error = error or future.exception()
+            if not done and hedge_after is not None and not hedged:
+                hedged = True
+                if self._may_hedge(hedge_permit):
+                    pending.add(self._submit(func, release))
+            elif not pending and error is not None:
+                self._count("error")
+                raise error
+        for future in pending:
+            future.cancel()
+        self._count("timeout")
+        raise LLMTimeout("LLM 응답이 마감 시각을 넘겼습니다.")
+
+    async def acall(self, func, deadline=None, hedge_permit=None, release=None):
+        """call()의 비동기 버전. func는 코루틴을 돌려주는 함수입니다."""
+        if deadline is None:
+            try:
+                return await self._atimed(func)
+            finally:
+                if release is not None:
+                    release()
+        primary = self._atask(func, release)
+        pending = {primary}
+        hedge_after = self._hedge_after()
+        hedged = False
+        started = self.clock()
+        error = None
+        try:
+            while pending:
+                remaining = deadline - self.clock()
+                if remaining <= 0:
+                    break
+                timeout = remaining
+                if hedge_after is not None and not hedged:
+                    timeout = min(timeout, max(0.0, started + hedge_after - self.clock()))
+                done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        self._count("hedge_won" if task is not primary else "ok")
+                        return task.result()
+                    error = error or task.exception()
+                if not done and hedge_after is not None and not hedged:
+                    hedged = True
+                    if self._may_hedge(hedge_permit):
+                        pending.add(self._atask(func, release))
+                elif not pending and error is not None:
+                    self._count("error")
+                    raise error
+            self._count("timeout")
+            raise LLMTimeout("LLM 응답이 마감 시각을 넘겼습니다.")
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def stream(self, func, deadline=None, release=None):
+        """func()가 돌려주는 이터레이터를 deadline까지만 읽으며 조각을 yield합니다. 넘으면 LLMTimeout.
+
+        이터레이터는 풀 스레드에서 돌고, 조각 사이의 대기도 마감에 묶입니다.
+        소비자가 멈추면(마감, 연결 종료) 스레드는 다음 조각에서 이터레이터를 닫고 끝나며, 그때 release가 불립니다.
+        """
+        if deadline is None:
+            try:
+                yield from func()
+            finally:
+                if release is not None:
+                    release()
+            return
+        chunks = queue.Queue()
+        stop = threading.Event()
+
+        def pump():
+            iterator = iter(func())
+            try:
+                for chunk in iterator:
+                    if stop.is_set():
+                        break
+                    chunks.put((True, chunk))
+                chunks.put((True, _END))
+            except Exception as e:
+                chunks.put((False, e))
+            finally:
+                close = getattr(iterator, "close", None)
+                if close is not None:
+                    close()
+
+        future = self._executor.submit(pump)
+        if release is not None:
+            future.add_done_callback(lambda _: release())
+        try:
+            while True:
+                remaining = deadline - self.clock()
+                try:
+                    if remaining <= 0:
+                        raise queue.Empty
+                    ok, chunk = chunks.get(timeout=remaining)
+                except queue.Empty:
+                    self._count("timeout")
+                    raise LLMTimeout("LLM 스트림이 마감 시각을 넘겼습니다.")
+                if not ok:
+                    self._count("error")
+                    raise chunk
+                if chunk is _END:
+                    self._count("ok")
+                    return
+                yield chunk
+        finally:
+            stop.set()
+            future.cancel()
+
+    def stats(self):
+        p95 = self.p95()
+        with self._lock:
+            return {
+                "hedge_enabled": self.hedge,
+                "latency_p95_seconds": p95,
+                "samples": len(self._latencies),
+                **self.outcomes,
+            }
@@ -0,0 +1,75 @@
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+# --- Pool Settings ---
+LLM_POOL_SIZE = int(os.environ.get("LLM_POOL_SIZE", 256))
+LLM_POOL_IDLE_TTL = float(os.environ.get("LLM_POOL_IDLE_TTL", 600))  # seconds
+
+
+def key_fingerprint(api_key):
+    """API 키 원문 대신 풀의 키로 쓰는 해시."""
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+
+
+class LLMClientPool:
+    """API 키(해시)별로 LLM 클라이언트를 재사용하는 LRU 풀.
+
+    같은 인스턴스를 재사용하므로 인증 설정과 내부 HTTP 연결도 요청 간에 재사용됩니다.
+    """
+
+    def __init__(self, factory, max_size=LLM_POOL_SIZE, idle_ttl=LLM_POOL_IDLE_TTL, clock=time.monotonic):
+        self.factory = factory
+        self.max_size = max_size
+        self.idle_ttl = idle_ttl
+        self.clock = clock
+        # fingerprint -> (client, last_used)
+        self._clients = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self.expired = 0
+
+    def get(self, api_key):
+        fingerprint = key_fingerprint(api_key)
+        now = self.clock()
+        with self._lock:
+            entry = self._clients.get(fingerprint)
+            if entry is not None and now - entry[1] < self.idle_ttl:
+                self._clients[fingerprint] = (entry[0], now)
+                self._clients.move_to_end(fingerprint)
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                del self._clients[fingerprint]
+                self.expired += 1
+            self.misses += 1
+
+        # 생성은 락 밖에서 합니다. 같은 키로 동시에 생성되면 나중 것이 남습니다.
+        client = self.factory(api_key)
+        with self._lock:
+            # 사용 중일 수 있으므로 제거된 클라이언트를 직접 닫지 않고 GC에 맡깁니다.
+            while self._clients and now - next(iter(self._clients.values()))[1] >= self.idle_ttl:
+                self._clients.popitem(last=False)
+                self.expired += 1
+            while len(self._clients) >= self.max_size:
+                self._clients.popitem(last=False)
+                self.evicted += 1
+            self._clients[fingerprint] = (client, now)
+        return client
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._clients),
+                "capacity": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "evicted": self.evicted,
+                "expired": self.expired,
+            }
@@ -0,0 +1,245 @@
+import os
+import time
+import asyncio
+import threading
+from collections import OrderedDict, deque
+
+from llm_pool import key_fingerprint
+from metrics import LLM_QUEUE_WAIT, LLM_THROTTLED
+
+# --- Scheduler Settings ---
+LLM_RATE_PER_KEY = float(os.environ.get("LLM_RATE_PER_KEY", 1.0))  # 키당 초당 호출 수 (0이면 비활성화)
+LLM_BURST = float(os.environ.get("LLM_BURST", 4))  # 토큰 버킷 크기
+LLM_QUEUE_DEPTH = int(os.environ.get("LLM_QUEUE_DEPTH", 32))  # 키당 대기열 최대 길이
+LLM_QUEUE_BUDGET = float(os.environ.get("LLM_QUEUE_BUDGET", 3.0))  # 대기 허용 시간 (초)
+LLM_MAX_INFLIGHT = int(os.environ.get("LLM_MAX_INFLIGHT", 256))  # 전체 동시 호출 수
+
+WAIT_SAMPLES = 1024
+
+
+class LLMBusy(Exception):
+    """대기열이 가득 찼거나 대기 시간이 예산을 넘어 LLM을 호출하지 않기로 한 경우."""
+
+
+class _Waiter:
+    __slots__ = ("key", "enqueued", "granted", "wake")
+
+    def __init__(self, key, enqueued, wake):
+        self.key = key
+        self.enqueued = enqueued
+        self.granted = False
+        self.wake = wake
+
+
+class LLMScheduler:
+    """API 키별 토큰 버킷과 키 간 라운드 로빈 대기열로 LLM 호출을 허가합니다.
+
+    별도의 디스패처 스레드 없이, 대기자가 다음 토큰이 찰 시각까지 잠들었다 깨어나 스스로 배분을 다시 돌립니다.
+    스레드 모델은 acquire(), asyncio 모델은 aacquire()를 쓰고, 호출이 끝나면 release()를 부릅니다.
+    """
+
+    def __init__(self, rate=LLM_RATE_PER_KEY, burst=LLM_BURST, max_queue=LLM_QUEUE_DEPTH,
+                 budget=LLM_QUEUE_BUDGET, max_inflight=LLM_MAX_INFLIGHT, clock=time.monotonic):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.max_queue = max_queue
+        self.budget = budget
+        self.max_inflight = max_inflight
+        self.clock = clock
+        # fingerprint -> [tokens, last_refill]
+        self._buckets = {}
+        # fingerprint -> deque[_Waiter] ; 순서가 라운드 로빈 순서 (허가받은 키는 뒤로 보냄)
+        self._queues = OrderedDict()
+        self._lock = threading.Lock()
+        self.inflight = 0
+        self.granted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self._waits = deque(maxlen=WAIT_SAMPLES)
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    @property
+    def enabled(self):
+        return self.rate > 0
+
+    # --- Core (호출자가 self._lock을 잡은 상태) ---
+    def _tokens(self, key, now):
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [self.burst, now]
+        else:
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+        return bucket
+
+    def _dispatch(self, now):
+        """허가할 수 있는 대기자를 라운드 로빈으로 깨우고, 다음 토큰까지 남은 시간을 돌려줍니다."""
+        next_ready = None
+        progressed = True
+        while progressed and self.inflight < self.max_inflight:
+            progressed = False
+            for key in list(self._queues):
+                queue = self._queues[key]
+                bucket = self._tokens(key, now)
+                if bucket[0] < 1.0:
+                    eta = (1.0 - bucket[0]) / self.rate
+                    next_ready = eta if next_ready is None else min(next_ready, eta)
+                    continue
+                waiter = queue.popleft()
+                bucket[0] -= 1.0
+                self.inflight += 1
+                self._record_grant(waiter, now)
+                if queue:
+                    self._queues.move_to_end(key)
+                else:
+                    del self._queues[key]
+                progressed = True
+                if self.inflight >= self.max_inflight:
+                    break
+        # 버킷이 가득 찬 키는 정리합니다. (처음 쓰는 키는 가득 찬 버킷으로 시작하므로 동작은 같음)
+        if len(self._buckets) > 4 * (len(self._queues) + self.max_inflight):
+            for key in [k for k, b in self._buckets.items() if k not in self._queues and b[0] >= self.burst]:
+                del self._buckets[key]
+        return next_ready
+
+    def _record_grant(self, waiter, now):
+        waiter.granted = True
+        wait = now - waiter.enqueued
+        self.granted += 1
+        self._waits.append(wait)
+        self.wait_total += wait
+        self.wait_max = max(self.wait_max, wait)
+        LLM_QUEUE_WAIT.observe(wait, "granted")
+        waiter.wake()
+
+    def _enqueue(self, api_key, wake):
+        key = key_fingerprint(api_key)
+        now = self.clock()
+        queue = self._queues.get(key)
+        if queue is not None and len(queue) >= self.max_queue:
+            self.rejected += 1
+            LLM_THROTTLED.inc("queue_full")
+            raise LLMBusy("LLM 대기열이 가득 찼습니다.")
+        waiter = _Waiter(key, now, wake)
+        if queue is None:
+            queue = self._queues[key] = deque()
+        queue.append(waiter)
+        return waiter, self._dispatch(now)
+
+    def _remove(self, waiter):
+        queue = self._queues.get(waiter.key)
+        if queue is not None:
+            queue.remove(waiter)
+            if not queue:
+                del self._queues[waiter.key]
+
+    def _abandon(self, waiter):
+        # 예산 초과. 그 사이에 허가되었다면 그대로 씁니다.
+        if waiter.granted:
+            return True
+        self._remove(waiter)
+        self.timed_out += 1
+        LLM_QUEUE_WAIT.observe(self.clock() - waiter.enqueued, "timed_out")
+        LLM_THROTTLED.inc("budget")
+        return False
+
+    # --- Public API ---
+    def acquire(self, api_key, budget=None):
+        """허가를 받을 때까지 기다립니다. 예산 안에 허가받지 못하면 LLMBusy."""
+        if not self.enabled:
+            return
+        budget = self.budget if budget is None else budget
+        event = threading.Event()
+        with self._lock:
+            waiter, next_ready = self._enqueue(api_key, event.set)
+        deadline = waiter.enqueued + budget
+        while not waiter.granted:
+            remaining = deadline - self.clock()
+            if remaining <= 0:
+                with self._lock:
+                    if self._abandon(waiter):
+                        return
+                raise LLMBusy("LLM 대기 시간이 예산을 초과했습니다.")
+            event.wait(min(remaining, next_ready) if next_ready is not None else remaining)
+            with self._lock:
+                if not waiter.granted:
+                    next_ready = self._dispatch(self.clock())
+
+    async def aacquire(self, api_key, budget=None):
+        """acquire()의 비동기 버전."""
+        if not self.enabled:
+            return
+        budget = self.budget if budget is None else budget
+        loop = asyncio.get_running_loop()
+        event = asyncio.Event()
+        with self._lock:
+            waiter, next_ready = self._enqueue(api_key, lambda: loop.call_soon_threadsafe(event.set))
+        deadline = waiter.enqueued + budget
+        while not waiter.granted:
+            remaining = deadline - self.clock()
+            if remaining <= 0:
+                with self._lock:
+                    if self._abandon(waiter):
+                        return
+                raise LLMBusy("LLM 대기 시간이 예산을 초과했습니다.")
+            try:
+                await asyncio.wait_for(event.wait(), min(remaining, next_ready) if next_ready is not None else remaining)
+            except asyncio.TimeoutError:
+                pass
+            except asyncio.CancelledError:
+                # 요청 자체가 취소됨: 허가를 이미 받았다면 돌려놓습니다.
+                with self._lock:
+                    if waiter.granted:
+                        self.inflight -= 1
+                        self._dispatch(self.clock())
+                    else:
+                        self._remove(waiter)
+                raise
+            with self._lock:
+                if not waiter.granted:
+                    next_ready = self._dispatch(self.clock())
+
+    def try_acquire(self, api_key):
+        """기다리지 않고 허가를 받아 봅니다. (헤지용) 같은 키의 대기자를 앞지르지 않습니다."""
+        if not self.enabled:
+            return True
+        key = key_fingerprint(api_key)
+        with self._lock:
+            now = self.clock()
+            if key in self._queues or self.inflight >= self.max_inflight or self._tokens(key, now)[0] < 1.0:
+                LLM_THROTTLED.inc("hedge_denied")
+                return False
+            bucket = self._buckets[key]
+            bucket[0] -= 1.0
+            self.inflight += 1
+            self.granted += 1
+            self._waits.append(0.0)
+            return True
+
+    def release(self):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.inflight -= 1
+            self._dispatch(self.clock())
+
+    def stats(self):
+        with self._lock:
+            waits = sorted(self._waits)
+            return {
+                "enabled": self.enabled,
+                "rate_per_key": self.rate,
+                "burst": self.burst,
+                "queue_budget_seconds": self.budget,
+                "queued": sum(len(queue) for queue in self._queues.values()),
+                "queued_keys": len(self._queues),
+                "inflight": self.inflight,
+                "granted": self.granted,
+                "rejected": self.rejected,
+                "timed_out": self.timed_out,
+                "wait_avg_seconds": self.wait_total / self.granted if self.granted else 0.0,
+                "wait_p50_seconds": waits[len(waits) // 2] if waits else 0.0,
+                "wait_p95_seconds": waits[min(len(waits) - 1, int(len(waits) * 0.95))] if waits else 0.0,
+                "wait_max_seconds": self.wait_max,
+            }
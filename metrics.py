@@ -0,0 +1,224 @@
+"""Prometheus 텍스트 형식(/api/metrics)으로 내보내는 프로세스 내 지표.
+
+라우트별 요청 지연, 노드(logic/narrative/hint)별 지연 히스토그램, LLM 요청 결과와 토큰 수,
+오류 수, 활성 세션 수, 대화 기록 크기를 모읍니다. 지표는 프로세스(워커)마다 따로 쌓입니다.
+"""
+import os
+import time
+import asyncio
+import threading
+import functools
+
+# --- Metrics Settings ---
+# 기본으로 로컬(127.0.0.1, ::1)에서 온 요청에만 /api/metrics를 보여 줍니다.
+METRICS_PUBLIC = os.environ.get("METRICS_PUBLIC", "0") == "1"
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+NODE_BUCKETS = (0.0001, 0.0005) + LATENCY_BUCKETS  # logic 노드는 수 µs라 아래쪽 경계를 더 둡니다.
+COUNT_BUCKETS = (1, 2, 5, 10, 15, 20, 30, 50, 100)
+BYTE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144)
+LOCAL_ADDRESSES = {"127.0.0.1", "::1", "localhost"}
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=""):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = labelnames
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels):
+        with self._lock:
+            return self._values.get(labels, 0)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}")
+        return lines
+
+
+class Histogram:
+    """누적 버킷 히스토그램. 라벨 조합마다 [버킷별 개수..., 합계, 개수]를 둡니다."""
+
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def count(self, *labels):
+        with self._lock:
+            series = self._series.get(labels)
+            return series[-1] if series else 0
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = sorted((labels, list(series)) for labels, series in self._series.items())
+        for labels, series in snapshot:
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                le = 'le="%s"' % _number(bound)
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            # 마지막 경계보다 큰 값은 +Inf 버킷(= 전체 개수)에만 들어갑니다.
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {series[-1]}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(series[-2])}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {series[-1]}")
+        return lines
+
+
+class Gauge:
+    """읽을 때 콜백으로 값을 구하는 게이지. (세션 수처럼 다른 객체가 이미 아는 값)"""
+
+    def __init__(self, name, help_text, func):
+        self.name = name
+        self.help = help_text
+        self.func = func
+
+    def render(self):
+        try:
+            value = self.func()
+        except Exception:
+            return []
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge", f"{self.name} {_number(value)}"]
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._register(Counter(name, help_text, labelnames))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._register(Histogram(name, help_text, labelnames, buckets))
+
+    def gauge(self, name, help_text, func):
+        return self._register(Gauge(name, help_text, func))
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+REQUEST_SECONDS = metrics.histogram(
+    "game_http_request_duration_seconds", "HTTP request latency by route.", ("route", "method", "status"))
+NODE_SECONDS = metrics.histogram(
+    "game_node_duration_seconds", "Turn pipeline node latency.", ("node",), buckets=NODE_BUCKETS)
+LLM_REQUESTS = metrics.counter(
+    "game_llm_requests_total", "LLM-backed node results by outcome (ok, cached, busy, timeout, error, no_key).", ("kind", "outcome"))
+LLM_PROVIDER_CALLS = metrics.counter(
+    "game_llm_provider_calls_total", "Calls that actually reached the model provider (after coalescing, including hedges).")
+LLM_TOKENS = metrics.counter(
+    "game_llm_tokens_total", "Tokens reported by the model provider.", ("direction",))
+ERRORS = metrics.counter(
+    "game_errors_total", "Errors caught and logged, by where they were caught.", ("source",))
+RESPONSE_BYTES = metrics.histogram(
+    "game_http_response_bytes", "JSON response body bytes sent, by route and content encoding.", ("route", "encoding"), buckets=BYTE_BUCKETS)
+ENCODE_SECONDS = metrics.histogram(
+    "game_response_encode_seconds", "JSON response encode and compression time, by stage (orjson/json, gzip/br).", ("stage",), buckets=NODE_BUCKETS)
+LLM_QUEUE_WAIT = metrics.histogram(
+    "game_llm_queue_wait_seconds", "Time LLM calls waited in the per-key scheduler, by how the wait ended (granted, timed_out).", ("outcome",))
+LLM_THROTTLED = metrics.counter(
+    "game_llm_throttled_total", "LLM calls the per-key scheduler refused, by reason (queue_full, budget, hedge_denied).", ("reason",))
+INTENT_FALLBACKS = metrics.counter(
+    "game_intent_fallback_total", "Commands without an exact keyword, by local intent resolver outcome (resolved, miss).", ("outcome",))
+HISTORY_MESSAGES = metrics.histogram(
+    "game_session_messages", "Number of messages in state['messages'] when a response is built.", buckets=COUNT_BUCKETS)
+HISTORY_BYTES = metrics.histogram(
+    "game_session_messages_bytes", "UTF-8 size of state['messages'] contents when a response is built.", buckets=BYTE_BUCKETS)
+
+
+def timed_node(name):
+    """노드 함수(동기/비동기)의 실행 시간을 NODE_SECONDS에 기록하는 데코레이터."""
+    def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    NODE_SECONDS.observe(time.perf_counter() - started, name)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                NODE_SECONDS.observe(time.perf_counter() - started, name)
+        return wrapper
+    return decorator
+
+
+def record_llm_usage(message):
+    """모델 응답(또는 스트림 조각)의 usage_metadata에서 토큰 수를 더합니다."""
+    usage = getattr(message, "usage_metadata", None)
+    if usage:
+        LLM_TOKENS.inc("prompt", amount=usage.get("input_tokens", 0))
+        LLM_TOKENS.inc("response", amount=usage.get("output_tokens", 0))
+
+
+def observe_history(messages):
+    HISTORY_MESSAGES.observe(len(messages))
+    HISTORY_BYTES.observe(sum(len(msg.content.encode("utf-8")) for msg in messages if isinstance(msg.content, str)))
+
+
+def is_local(address):
+    return METRICS_PUBLIC or address in LOCAL_ADDRESSES
@@ -0,0 +1,105 @@
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+# --- Cache Settings ---
+NARRATIVE_CACHE_SIZE = int(os.environ.get("NARRATIVE_CACHE_SIZE", 4096))  # 0이면 비활성화
+NARRATIVE_CACHE_TTL = float(os.environ.get("NARRATIVE_CACHE_TTL", 3600))  # seconds
+NARRATIVE_CACHE_VARIANTS = int(os.environ.get("NARRATIVE_CACHE_VARIANTS", 3))
+
+
+def _normalize(text):
+    return " ".join(str(text).split())
+
+
+def narrative_fingerprint(location_name, location_desc, inventory, action_result):
+    """SCENARIO_PROMPT 입력값의 정규화된 지문. (인벤토리 순서와 공백 차이는 무시)"""
+    parts = [_normalize(location_name), _normalize(location_desc), "\x1f".join(sorted(inventory)), _normalize(action_result)]
+    return hashlib.blake2b("\x1e".join(parts).encode("utf-8"), digest_size=16).hexdigest()
+
+
+class NarrativeCache:
+    """결정적인 게임 문맥별로 생성된 내레이션을 보관하는 LRU + TTL 캐시.
+
+    키마다 variants번의 생성 결과를 모으고, 다 모이면 서로 다른 텍스트 사이를 돌아가며 반환합니다.
+    다 모이기 전까지는 miss로 처리해 LLM이 새 변형을 만들게 합니다.
+    같은 텍스트가 다시 와도 한 번의 생성으로 세므로, 늘 같은 답을 내는 모델도 결국 hit이 됩니다.
+    """
+
+    def __init__(self, max_keys=NARRATIVE_CACHE_SIZE, ttl=NARRATIVE_CACHE_TTL, variants=NARRATIVE_CACHE_VARIANTS, clock=time.monotonic):
+        self.max_keys = max_keys
+        self.ttl = ttl
+        self.variants = max(1, variants)
+        self.clock = clock
+        # key -> [created_at, texts, next_index, generations]
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evicted = 0
+        self.expired = 0
+
+    @property
+    def enabled(self):
+        return self.max_keys > 0
+
+    def get(self, key):
+        if not self.enabled:
+            return None
+        now = self.clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[0] >= self.ttl:
+                del self._entries[key]
+                self.expired += 1
+                entry = None
+            if entry is None or entry[3] < self.variants:
+                self.misses += 1
+                return None
+            texts = entry[1]
+            text = texts[entry[2] % len(texts)]
+            entry[2] += 1
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return text
+
+    def add(self, key, text):
+        if not self.enabled:
+            return
+        now = self.clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[0] >= self.ttl:
+                del self._entries[key]
+                self.expired += 1
+                entry = None
+            if entry is None:
+                while len(self._entries) >= self.max_keys:
+                    self._entries.popitem(last=False)
+                    self.evicted += 1
+                entry = self._entries[key] = [now, [], 0, 0]
+            if entry[3] < self.variants:
+                entry[3] += 1
+                # 중복 텍스트는 생성 횟수에만 더하고 변형 목록에는 한 번만 둡니다.
+                if text not in entry[1]:
+                    entry[1].append(text)
+                    self.stores += 1
+            self._entries.move_to_end(key)
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "keys": len(self._entries),
+                "capacity": self.max_keys,
+                "variants_per_key": self.variants,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "stores": self.stores,
+                "evicted": self.evicted,
+                "expired": self.expired,
+            }
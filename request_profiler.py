@@ -0,0 +1,187 @@
+"""요청 단위 프로파일링 (기본 꺼짐).
+
+관리자 헤더(X-Profile-Token == PROFILE_ADMIN_TOKEN) 또는 표본 비율(PROFILE_SAMPLE_RATE)로 켜진 요청만
+라우트 -> process_action -> 파이프라인 노드 -> LLM 구간의 벽시계 시간(span)과 cProfile 호출 프로파일을 모아
+PROFILE_DIR에 파일로 남깁니다.
+
+    <id>.folded      span 스택별 자기 시간(µs). flamegraph.pl / speedscope / inferno에 바로 넣을 수 있는 collapsed 형식
+    <id>.trace.json  Chrome trace 이벤트. chrome://tracing, Perfetto, speedscope에서 타임라인으로 봅니다.
+    <id>.prof        cProfile 통계 (동기 서버만). snakeviz, flameprof 등으로 봅니다.
+
+꺼져 있으면 span()은 컨텍스트 변수 하나를 읽고 공용 no-op 객체를 돌려줄 뿐입니다.
+"""
+import os
+import hmac
+import json
+import time
+import random
+import asyncio
+import cProfile
+import tempfile
+import functools
+import itertools
+import threading
+import contextvars
+
+# --- Profiling Settings ---
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", 0.0))  # 0.0 ~ 1.0
+PROFILE_ADMIN_TOKEN = os.environ.get("PROFILE_ADMIN_TOKEN", "")  # 비어 있으면 헤더로 켤 수 없음
+PROFILE_DIR = os.environ.get("PROFILE_DIR", os.path.join(tempfile.gettempdir(), "digital_prison_profiles"))
+
+PROFILE_HEADER = "X-Profile-Token"
+PROFILE_ID_HEADER = "X-Profile-Id"
+
+_current = contextvars.ContextVar("request_profile", default=None)
+_stack = contextvars.ContextVar("request_profile_stack", default=())
+_ids = itertools.count(1)
+
+
+class RequestProfile:
+    """프로파일 중인 요청 하나. span 기록은 (스택, 시작, 끝, 스레드) 튜플 목록입니다."""
+
+    def __init__(self, name, use_cprofile=True):
+        self.name = name
+        self.id = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{next(_ids)}"
+        self.spans = []
+        self._lock = threading.Lock()
+        self.profiler = None
+        if use_cprofile:
+            try:
+                self.profiler = cProfile.Profile()
+                self.profiler.enable()
+            except ValueError:
+                # 같은 스레드에서 이미 다른 프로파일러가 돌고 있으면 span만 모읍니다.
+                self.profiler = None
+        self.started = time.perf_counter()
+        self.ended = None
+
+    def record(self, stack, started, ended):
+        with self._lock:
+            self.spans.append((stack, started, ended, threading.get_ident()))
+
+    def stop(self):
+        self.ended = time.perf_counter()
+        if self.profiler is not None:
+            self.profiler.disable()
+
+    # --- Output ---
+    def folded(self):
+        """스택별 자기 시간(µs). 자식 span 시간을 뺀 값이며, 병렬 자식(헤지 등) 때문에 음수가 되면 0으로 둡니다."""
+        totals = {(self.name,): self.ended - self.started}
+        for stack, started, ended, _ in self.spans:
+            key = (self.name,) + stack
+            totals[key] = totals.get(key, 0.0) + (ended - started)
+        children = {}
+        for key, total in totals.items():
+            if len(key) > 1:
+                children[key[:-1]] = children.get(key[:-1], 0.0) + total
+        lines = []
+        for key, total in totals.items():
+            self_us = int(max(0.0, total - children.get(key, 0.0)) * 1e6)
+            if self_us:
+                lines.append(f"{';'.join(key)} {self_us}")
+        return "\n".join(lines) + "\n"
+
+    def trace_events(self):
+        pid = os.getpid()
+        origin = self.started
+        events = [{"name": self.name, "ph": "X", "ts": 0, "dur": (self.ended - origin) * 1e6,
+                   "pid": pid, "tid": threading.get_ident()}]
+        for stack, started, ended, tid in self.spans:
+            events.append({"name": stack[-1], "ph": "X", "ts": (started - origin) * 1e6, "dur": (ended - started) * 1e6,
+                           "pid": pid, "tid": tid, "args": {"stack": ";".join(stack)}})
+        return {"traceEvents": events, "displayTimeUnit": "ms", "otherData": {"request": self.name, "id": self.id}}
+
+    def dump(self, directory=PROFILE_DIR):
+        try:
+            os.makedirs(directory, exist_ok=True)
+            base = os.path.join(directory, self.id)
+            with open(base + ".folded", "w", encoding="utf-8") as f:
+                f.write(self.folded())
+            with open(base + ".trace.json", "w", encoding="utf-8") as f:
+                json.dump(self.trace_events(), f)
+            if self.profiler is not None:
+                self.profiler.dump_stats(base + ".prof")
+            print(f"PROFILE SAVED: {base}.* ({self.name}, {(self.ended - self.started) * 1000:.1f} ms)")
+        except OSError as e:
+            print(f"PROFILE DUMP ERROR: {e}")
+
+
+class _Span:
+    __slots__ = ("profile", "name", "token", "started")
+
+    def __init__(self, profile, name):
+        self.profile = profile
+        self.name = name
+
+    def __enter__(self):
+        self.token = _stack.set(_stack.get() + (self.name,))
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        ended = time.perf_counter()
+        self.profile.record(_stack.get(), self.started, ended)
+        _stack.reset(self.token)
+        return False
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NO_SPAN = _NoSpan()
+
+
+def span(name):
+    """현재 요청이 프로파일 중이면 구간을 기록하는 컨텍스트 매니저, 아니면 no-op."""
+    profile = _current.get()
+    if profile is None:
+        return NO_SPAN
+    return _Span(profile, name)
+
+
+def traced(name):
+    """함수(동기/비동기) 전체를 span으로 감싸는 데코레이터."""
+    def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def wanted(token=None, sample_rate=PROFILE_SAMPLE_RATE):
+    if token and PROFILE_ADMIN_TOKEN and hmac.compare_digest(token, PROFILE_ADMIN_TOKEN):
+        return True
+    return sample_rate > 0 and random.random() < sample_rate
+
+
+def start(name, token=None, use_cprofile=True):
+    """요청 시작 시 호출합니다. 프로파일하지 않을 요청이면 None. (돌려받은 값을 finish에 넘깁니다)"""
+    if not wanted(token):
+        return None
+    profile = RequestProfile(name, use_cprofile)
+    return profile, _current.set(profile)
+
+
+def finish(handle):
+    """프로파일을 멈추고 RequestProfile을 돌려줍니다. 파일 기록(dump)은 응답을 보낸 뒤에 하면 됩니다."""
+    profile, token = handle
+    profile.stop()
+    _current.reset(token)
+    return profile
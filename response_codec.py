@@ -0,0 +1,96 @@
+"""API 응답 본문 인코딩.
+
+JSON은 orjson이 설치되어 있으면 orjson으로, 없으면 표준 json으로 (공백 없이, UTF-8 그대로) 직렬화합니다.
+COMPRESS_MIN_BYTES 이상인 응답은 클라이언트의 Accept-Encoding에 따라 brotli(설치된 경우) 또는 gzip으로 압축합니다.
+응답마다 보낸 바이트 수와 인코딩/압축 시간을 지표로 남기고 Server-Timing 헤더로 돌려줍니다.
+"""
+import os
+import json
+import gzip
+import time
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+from metrics import RESPONSE_BYTES, ENCODE_SECONDS
+from request_profiler import span
+
+# --- Encoding Settings ---
+# 이보다 작은 응답은 압축하지 않습니다. (작은 JSON은 압축 이득보다 CPU 비용이 큼)
+COMPRESS_MIN_BYTES = int(os.environ.get("COMPRESS_MIN_BYTES", 1024))
+# 응답마다 새로 압축하므로 속도 쪽 설정을 기본으로 씁니다.
+GZIP_LEVEL = int(os.environ.get("GZIP_LEVEL", 5))
+BROTLI_QUALITY = int(os.environ.get("BROTLI_QUALITY", 4))
+
+JSON_BACKEND = "orjson" if orjson is not None else "json"
+
+
+def dumps(obj):
+    """obj -> UTF-8 JSON bytes."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            pass  # orjson이 모르는 타입: 표준 json의 오류 메시지를 그대로 받도록 아래로
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def accepted_encoding(header):
+    """Accept-Encoding에서 쓸 압축 방식. br을 gzip보다 우선하며 q=0은 거절로 봅니다. 없으면 None."""
+    if not header:
+        return None
+    offered = {}
+    for part in header.split(","):
+        name, _, params = part.partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        offered[name.strip().lower()] = quality
+    if brotli is not None and offered.get("br", 0) > 0:
+        return "br"
+    if offered.get("gzip", offered.get("*", 0)) > 0:
+        return "gzip"
+    return None
+
+
+def compress(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def finish(body, accept_encoding, encode_seconds, route):
+    """인코딩된 JSON 본문을 보낼 형태로 만듭니다.
+
+    (본문, 압축 방식 또는 None, 추가 헤더 [(이름, 값)])을 돌려주고 크기/시간 지표를 기록합니다.
+    """
+    encoding = accepted_encoding(accept_encoding) if len(body) >= COMPRESS_MIN_BYTES else None
+    timing = f"encode;dur={encode_seconds * 1000:.3f}"
+    ENCODE_SECONDS.observe(encode_seconds, JSON_BACKEND)
+    if encoding is not None:
+        started = time.perf_counter()
+        with span("compress"):
+            compressed = compress(body, encoding)
+        compress_seconds = time.perf_counter() - started
+        ENCODE_SECONDS.observe(compress_seconds, encoding)
+        timing += f", compress;dur={compress_seconds * 1000:.3f}"
+        if len(compressed) < len(body):
+            body = compressed
+        else:
+            encoding = None
+    RESPONSE_BYTES.observe(len(body), route, encoding or "identity")
+
+    headers = [("Vary", "Accept-Encoding"), ("Server-Timing", timing)]
+    if encoding is not None:
+        headers.append(("Content-Encoding", encoding))
+    return body, encoding, headers
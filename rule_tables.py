@@ -0,0 +1,250 @@
+"""SECTOR_DATA를 검증하고 정수/비트마스크 기반의 규칙 표로 컴파일합니다.
+
+아이템과 구역 상태 이름은 작은 정수로 인턴되고, 인벤토리는 비트마스크, 구역 상태는 구역별 상태 id 배열로 다룹니다.
+게임 상태 전체(구역, 인벤토리, 구역 상태, 출구 개방, 엔딩)는 pack()으로 정수 하나(기계어 몇 워드)에 담깁니다.
+"""
+
+RULE_FIELDS = {"msg", "msg_success", "fail_msg", "req_item", "req_state", "get_item", "remove_item",
+               "set_state", "unlock", "action", "once", "state"}
+SECTOR_FIELDS = {"name", "desc", "short_desc", "img_key", "keywords", "exits"}
+NO_STATE = 0
+STATE_BITS = 4  # 구역당 상태 id 폭 (상태 이름 15개까지)
+
+
+class Rule:
+    """키워드 규칙 하나를 미리 풀어 둔 레코드.
+
+    아이템은 비트(req_item 등, RuleTables.apply용)와 이름(req_name 등, 세션의 이름 목록을 그대로 다루는 apply_rule용)을 함께 가집니다.
+    """
+
+    __slots__ = ("req_item", "req_state", "fail_msg", "message", "get_item", "remove_item",
+                 "set_state", "unlock", "ending", "already_msg", "req_name", "get_name", "remove_name")
+
+    def __init__(self, req_item, req_state, fail_msg, message, get_item, remove_item, set_state, unlock, ending, already_msg,
+                 req_name=None, get_name=None, remove_name=None):
+        self.req_item = req_item
+        self.req_state = req_state
+        self.fail_msg = fail_msg
+        self.message = message
+        self.get_item = get_item
+        self.remove_item = remove_item
+        self.set_state = set_state
+        self.unlock = unlock
+        self.ending = ending
+        self.already_msg = already_msg
+        self.req_name = req_name
+        self.get_name = get_name
+        self.remove_name = remove_name
+
+
+class RuleTables:
+    """컴파일된 규칙 표.
+
+    keywords[sector][keyword]는 구역 상태 id로 인덱싱하는 Rule 튜플입니다. (상태별 하위 규칙이 없으면 모두 같은 Rule)
+    """
+
+    def __init__(self, sector_data, default_msg=""):
+        self.default_msg = default_msg
+        self.items = []
+        self.item_bits = {}
+        self.states = [None]
+        self.state_ids = {None: NO_STATE}
+        self.endings = [None]
+        self.ending_ids = {None: 0}
+        self.warnings = []
+        self.sectors = sorted(sector_data)
+        self.sector_index = {sector: i for i, sector in enumerate(self.sectors)}
+        self._validate(sector_data)
+
+        # 이름을 먼저 모두 인턴한 뒤 규칙을 내립니다. (상태 표 길이가 정해져야 하므로)
+        for sector in self.sectors:
+            for rule in sector_data[sector]["keywords"].values():
+                for state_name, variant in self._variants(rule):
+                    self._state_id(state_name)
+                    for field in ("req_item", "get_item", "remove_item"):
+                        if variant.get(field):
+                            self._item_bit(variant[field])
+                    for field in ("req_state", "set_state"):
+                        self._state_id(variant.get(field))
+        if len(self.states) >= 1 << STATE_BITS:
+            raise ValueError(f"구역 상태 이름이 너무 많습니다: {len(self.states) - 1}")
+
+        self.keywords = {
+            sector: {keyword: self._lower(rule) for keyword, rule in sector_data[sector]["keywords"].items()}
+            for sector in self.sectors
+        }
+        # 출구: (명령어, 도착 구역) 목록. 'next'는 진행 순서 표시용이라 명령어가 아닙니다.
+        self.exits = {
+            sector: tuple((command, target) for command, target in sector_data[sector].get("exits", {}).items() if command != "next")
+            for sector in self.sectors
+        }
+        self._check_reachability(sector_data)
+
+    # --- Interning ---
+    def _item_bit(self, name):
+        if name not in self.item_bits:
+            self.item_bits[name] = 1 << len(self.items)
+            self.items.append(name)
+        return self.item_bits[name]
+
+    def _state_id(self, name):
+        if name not in self.state_ids:
+            self.state_ids[name] = len(self.states)
+            self.states.append(name)
+        return self.state_ids[name]
+
+    def _ending_id(self, name):
+        if name not in self.ending_ids:
+            self.ending_ids[name] = len(self.endings)
+            self.endings.append(name)
+        return self.ending_ids[name]
+
+    @staticmethod
+    def _variants(rule):
+        """(상태 이름, 하위 규칙) 목록. 'default' 하위 규칙은 상태 이름 None."""
+        if isinstance(rule.get("default"), dict):
+            return [(None if name == "default" else name, sub) for name, sub in rule.items() if isinstance(sub, dict)]
+        return [(None, rule)]
+
+    # --- Compile ---
+    def _record(self, variant):
+        message = variant.get("msg_success", variant.get("msg", self.default_msg))
+        action = variant.get("action", "")
+        get_item = self.item_bits.get(variant.get("get_item"), 0)
+        # 상태를 바꾸지 않고 아이템만 주는 규칙은 이미 가진 경우 "이미 ..." 메시지로 끝납니다.
+        guarded = get_item and not (variant.get("unlock") or variant.get("set_state") or variant.get("remove_item"))
+        return Rule(
+            req_item=self.item_bits.get(variant.get("req_item"), 0),
+            req_state=self.state_ids[variant.get("req_state")],
+            fail_msg=variant.get("fail_msg", self.default_msg),
+            message=message,
+            get_item=get_item,
+            remove_item=self.item_bits.get(variant.get("remove_item"), 0),
+            set_state=self.state_ids[variant.get("set_state")],
+            unlock=bool(variant.get("unlock")),
+            ending=self._ending_id(action[len("end_"):]) if action.startswith("end_") else 0,
+            already_msg=f"이미 [{variant['get_item']}]을(를) 가지고 있습니다." if guarded else None,
+            req_name=variant.get("req_item") or None,
+            get_name=variant.get("get_item") or None,
+            remove_name=variant.get("remove_item") or None,
+        )
+
+    def _lower(self, rule):
+        variants = dict(self._variants(rule))
+        default = self._record(variants[None])
+        table = [default] * len(self.states)
+        for state_name, variant in variants.items():
+            if state_name is not None:
+                table[self.state_ids[state_name]] = self._record(variant)
+        return tuple(table)
+
+    # --- Validation ---
+    def _validate(self, sector_data):
+        for sector, info in sector_data.items():
+            where = f"SECTOR_DATA[{sector}]"
+            unknown = set(info) - SECTOR_FIELDS
+            if unknown:
+                raise ValueError(f"{where}: 알 수 없는 필드 {sorted(unknown)}")
+            if not isinstance(info.get("keywords"), dict):
+                raise ValueError(f"{where}: keywords가 없습니다.")
+            for command, target in info.get("exits", {}).items():
+                if target not in sector_data:
+                    raise ValueError(f"{where}: 출구 '{command}'의 도착 구역 {target}이(가) 없습니다.")
+            for keyword, rule in info["keywords"].items():
+                if not isinstance(rule, dict):
+                    raise ValueError(f"{where}['{keyword}']: 규칙은 dict여야 합니다.")
+                for state_name, variant in self._variants(rule):
+                    unknown = set(variant) - RULE_FIELDS
+                    if unknown:
+                        raise ValueError(f"{where}['{keyword}']: 알 수 없는 필드 {sorted(unknown)}")
+
+    def _check_reachability(self, sector_data):
+        # 내용상의 문제(막힌 경로 등)는 오류가 아니라 경고로 모읍니다.
+        granted = 0
+        required = {}
+        for sector in self.sectors:
+            for keyword, table in self.keywords[sector].items():
+                for rule in set(table):
+                    granted |= rule.get_item
+                    if rule.req_item:
+                        required.setdefault(rule.req_item, []).append((sector, keyword))
+        for bit, uses in required.items():
+            if not granted & bit:
+                name = self.items[bit.bit_length() - 1]
+                where = ", ".join(f"{sector}:'{keyword}'" for sector, keyword in uses)
+                self.warnings.append(f"아이템 [{name}]을(를) 얻는 규칙이 없습니다. (필요한 곳: {where})")
+
+    # --- Conversion ---
+    def mask_of(self, inventory):
+        mask = 0
+        for name in inventory:
+            mask |= self.item_bits.get(name, 0)
+        return mask
+
+    def items_of(self, mask):
+        items = []
+        while mask:
+            low = mask & -mask
+            items.append(self.items[low.bit_length() - 1])
+            mask ^= low
+        return items
+
+    def states_of(self, sector_states):
+        """sector_states dict -> (구역 순서의 상태 id bytearray, 엔딩 id)"""
+        packed = bytearray(len(self.sectors))
+        for key, name in sector_states.items():
+            if key == "ending":
+                continue
+            index = self.sector_index.get(int(key))
+            if index is not None:
+                packed[index] = self.state_ids.get(name, NO_STATE)
+        return packed, self.ending_ids.get(sector_states.get("ending"), 0)
+
+    def states_dict(self, packed, ending):
+        sector_states = {str(self.sectors[i]): self.states[state] for i, state in enumerate(packed) if state}
+        if ending:
+            sector_states["ending"] = self.endings[ending]
+        return sector_states
+
+    # --- Rules ---
+    def apply(self, sector, keyword, inventory, state, unlocked):
+        """규칙 하나를 적용합니다. inventory는 비트마스크, state는 현재 구역의 상태 id.
+
+        (inventory, state, unlocked, ending, message)를 돌려줍니다. 조건 검사와 변경은 모두 비트/정수 연산입니다.
+        """
+        rule = self.keywords[sector][keyword][state]
+        if (rule.req_item and not inventory & rule.req_item) or (rule.req_state and state != rule.req_state):
+            return inventory, state, unlocked, 0, rule.fail_msg
+        if rule.already_msg and inventory & rule.get_item:
+            return inventory, state, unlocked, 0, rule.already_msg
+        inventory = (inventory & ~rule.remove_item) | rule.get_item
+        return inventory, rule.set_state or state, unlocked or rule.unlock, rule.ending, rule.message
+
+    def find_exit(self, sector, text):
+        for command, target in self.exits.get(sector, ()):
+            if command in text:
+                return target
+        return None
+
+    # --- Packing ---
+    def pack(self, sector, inventory, packed_states, unlocked, ending):
+        """게임 상태 전체를 정수 하나로 만듭니다. [엔딩 | 구역 상태들 | 인벤토리 | 출구 | 구역 인덱스]"""
+        value = ending
+        for state in reversed(packed_states):
+            value = (value << STATE_BITS) | state
+        value = (value << len(self.items)) | inventory
+        value = (value << 1) | int(unlocked)
+        return (value << 8) | self.sector_index[sector]
+
+    def unpack(self, value):
+        sector = self.sectors[value & 0xFF]
+        value >>= 8
+        unlocked = bool(value & 1)
+        value >>= 1
+        inventory = value & ((1 << len(self.items)) - 1)
+        value >>= len(self.items)
+        packed_states = bytearray(len(self.sectors))
+        for i in range(len(self.sectors)):
+            packed_states[i] = value & ((1 << STATE_BITS) - 1)
+            value >>= STATE_BITS
+        return sector, inventory, packed_states, unlocked, value
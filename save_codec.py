@@ -0,0 +1,86 @@
+"""클라이언트 세이브(/api/save, /api/load)용 압축 바이너리 형식.
+
+게임 진행에 필요한 필드(구역, 인벤토리, 구역 상태, 출구 개방, 엔딩)만 RULES.pack()으로 정수 하나에 담고,
+버전/규칙 표 지문/무결성 태그를 붙여 base64url 문자열로 돌려줍니다. 대화 기록과 API 키는 저장하지 않습니다.
+
+    "DP" | version(1) | rules fingerprint(4) | packed state(N) | tag(12)  -> base64url
+"""
+import os
+import hmac
+import base64
+import hashlib
+
+from game_engine import RULES
+
+# --- Save Settings ---
+# 설정하면 태그가 HMAC이 되어 클라이언트가 세이브를 고쳐 쓸 수 없습니다. (없으면 손상 검출용 체크섬)
+SAVE_SECRET = os.environ.get("SAVE_SECRET", "").encode("utf-8")
+
+SAVE_MAGIC = b"DP"
+SAVE_VERSION = 1
+TAG_SIZE = 12
+MAX_SAVE_REQUEST_BYTES = 1024  # /api/load 요청 본문 상한
+
+
+class SaveError(ValueError):
+    """세이브 데이터가 형식/버전/무결성 검사를 통과하지 못한 경우."""
+
+
+def _rules_fingerprint(rules):
+    # 인턴 순서가 바뀌면 비트 위치가 달라지므로, 다른 규칙 표로 만든 세이브는 거부합니다.
+    names = "\x1f".join(map(str, rules.sectors)) + "\x1e" + "\x1f".join(rules.items) + "\x1e" + \
+        "\x1f".join(map(str, rules.states[1:])) + "\x1e" + "\x1f".join(map(str, rules.endings[1:]))
+    return hashlib.blake2b(names.encode("utf-8"), digest_size=4).digest()
+
+
+def _tag(body):
+    if SAVE_SECRET:
+        return hmac.new(SAVE_SECRET, body, hashlib.blake2b).digest()[:TAG_SIZE]
+    return hashlib.blake2b(body, digest_size=TAG_SIZE).digest()
+
+
+RULES_FINGERPRINT = _rules_fingerprint(RULES)
+# 8(구역) + 1(출구) + 인벤토리 + 구역 상태들 + 엔딩(최대 8비트)
+STATE_BYTES = (8 + 1 + len(RULES.items) + 4 * len(RULES.sectors) + 8 + 7) // 8
+BLOB_BYTES = len(SAVE_MAGIC) + 1 + len(RULES_FINGERPRINT) + STATE_BYTES + TAG_SIZE
+SAVE_LENGTH = len(base64.urlsafe_b64encode(b"\0" * BLOB_BYTES).rstrip(b"="))
+
+
+def encode_save(state):
+    """GameState -> 세이브 문자열."""
+    packed_states, ending = RULES.states_of(state.get("sector_states", {}))
+    value = RULES.pack(state["current_sector"], RULES.mask_of(state.get("inventory", [])), packed_states,
+                       state.get("unlocked", False), ending)
+    body = SAVE_MAGIC + bytes([SAVE_VERSION]) + RULES_FINGERPRINT + value.to_bytes(STATE_BYTES, "little")
+    return base64.urlsafe_b64encode(body + _tag(body)).rstrip(b"=").decode("ascii")
+
+
+def decode_save(save):
+    """세이브 문자열 -> 게임 필드 dict. 길이가 고정이므로 검사 비용은 입력과 무관하게 일정합니다."""
+    if not isinstance(save, str) or len(save) != SAVE_LENGTH:
+        raise SaveError("세이브 데이터의 길이가 맞지 않습니다.")
+    try:
+        blob = base64.urlsafe_b64decode(save + "=" * (-len(save) % 4))
+    except ValueError:
+        raise SaveError("세이브 데이터를 해독할 수 없습니다.")
+    body, tag = blob[:-TAG_SIZE], blob[-TAG_SIZE:]
+    if not hmac.compare_digest(tag, _tag(body)):
+        raise SaveError("세이브 데이터가 손상되었거나 변조되었습니다.")
+    if body[:len(SAVE_MAGIC)] != SAVE_MAGIC or body[len(SAVE_MAGIC)] != SAVE_VERSION:
+        raise SaveError("지원하지 않는 세이브 형식입니다.")
+    offset = len(SAVE_MAGIC) + 1
+    if body[offset:offset + len(RULES_FINGERPRINT)] != RULES_FINGERPRINT:
+        raise SaveError("다른 버전의 게임에서 만든 세이브입니다.")
+
+    value = int.from_bytes(body[offset + len(RULES_FINGERPRINT):], "little")
+    if value & 0xFF >= len(RULES.sectors):
+        raise SaveError("세이브 데이터의 구역 정보가 올바르지 않습니다.")
+    sector, inventory, packed_states, unlocked, ending = RULES.unpack(value)
+    if ending >= len(RULES.endings) or any(state >= len(RULES.states) for state in packed_states):
+        raise SaveError("세이브 데이터의 상태 정보가 올바르지 않습니다.")
+    return {
+        "current_sector": sector,
+        "inventory": RULES.items_of(inventory),
+        "sector_states": RULES.states_dict(packed_states, ending),
+        "unlocked": unlocked,
+    }
@@ -1,18 +1,140 @@
 import os
+import json
+import time
 import traceback
-from flask import Flask, request, jsonify, make_response
+from dotenv import load_dotenv
+
+# 여러 모듈이 import 시점에 환경 변수를 읽으므로 다른 import보다 먼저 로드합니다.
+# 예전 ai_engine과 같이 ./.env(위로 검색)와 프로젝트 상위 디렉토리의 ../.env를 모두 읽습니다. (먼저 읽은 값이 우선)
+load_dotenv()
+load_dotenv(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".env"))
+
+from flask import Flask, Response, g, request, jsonify, make_response, stream_with_context, send_from_directory
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
-from ai_engine import session_manager
+from werkzeug.exceptions import HTTPException
+from session_store import SessionStore, SESSION_TTL
+from session_backend import create_backend
+from save_codec import encode_save
+from metrics import metrics, is_local, REQUEST_SECONDS, ERRORS, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from image_assets import image_assets, ASSET_BUILD_DIR, IMMUTABLE_CACHE_CONTROL
+import request_profiler
+import response_codec
+from request_profiler import span, PROFILE_HEADER, PROFILE_ID_HEADER
+import api_common
+from api_common import get_cursor, get_commands, request_context
+
+
+class ProfiledJSONProvider(DefaultJSONProvider):
+    """jsonify의 JSON 인코딩 시간을 프로파일 span으로 남깁니다. (프로파일 중이 아니면 no-op)
+
+    jsonify 응답은 response_codec으로 바로 bytes로 인코딩하고(orjson이 있으면 orjson), 걸린 시간을 g에 둡니다.
+    """
+
+    def dumps(self, obj, **kwargs):
+        with span("json_encode"):
+            return super().dumps(obj, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        started = time.perf_counter()
+        with span("json_encode"):
+            body = response_codec.dumps(obj)
+        g.encode_seconds = time.perf_counter() - started
+        return self._app.response_class(body, mimetype=self.mimetype)
+
 
 app = Flask(__name__)
+app.json = ProfiledJSONProvider(app)
 
 # --- Standard Flask-CORS Configuration ---
 # This is the most robust way to handle CORS in Flask.
 # It automatically handles OPTIONS requests and injects correct headers.
-CORS(app, resources={r"/api/*": {"origins": "*"}}, supports_credentials=False)
+CORS(app, resources={r"/api/*": {"origins": "*"}}, supports_credentials=False, expose_headers=["ETag", PROFILE_ID_HEADER])
+
+session_store = SessionStore(backend=create_backend(ttl=SESSION_TTL))
+metrics.gauge("game_active_sessions", "Sessions held in this worker's session registry.", lambda: len(session_store))
+
+# --- Request Metrics / Profiling ---
+@app.before_request
+def start_timer():
+    g.request_started = time.perf_counter()
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    g.profile = request_profiler.start(f"{request.method} {route}", request.headers.get(PROFILE_HEADER))
+
+@app.after_request
+def record_request(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        # 라벨은 URL 규칙(/api/action 등)이라 경로 값이 늘어나도 시계열 수가 늘지 않습니다.
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        REQUEST_SECONDS.observe(time.perf_counter() - started, route, request.method, str(response.status_code))
+    handle = g.pop('profile', None)
+    if handle is not None:
+        profile = request_profiler.finish(handle)
+        response.headers[PROFILE_ID_HEADER] = profile.id
+        # 파일 기록은 응답을 다 보낸 뒤에 합니다.
+        response.call_on_close(profile.dump)
+    return response
+
+@app.after_request
+def encode_response(response):
+    # after_request는 등록의 역순으로 돌므로 record_request보다 먼저 실행됩니다. (압축 시간도 요청 지연에 포함)
+    encode_seconds = g.pop('encode_seconds', None)
+    if encode_seconds is None or response.direct_passthrough or response.is_streamed:
+        return response
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    body, encoding, headers = response_codec.finish(response.get_data(), request.headers.get('Accept-Encoding'), encode_seconds, route)
+    for name, value in headers:
+        response.headers[name] = value
+    if encoding is not None:
+        response.set_data(body)
+        # 압축한 표현은 바이트가 다르므로 약한 ETag로 바꿉니다. (If-None-Match는 약한 비교)
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+    return response
+
+@app.teardown_request
+def stop_profile(exc):
+    # after_request까지 가지 못한 요청의 프로파일 상태를 정리합니다.
+    handle = g.pop('profile', None)
+    if handle is not None:
+        request_profiler.finish(handle)
+
+def request_data():
+    return request.get_json(silent=True) or {}
+
+def reply(result):
+    """api_common의 (status, payload)를 Flask 응답으로 바꿉니다."""
+    status, payload = result
+    return jsonify(payload), status
+
+def session_expired():
+    return reply(api_common.session_expired())
+
+def run_in_session(api_key, work, save=True, token=None):
+    """요청의 세션을 찾아 세션 락 안에서 work(session_manager)를 실행하고 저장합니다. 세션이 없으면 404 응답.
+
+    저장은 write-behind라 커밋을 기다리지 않습니다. 다른 워커가 먼저 저장했으면 백엔드가 이번 변경을 합칩니다.
+    """
+    if token is None:
+        token = api_common.session_token(request.headers.get, request_data())
+    session_manager = session_store.get(token)
+    if session_manager is None:
+        return session_expired()
+    with session_manager.lock:
+        if api_key is not None:
+            session_manager.state['api_key'] = api_key
+        result = work(session_manager)
+        if save:
+            session_store.save(token, session_manager)
+    return jsonify(result)
 
 @app.errorhandler(Exception)
 def handle_exception(e):
+    if not isinstance(e, HTTPException):
+        ERRORS.inc("server")
     error_trace = traceback.format_exc()
     print(f"!!! SERVER ERROR !!!\n{error_trace}")
     return jsonify({
@@ -23,48 +145,122 @@ def handle_exception(e):
 
 @app.route('/')
 def health_check():
-    return "🕸️ 404: THE DIGITAL PRISON - BACKEND SYSTEM ONLINE 🕸️"
+    return api_common.HEALTH_TEXT
+
+@app.route('/assets/build/<name>', methods=['GET'])
+def built_asset(name):
+    # 내용 해시가 붙은 빌드 결과만 내보냅니다. 파일 본문은 wsgi.file_wrapper(gunicorn은 sendfile)로 복사 없이 전송됩니다.
+    if not image_assets.is_built(name):
+        return jsonify(api_common.NOT_FOUND), 404
+    response = send_from_directory(ASSET_BUILD_DIR, name, max_age=31536000)
+    response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    return response
 
 @app.route('/api/ping', methods=['GET'])
 def ping():
-    return jsonify({"status": "pong", "message": "Connection stable"})
+    return jsonify(api_common.PING)
+
+@app.route('/api/stats', methods=['GET'])
+def stats():
+    return jsonify(api_common.stats_payload(session_store))
+
+@app.route('/api/metrics', methods=['GET'])
+def metrics_endpoint():
+    # 운영 지표는 로컬에서만 봅니다. (METRICS_PUBLIC=1이면 어디서나)
+    if not is_local(request.remote_addr):
+        return jsonify(api_common.NOT_FOUND), 404
+    return Response(metrics.render(), content_type=METRICS_CONTENT_TYPE)
 
 @app.route('/api/init', methods=['POST'])
 def init_game():
-    api_key = request.headers.get('X-Gemini-API-Key', '')
-    session_manager.reset()
-    session_manager.state['api_key'] = api_key
-    return jsonify(session_manager.format_state_for_ui())
+    api_key, _ = request_context(request.headers.get)
+    token = api_common.session_token(request.headers.get, request_data())
+    if session_store.get(token) is None:
+        token, _ = session_store.create()
+    return run_in_session(None, lambda session_manager: {
+        **api_common.reset_session(session_manager, api_key), "session_id": token}, token=token)
 
 @app.route('/api/action', methods=['POST'])
 def game_action():
-    api_key = request.headers.get('X-Gemini-API-Key', '')
-    data = request.get_json(silent=True) or {}
+    api_key, deadline = request_context(request.headers.get)
+    data = request_data()
     user_input = data.get('command', '')
-    
     print(f"ACTION REQUEST: {user_input}")
-    session_manager.state['api_key'] = api_key
-    ui_data = session_manager.process_action(user_input)
-    return jsonify(ui_data)
+    return run_in_session(api_key, lambda session_manager: session_manager.process_action(
+        user_input, get_cursor(data.get('cursor')), deadline))
+
+@app.route('/api/actions', methods=['POST'])
+def game_actions():
+    api_key, deadline = request_context(request.headers.get)
+    data = request_data()
+    commands, error = get_commands(data)
+    if commands is None:
+        return jsonify({"error": error}), 400
+    print(f"ACTIONS REQUEST: {len(commands)} commands")
+    return run_in_session(api_key, lambda session_manager: session_manager.process_actions(
+        commands, get_cursor(data.get('cursor')), deadline))
+
+@app.route('/api/action/stream', methods=['POST'])
+def game_action_stream():
+    """/api/action의 Server-Sent Events 버전 (logic -> token... -> final)."""
+    api_key, deadline = request_context(request.headers.get)
+    data = request_data()
+    user_input = data.get('command', '')
+
+    token = api_common.session_token(request.headers.get, data)
+    session_manager = session_store.get(token)
+    if session_manager is None:
+        return session_expired()
+
+    print(f"ACTION STREAM REQUEST: {user_input}")
+
+    def generate():
+        with session_manager.lock:
+            session_manager.state['api_key'] = api_key
+            try:
+                for event, payload in session_manager.stream_action(user_input, get_cursor(data.get('cursor')), deadline):
+                    yield f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+            finally:
+                # 클라이언트가 도중에 끊어도(GeneratorExit) 이미 반영된 logic 결과는 저장합니다.
+                session_store.save(token, session_manager)
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    })
 
 @app.route('/api/hint', methods=['POST'])
 def hint():
-    api_key = request.headers.get('X-Gemini-API-Key', '')
-    session_manager.state['api_key'] = api_key
-    ui_data = session_manager.get_hint()
-    return jsonify(ui_data)
+    api_key, deadline = request_context(request.headers.get)
+    cursor = get_cursor(request_data().get('cursor'))
+    return run_in_session(api_key, lambda session_manager: session_manager.get_hint(cursor, deadline))
+
+@app.route('/api/log', methods=['GET'])
+def game_log():
+    """폴링용. cursor 이후의 로그와 바뀐 상태 블록만 돌려주고, 변화가 없으면 304."""
+    token = api_common.session_token(request.headers.get, request_data())
+    session_manager = session_store.get(token)
+    if session_manager is None:
+        return session_expired()
+
+    with session_manager.lock:
+        ui_data, etag = api_common.log_payload(
+            session_manager, request.if_none_match.contains_weak, get_cursor(request.args.get('cursor')))
+    response = make_response("", 304) if ui_data is None else jsonify(ui_data)
+    response.set_etag(etag)
+    return response
+
+@app.route('/api/save', methods=['POST'])
+def save_game():
+    return run_in_session(None, lambda session_manager: {"success": True, "state": encode_save(session_manager.state)}, save=False)
 
 @app.route('/api/load', methods=['POST'])
 def load_game():
-    api_key = request.headers.get('X-Gemini-API-Key', '')
-    data = request.get_json(silent=True) or {}
-    state_data = data.get('state')
-    if not state_data:
-        return jsonify({"error": "No save data"}), 400
-    
-    session_manager.state = state_data
-    session_manager.state['api_key'] = api_key
-    return jsonify(session_manager.format_state_for_ui())
+    api_key, _ = request_context(request.headers.get)
+    fields, error = api_common.parse_save(request.content_length, request_data)
+    if error is not None:
+        return reply(error)
+    return run_in_session(None, lambda session_manager: api_common.load_session(session_manager, fields, api_key))
 
 if __name__ == '__main__':
     port = int(os.environ.get("PORT", 5000))
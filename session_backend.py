@@ -0,0 +1,412 @@
+import os
+import json
+import time
+import zlib
+import atexit
+import secrets
+import sqlite3
+import tempfile
+import threading
+import traceback
+
+from langchain_core.messages import HumanMessage, AIMessage
+from metrics import ERRORS
+
+# --- Backend Settings ---
+SESSION_BACKEND = os.environ.get("SESSION_BACKEND", "sqlite")  # sqlite | dbm | memory
+SESSION_DB_PATH = os.environ.get("SESSION_DB_PATH", os.path.join(tempfile.gettempdir(), "digital_prison_sessions"))
+SESSION_FLUSH_INTERVAL = float(os.environ.get("SESSION_FLUSH_INTERVAL", 0.02))  # 쓰기가 없을 때 기록 스레드가 깨어나는 주기 (초)
+SESSION_FLUSH_BATCH = int(os.environ.get("SESSION_FLUSH_BATCH", 256))  # 한 트랜잭션에 묶는 최대 쓰기 수
+SESSION_WRITE_TIMEOUT = float(os.environ.get("SESSION_WRITE_TIMEOUT", 10.0))  # 커밋을 기다리는 최대 시간 (초)
+
+STATE_FORMAT_VERSION = 2  # v2: 메시지별 로그 seq와 log_seq/ui_seq/ui_hash 추가
+COMPRESS_THRESHOLD = 256  # bytes
+
+
+# --- GameState Serialization ---
+def serialize_state(state):
+    """GameState를 저장용 바이트로 변환합니다. (api_key는 저장하지 않음)"""
+    payload = {
+        "v": STATE_FORMAT_VERSION,
+        "s": state.get("current_sector", 0),
+        "i": state.get("inventory", []),
+        "ss": state.get("sector_states", {}),
+        "u": 1 if state.get("unlocked") else 0,
+        "a": state.get("last_action", ""),
+        "m": [["h" if isinstance(msg, HumanMessage) else "a", getattr(msg, "content", ""), int(getattr(msg, "id", None) or 0)] for msg in state.get("messages", [])],
+        "ls": state.get("log_seq", 0),
+        "us": state.get("ui_seq", 0),
+        "uh": state.get("ui_hash", ""),
+    }
+    raw = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    if len(raw) > COMPRESS_THRESHOLD:
+        return b"z" + zlib.compress(raw, 6)
+    return b"j" + raw
+
+
+def deserialize_state(blob):
+    """serialize_state의 역변환. 형식이 맞지 않으면 ValueError."""
+    kind, body = blob[:1], blob[1:]
+    if kind == b"z":
+        body = zlib.decompress(body)
+    elif kind != b"j":
+        raise ValueError("unknown session blob format")
+    payload = json.loads(body.decode("utf-8"))
+    version = payload.get("v")
+    if version not in (1, STATE_FORMAT_VERSION):
+        raise ValueError(f"unsupported session format version: {version}")
+    messages = []
+    for seq, entry in enumerate(payload["m"], 1):
+        # v1 메시지에는 seq가 없으므로 순서대로 다시 매깁니다.
+        kind, text = entry[0], entry[1]
+        message_id = str(entry[2] if len(entry) > 2 and entry[2] else seq)
+        messages.append(HumanMessage(content=text, id=message_id) if kind == "h" else AIMessage(content=text, id=message_id))
+    return {
+        "messages": messages,
+        "current_sector": payload["s"],
+        "inventory": payload["i"],
+        "sector_states": payload["ss"],
+        "unlocked": bool(payload["u"]),
+        "last_action": payload["a"],
+        "next_step": "logic",
+        "api_key": "",
+        "log_seq": payload.get("ls", len(messages)),
+        "ui_seq": payload.get("us", 0),
+        "ui_hash": payload.get("uh", ""),
+    }
+
+
+# --- Backends ---
+def new_version():
+    """저장마다 새로 뽑는 버전 값. 순서는 없고, 서로 다른 상태가 같은 버전을 갖지 않게 합니다. (0은 '아직 저장 안 됨')"""
+    return secrets.randbits(62) or 1
+
+
+class _Write:
+    """대기 중인 쓰기 하나. ok: True(기록), False(충돌을 합치지 못함), None(기록 오류).
+
+    journal은 base 이후의 변경 기록이며, 다른 워커가 먼저 저장했으면 그 상태 위에 다시 적용합니다. (rebased)
+    """
+    __slots__ = ("token", "base", "version", "blob", "journal", "rebased", "done", "ok")
+
+    def __init__(self, token, base, version, blob, journal):
+        self.token = token
+        self.base = base
+        self.version = version
+        self.blob = blob
+        self.journal = journal
+        self.rebased = False
+        self.done = threading.Event()
+        self.ok = None
+
+
+class WriteBehindBackend:
+    """쓰기를 모아 두었다가 백그라운드 스레드에서 한 트랜잭션으로 기록하는 백엔드의 공통 부분.
+
+    save()는 쓰기를 예약만 하고 돌아오므로 요청은 커밋을 기다리지 않습니다. 아직 기록되지 않은 쓰기는
+    load()가 먼저 돌려주고(같은 워커는 자기 쓰기를 읽음), 같은 토큰의 연속 쓰기는 하나로 합쳐집니다.
+    기록은 조건부입니다: 저장된 버전이 base(이 워커가 읽은 버전)일 때만 바꿉니다. 다른 워커가 먼저 썼으면
+    replay(blob, journal)로 그 상태 위에 이번 변경을 다시 적용해 기록하고 on_conflict(token)을 알립니다.
+
+    하위 클래스는 _read(token, known_version)과 _write_batch(writes) -> [ok...], _purge(before)를 구현합니다.
+    """
+
+    def __init__(self, ttl, flush_interval=SESSION_FLUSH_INTERVAL, batch_size=SESSION_FLUSH_BATCH, write_timeout=SESSION_WRITE_TIMEOUT):
+        self.ttl = ttl
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.write_timeout = write_timeout
+        # SessionStore가 연결합니다: 충돌한 쓰기를 최신 상태 위에 다시 적용하는 함수와 충돌 알림
+        self.replay = None
+        self.on_conflict = None
+        # token -> _Write. 기록을 기다리는 쓰기와 기록 스레드가 쓰고 있는 쓰기
+        self._pending = {}
+        self._inflight = {}
+        self._cond = threading.Condition()
+        # 기록은 한 번에 하나씩: 같은 토큰의 다음 쓰기는 앞 쓰기가 커밋된 뒤에 조건을 검사해야 합니다.
+        self._flush_lock = threading.Lock()
+        self._writer = None
+        self._writer_pid = None
+        self._closed = False
+        self.writes = 0
+        self.batches = 0
+        self.merged = 0
+        self.conflicts = 0
+        self.rebased = 0
+        self.write_errors = 0
+        atexit.register(self.close)
+
+    def _ensure_writer(self):
+        # fork 이후 자식 프로세스에는 스레드가 없으므로 pid가 바뀌면 다시 띄운다.
+        if self._writer is not None and self._writer_pid == os.getpid():
+            return
+        self._writer_pid = os.getpid()
+        self._writer = threading.Thread(target=self._run, name="session-writer", daemon=True)
+        self._writer.start()
+
+    def load(self, token, known_version=None):
+        """(version, blob)을 반환합니다. 저장된 버전이 known_version과 같으면 blob은 None."""
+        with self._cond:
+            write = self._pending.get(token) or self._inflight.get(token)
+            if write is not None:
+                return write.version, (None if write.version == known_version else write.blob)
+        return self._read(token, known_version)
+
+    def save(self, token, base, version, blob, journal=(), wait=False):
+        """저장된 버전이 base일 때만 (version, blob)으로 바꾸도록 쓰기를 예약합니다.
+
+        wait=True면 커밋을 기다려 ok(True/False/None)를 돌려줍니다. (새 세션을 다른 워커도 바로 찾을 수 있도록)
+        """
+        with self._cond:
+            self._ensure_writer()
+            write = self._pending.get(token)
+            if write is not None and write.version == base:
+                # 아직 기록 전인 이전 쓰기에 이어 붙입니다: base는 그대로, 상태는 새 것, 변경 기록은 둘 다.
+                write.version, write.blob = version, blob
+                write.journal = write.journal + list(journal)
+                self.merged += 1
+            else:
+                write = self._pending[token] = _Write(token, base, version, blob, list(journal))
+            if wait or len(self._pending) >= self.batch_size:
+                self._cond.notify()
+        if not wait:
+            return None
+        if not write.done.wait(self.write_timeout):
+            ERRORS.inc("session_write")
+            print(f"SESSION WRITE ERROR: {token[:6]}... 커밋을 {self.write_timeout}초 안에 확인하지 못했습니다.")
+            return None
+        return write.ok
+
+    def _rebase(self, write, stored_version, stored_blob):
+        """다른 워커가 먼저 저장한 상태 위에 write의 변경 기록을 다시 적용합니다. 합칠 수 없으면 False."""
+        if self.replay is None or stored_blob is None:
+            return False
+        try:
+            blob = self.replay(stored_blob, write.journal)
+        except Exception:
+            ERRORS.inc("session_rebase")
+            print(f"SESSION REBASE ERROR: {traceback.format_exc()}")
+            return False
+        with self._cond:
+            # load()가 같은 쓰기를 읽을 수 있으므로 락 안에서 한 번에 바꿉니다.
+            write.base, write.version, write.blob, write.rebased = stored_version, new_version(), blob, True
+        return True
+
+    def _take(self):
+        with self._cond:
+            writes, self._pending = self._pending, {}
+            self._inflight.update(writes)
+        return list(writes.values())
+
+    def flush(self):
+        with self._flush_lock:
+            writes = self._take()
+            if writes:
+                self._flush_writes(writes)
+
+    def _flush_writes(self, writes):
+        for start in range(0, len(writes), self.batch_size):
+            batch = writes[start:start + self.batch_size]
+            try:
+                results = self._write_batch(batch)
+                self.writes += len(batch)
+                self.batches += 1
+            except Exception:
+                results = [None] * len(batch)
+                self.write_errors += 1
+                ERRORS.inc("session_write")
+                print(f"SESSION WRITE ERROR: {traceback.format_exc()}")
+            self._finish(batch, results)
+
+    def _finish(self, writes, results):
+        with self._cond:
+            for write in writes:
+                if self._inflight.get(write.token) is write:
+                    del self._inflight[write.token]
+        for write, ok in zip(writes, results):
+            if ok is False:
+                self.conflicts += 1
+            elif write.rebased:
+                self.rebased += 1
+            write.ok = ok
+            write.done.set()
+            # 이 워커의 캐시는 백엔드와 달라졌으므로 다음 요청이 다시 읽게 합니다.
+            if (ok is not True or write.rebased) and self.on_conflict is not None:
+                self.on_conflict(write.token)
+
+    def _run(self):
+        last_purge = time.time()
+        while True:
+            with self._cond:
+                if self._closed:
+                    return
+                self._cond.wait(self.flush_interval)
+            self.flush()
+            now = time.time()
+            if now - last_purge > max(self.ttl / 10, 1.0):
+                last_purge = now
+                try:
+                    self._purge(now - self.ttl)
+                except Exception:
+                    ERRORS.inc("session_purge")
+                    print(f"SESSION PURGE ERROR: {traceback.format_exc()}")
+
+    def close(self):
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify()
+        self.flush()
+
+    def stats(self):
+        with self._cond:
+            pending = len(self._pending)
+        return {
+            "backend": self.name,
+            "pending_writes": pending,
+            "writes": self.writes,
+            "batches": self.batches,
+            "merged": self.merged,
+            "conflicts": self.conflicts,
+            "rebased": self.rebased,
+            "write_errors": self.write_errors,
+        }
+
+
+class SQLiteBackend(WriteBehindBackend):
+    """WAL 모드 SQLite 세션 백엔드. 여러 gunicorn 워커가 같은 파일을 공유합니다."""
+    name = "sqlite"
+
+    def __init__(self, path, ttl, **kwargs):
+        self.path = path
+        self._local = threading.local()
+        super().__init__(ttl, **kwargs)
+        conn = self._connect()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "token TEXT PRIMARY KEY, version INTEGER NOT NULL, updated REAL NOT NULL, data BLOB NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS sessions_updated ON sessions(updated)")
+        conn.commit()
+        # gunicorn --preload에서는 여기가 마스터 프로세스이므로, 열린 연결을 fork 너머로 넘기지 않습니다.
+        conn.close()
+        self._local.conn = None
+
+    def _connect(self):
+        # 스레드(및 프로세스)마다 별도 연결을 사용합니다.
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _read(self, token, known_version):
+        row = self._connect().execute(
+            "SELECT version, CASE WHEN version = ? THEN NULL ELSE data END, updated FROM sessions WHERE token = ?",
+            (known_version, token),
+        ).fetchone()
+        if row is None or time.time() - row[2] >= self.ttl:
+            return None
+        return row[0], row[1]
+
+    def _write_batch(self, writes):
+        conn = self._connect()
+        now = time.time()
+        results = []
+        with conn:
+            for write in writes:
+                if not write.base:
+                    # 새 세션: 같은 토큰이 이미 있으면 충돌입니다.
+                    cursor = conn.execute(
+                        "INSERT OR IGNORE INTO sessions (token, version, updated, data) VALUES (?, ?, ?, ?)",
+                        (write.token, write.version, now, write.blob),
+                    )
+                    results.append(cursor.rowcount == 1)
+                else:
+                    cursor = conn.execute(
+                        "UPDATE sessions SET version = ?, updated = ?, data = ? WHERE token = ? AND version = ?",
+                        (write.version, now, write.blob, write.token, write.base),
+                    )
+                    if cursor.rowcount == 0:
+                        # 다른 워커가 먼저 썼습니다. 같은 트랜잭션 안에서 최신 상태를 읽어 그 위에 다시 적용합니다.
+                        row = conn.execute("SELECT version, data FROM sessions WHERE token = ?", (write.token,)).fetchone()
+                        if row is None or not self._rebase(write, row[0], row[1]):
+                            results.append(False)
+                            continue
+                        conn.execute(
+                            "UPDATE sessions SET version = ?, updated = ?, data = ? WHERE token = ? AND version = ?",
+                            (write.version, now, write.blob, write.token, write.base),
+                        )
+                    results.append(True)
+        return results
+
+    def _purge(self, before):
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM sessions WHERE updated < ?", (before,))
+
+
+class DbmBackend(WriteBehindBackend):
+    """표준 라이브러리 dbm을 쓰는 로컬 키-값 대체 백엔드 (단일 프로세스 전용)."""
+    name = "dbm"
+
+    def __init__(self, path, ttl, **kwargs):
+        import dbm
+        self._db = dbm.open(path, "c")
+        self._db_lock = threading.Lock()
+        super().__init__(ttl, **kwargs)
+
+    @staticmethod
+    def _pack(version, blob):
+        return b"%d:%.3f:" % (version, time.time()) + blob
+
+    def _read(self, token, known_version):
+        with self._db_lock:
+            value = self._db.get(token.encode())
+        if value is None:
+            return None
+        version, updated, blob = value.split(b":", 2)
+        if time.time() - float(updated) >= self.ttl:
+            return None
+        version = int(version)
+        return version, (None if version == known_version else blob)
+
+    def _write_batch(self, writes):
+        results = []
+        with self._db_lock:
+            for write in writes:
+                key = write.token.encode()
+                stored = self._db.get(key)
+                stored_version, stored_blob = None, None
+                if stored is not None:
+                    stored_version, _, stored_blob = stored.split(b":", 2)
+                    stored_version = int(stored_version)
+                if stored_version != (write.base or None):
+                    # 새 세션(base 0)의 토큰이 이미 있거나 세션이 사라졌으면 합칠 수 없습니다.
+                    if not write.base or not self._rebase(write, stored_version, stored_blob):
+                        results.append(False)
+                        continue
+                self._db[key] = self._pack(write.version, write.blob)
+                results.append(True)
+        return results
+
+    def _purge(self, before):
+        with self._db_lock:
+            expired = [key for key in self._db.keys() if float(self._db[key].split(b":", 2)[1]) < before]
+            for key in expired:
+                del self._db[key]
+
+
+def create_backend(kind=SESSION_BACKEND, path=SESSION_DB_PATH, ttl=1800):
+    """설정에 맞는 세션 백엔드를 만듭니다. memory면 None (프로세스 메모리만 사용)."""
+    if kind == "memory":
+        return None
+    if kind == "sqlite":
+        return SQLiteBackend(path + ".sqlite3", ttl)
+    if kind == "dbm":
+        return DbmBackend(path + ".dbm", ttl)
+    raise ValueError(f"unknown SESSION_BACKEND: {kind}")
@@ -0,0 +1,156 @@
+import os
+import time
+import secrets
+import threading
+from collections import OrderedDict
+
+from ai_engine import GameSessionManager
+from session_backend import serialize_state, deserialize_state, new_version
+
+# --- Session Store Settings ---
+SESSION_MAX = int(os.environ.get("SESSION_MAX", 10000))
+SESSION_TTL = float(os.environ.get("SESSION_TTL", 1800))  # seconds of inactivity
+
+
+class SessionStore:
+    """세션 토큰별 GameSessionManager 레지스트리 (LRU + 유휴 TTL).
+
+    backend가 주어지면 메모리는 캐시로만 쓰고, 원본 상태는 백엔드(여러 워커가 공유)에 둡니다.
+    세션의 version은 이 워커가 마지막으로 읽거나 쓴 상태의 버전이며, 저장은 백엔드가 아직 그 버전일 때만 그대로 기록됩니다.
+    다른 워커가 먼저 저장했으면 백엔드가 최신 상태 위에 세션의 journal(이번 변경)을 LLM 없이 다시 적용합니다.
+    """
+
+    def __init__(self, max_sessions=SESSION_MAX, ttl=SESSION_TTL, factory=GameSessionManager, clock=time.monotonic, backend=None):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.factory = factory
+        self.clock = clock
+        self.backend = backend
+        # token -> (session, last_access). 순서 = 최근 접근 순서 (앞쪽이 가장 오래됨)
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self.created = 0
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evicted = 0
+        self.loads = 0
+        self.conflicts = 0
+        if backend is not None:
+            backend.replay = self._replay
+            backend.on_conflict = self._forget
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def _purge_expired(self, now):
+        # LRU 순서는 곧 마지막 접근 시각 순서이므로 앞에서부터 만료된 것만 잘라내면 된다.
+        while self._sessions:
+            token, (_, last_access) = next(iter(self._sessions.items()))
+            if now - last_access < self.ttl:
+                break
+            del self._sessions[token]
+            self.expired += 1
+
+    def _remember(self, token, session, now):
+        self._purge_expired(now)
+        while len(self._sessions) >= self.max_sessions:
+            self._sessions.popitem(last=False)
+            self.evicted += 1
+        self._sessions[token] = (session, now)
+
+    def create(self):
+        """새 세션을 만들고 (token, session)을 반환합니다."""
+        token = secrets.token_urlsafe(18)
+        session = self.factory()
+        with self._lock:
+            self._remember(token, session, self.clock())
+            self.created += 1
+        # 다음 요청은 다른 워커로 갈 수 있으므로 새 세션만은 커밋을 기다립니다.
+        self.save(token, session, wait=True)
+        return token, session
+
+    def get(self, token):
+        """토큰에 해당하는 세션을 반환합니다. 없거나 만료되었으면 None."""
+        if not token:
+            return None
+        now = self.clock()
+        with self._lock:
+            session = None
+            entry = self._sessions.get(token)
+            if entry is not None:
+                session, last_access = entry
+                if now - last_access >= self.ttl:
+                    del self._sessions[token]
+                    self.expired += 1
+                    session = None
+                elif self.backend is None:
+                    self._sessions[token] = (session, now)
+                    self._sessions.move_to_end(token)
+                    self.hits += 1
+                    return session
+            if self.backend is None:
+                self.misses += 1
+                return None
+
+        # 다른 워커가 더 최신 버전을 썼을 수 있으므로 백엔드의 버전과 비교합니다.
+        known_version = session.version if session is not None else None
+        record = self.backend.load(token, known_version)
+        with self._lock:
+            if record is None:
+                self._sessions.pop(token, None)
+                self.misses += 1
+                return None
+            version, blob = record
+            if blob is None:
+                self.hits += 1
+            else:
+                session = self.factory()
+                session.load_state(deserialize_state(blob))
+                session.version = version
+                self.loads += 1
+            self._sessions.pop(token, None)
+            self._remember(token, session, now)
+            return session
+
+    def save(self, token, session, wait=False):
+        """요청 처리 후 변경된 세션 상태를 백엔드에 기록합니다. (write-behind: 기본은 커밋을 기다리지 않음)"""
+        journal, session.journal = session.journal, []
+        if self.backend is None:
+            return
+        version = new_version()
+        self.backend.save(token, session.version, version, serialize_state(session.state), journal, wait)
+        session.version = version
+
+    def _replay(self, blob, journal):
+        # 기록 스레드에서 호출: 다른 워커가 저장한 상태에 이 워커의 변경을 다시 적용한 blob
+        session = self.factory()
+        session.load_state(deserialize_state(blob))
+        session.replay(journal)
+        return serialize_state(session.state)
+
+    def _forget(self, token):
+        # 기록 스레드에서 호출: 캐시가 백엔드와 달라졌으므로 다음 get()이 백엔드에서 다시 읽게 합니다.
+        with self._lock:
+            self._sessions.pop(token, None)
+            self.conflicts += 1
+
+    def stats(self):
+        backend_stats = self.backend.stats() if self.backend is not None else {"backend": "memory"}
+        with self._lock:
+            # 만료된 세션이 active에 잡히지 않도록 먼저 정리합니다.
+            self._purge_expired(self.clock())
+            return {
+                **backend_stats,
+                "active": len(self._sessions),
+                "capacity": self.max_sessions,
+                "occupancy": len(self._sessions) / self.max_sessions if self.max_sessions else 0.0,
+                "ttl_seconds": self.ttl,
+                "created": self.created,
+                "hits": self.hits,
+                "misses": self.misses,
+                "expired": self.expired,
+                "evicted": self.evicted,
+                "loads": self.loads,
+                "conflicts": self.conflicts,
+            }
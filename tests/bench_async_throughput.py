@@ -0,0 +1,101 @@
+"""동기(Flask) 배포와 비동기(ASGI) 모드의 동시 요청 처리량 비교.
+
+LLM 호출은 고정 지연을 갖는 가짜 모델로 대체합니다. 네트워크나 API 키가 필요 없습니다.
+
+    python tests/bench_async_throughput.py [요청 수] [LLM 지연(초)] [동기 워커 수]
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+os.environ.setdefault("SESSION_BACKEND", "memory")
+os.environ.setdefault("NARRATIVE_CACHE_SIZE", "0")  # 모든 요청이 실제 LLM 대기를 거치도록
+os.environ.setdefault("LLM_COALESCE", "0")
+os.environ.setdefault("LLM_RATE_PER_KEY", "0")  # 모든 요청이 같은 키를 쓰므로 속도 제한은 끕니다.
+
+from langchain_core.messages import AIMessage
+
+import asgi
+import server
+from ai_engine import ai_engine_instance
+
+
+class SleepyLLM:
+    def __init__(self, latency):
+        self.latency = latency
+
+    def invoke(self, prompt):
+        time.sleep(self.latency)
+        return AIMessage(content="[FAKE] 시스템 로그.")
+
+    async def ainvoke(self, prompt):
+        await asyncio.sleep(self.latency)
+        return AIMessage(content="[FAKE] 시스템 로그.")
+
+
+async def asgi_call(app, method, path, headers=None, body=None):
+    raw = json.dumps(body).encode() if body is not None else b""
+    scope = {
+        "type": "http", "method": method, "path": path,
+        "headers": [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()],
+    }
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": raw, "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    await app(scope, receive, send)
+    return sent[0]["status"], json.loads(sent[1]["body"] or b"null")
+
+
+def bench_sync(requests, workers):
+    client = server.app.test_client()
+    tokens = [client.post("/api/init").get_json()["session_id"] for _ in range(requests)]
+
+    def one(token):
+        response = client.post("/api/action", json={"command": "침대"},
+                               headers={"X-Session-Id": token, "X-Gemini-API-Key": "bench"})
+        assert response.status_code == 200
+
+    started = time.perf_counter()
+    # gunicorn 동기 워커 = 워커당 동시 요청 1개
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(one, tokens))
+    return time.perf_counter() - started
+
+
+async def bench_async(requests):
+    tokens = []
+    for _ in range(requests):
+        _, data = await asgi_call(asgi.app, "POST", "/api/init")
+        tokens.append(data["session_id"])
+
+    async def one(token):
+        status, _ = await asgi_call(asgi.app, "POST", "/api/action", {"X-Session-Id": token, "X-Gemini-API-Key": "bench"}, {"command": "침대"})
+        assert status == 200
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(token) for token in tokens))
+    return time.perf_counter() - started
+
+
+if __name__ == "__main__":
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.5
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else 4
+
+    fake = SleepyLLM(latency)
+    ai_engine_instance.get_llm = lambda api_key: fake if api_key else None
+
+    sync_elapsed = bench_sync(requests, workers)
+    async_elapsed = asyncio.run(bench_async(requests))
+    print(f"requests={requests} llm_latency={latency}s sync_workers={workers}")
+    print(f"sync  (flask, {workers} workers): {sync_elapsed:7.2f}s  {requests / sync_elapsed:8.1f} req/s")
+    print(f"async (asgi, 1 process)  : {async_elapsed:7.2f}s  {requests / async_elapsed:8.1f} req/s")
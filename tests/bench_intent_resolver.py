@@ -0,0 +1,71 @@
+"""intent_resolver 해석 결과와 속도.
+
+키워드가 그대로 없는 자유 입력이 어떤 키워드로 풀리는지(신뢰도 포함)와 한 번 해석하는 데 걸리는 시간을
+출력합니다. 마지막 줄은 전체 공략 명령(정확한 키워드)이 해석기를 거치지 않는다는 확인입니다.
+
+    python tests/bench_intent_resolver.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from keyword_matcher import SECTOR_MATCHERS
+from intent_resolver import intent_resolver
+
+# (구역, 입력, 기대 키워드 또는 None)
+CASES = [
+    (0, "매트리스를 뒤진다", "침대"),
+    (0, "메트리스 뒤지기", "침대"),
+    (0, "바닦을 살핀다", "바닥"),
+    (0, "죄수복으로 문지른다", "유니폼"),
+    (0, "터미날 켜", "터미널"),
+    (0, "GENESIS", "genesis"),
+    (0, "ㅋㅋㅋ 침데", "침대"),
+    (0, "조사한다", None),
+    (0, "나도 몰라", None),
+    (0, "나는 누구인가", None),
+    (1, "비밀번호가 뭐지", "벽"),
+    (1, "공구 상자를 연다", "공구함"),
+    (1, "쓰래기 뒤지기", "쓰레기"),
+    (2, "액체질소를 붓는다", "질소"),
+    (3, "크리스털을 친다", "크리스탈"),
+    (12, "전원을 켠다", "켜기"),
+    (13, "몬스터를 겨눈다", "조준"),
+    (15, "그림자에 숨는다", "숨기"),
+    (17, "왼편으로 간다", "왼쪽"),
+    (19, "앞으로 나간다", "이동"),
+    (19, "나도 몰라", None),
+    (20, "아무 말이나 길게 입력해 봅니다 정말로", None),
+]
+
+
+def playthrough_hits_resolver():
+    from tests.load_playthrough import playthrough_script
+    from ai_engine import ai_engine_instance, GameSessionManager
+    from game_engine import find_exit
+
+    state = GameSessionManager().state
+    misses = 0
+    for command in playthrough_script():
+        exact = find_exit(state["current_sector"], command) if state["unlocked"] else None
+        if exact is None and SECTOR_MATCHERS[state["current_sector"]].best(command) is None:
+            misses += 1
+        state.update(ai_engine_instance.logic_node({**state, "command": command}))
+    return misses
+
+
+if __name__ == "__main__":
+    number = 20000
+    print(f"{'sector':>6} {'us':>7} {'conf':>6}  {'input':24s} -> keyword")
+    failures = 0
+    for sector, text, expected in CASES:
+        resolved = intent_resolver.resolve(sector, text)
+        keyword, confidence = resolved if resolved else (None, 0.0)
+        elapsed = timeit.timeit(lambda: intent_resolver.resolve(sector, text), number=number) / number * 1e6
+        mark = "" if keyword == expected else f"  (expected {expected})"
+        failures += keyword != expected
+        print(f"{sector:>6} {elapsed:>7.2f} {confidence:>6.3f}  {text:24s} -> {keyword}{mark}")
+    print(f"\nmismatches: {failures}/{len(CASES)}")
+    print(f"playthrough commands without an exact keyword: {playthrough_hits_resolver()}")
@@ -0,0 +1,113 @@
+import os
+import sys
+import timeit
+from collections import deque
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from game_engine import SECTOR_DATA
+from keyword_matcher import SECTOR_MATCHERS
+
+
+def legacy_match(keywords, text):
+    # 기존 logic_node 방식: 키워드마다 입력 전체를 다시 훑고, dict 순서상 첫 번째가 이긴다.
+    for key in keywords:
+        if key in text:
+            return key
+    return None
+
+
+class AhoCorasickMatcher:
+    """비교용 순수 파이썬 Aho-Corasick 구현 (KeywordMatcher와 같은 우선순위 규칙)."""
+
+    __slots__ = ("keywords", "_goto", "_fail", "_out")
+
+    def __init__(self, keywords):
+        self.keywords = list(keywords)
+        self._goto = [{}]
+        self._out = [()]
+
+        for index, word in enumerate(self.keywords):
+            node = 0
+            for ch in word:
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][ch] = nxt
+                    self._goto.append({})
+                    self._out.append(())
+                node = nxt
+            self._out[node] = self._out[node] + (index,)
+
+        # BFS로 failure 링크를 만들고, 출력 집합을 failure 체인을 따라 합쳐둔다.
+        self._fail = [0] * len(self._goto)
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(ch, 0)
+                self._fail[child] = target if target != child else 0
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def find_all(self, text):
+        """(끝 위치, 키워드 인덱스) 목록을 등장 순서대로 반환합니다."""
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        found = []
+        for pos, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node]:
+                for index in out[node]:
+                    found.append((pos, index))
+        return found
+
+    def best(self, text):
+        """가장 우선순위가 높은 키워드를 반환합니다. 없으면 None."""
+        goto, fail, out, keywords = self._goto, self._fail, self._out, self.keywords
+        node = 0
+        best_index = -1
+        best_len = 0
+        for ch in text:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for index in out[node]:
+                length = len(keywords[index])
+                if length > best_len or (length == best_len and index < best_index):
+                    best_index, best_len = index, length
+        return keywords[best_index] if best_index >= 0 else None
+
+
+def all_keywords():
+    return [key for info in SECTOR_DATA.values() for key in info.get("keywords", {})]
+
+
+INPUTS = {
+    "short": "침대를 조사한다",
+    "miss": "아무것도 하지 않고 가만히 서 있는다",
+    "long": ("복도를 천천히 걸으며 주변을 둘러본다. " * 200) + "빈 깡통",
+    # 거의 맞는 접두사가 계속 이어지는 입력 (substring 검색의 최악에 가까움)
+    "adversarial": ("더러운 렌" + "관리" + "바이러" + "크리스" + "쇠막대") * 400,
+    "every_keyword": " ".join(all_keywords()) * 5,
+}
+
+if __name__ == "__main__":
+    number = 2000
+    print(f"{'sector':>6} {'input':>14} {'chars':>6} {'legacy us':>10} {'aho us':>8} {'matcher us':>11}  winner (legacy / matcher)")
+    for sector in (0, 2, 20):
+        keywords = SECTOR_DATA[sector]["keywords"]
+        matcher = SECTOR_MATCHERS[sector]
+        automaton = AhoCorasickMatcher(keywords)
+        for name, text in INPUTS.items():
+            assert automaton.best(text) == matcher.best(text)
+            t_legacy = timeit.timeit(lambda: legacy_match(keywords, text), number=number) / number * 1e6
+            t_ac = timeit.timeit(lambda: automaton.best(text), number=number) / number * 1e6
+            t_matcher = timeit.timeit(lambda: matcher.best(text), number=number) / number * 1e6
+            winners = f"{legacy_match(keywords, text)} / {matcher.best(text)}"
+            print(f"{sector:>6} {name:>14} {len(text):>6} {t_legacy:>10.2f} {t_ac:>8.2f} {t_matcher:>11.2f}  {winners}")
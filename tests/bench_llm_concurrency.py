@@ -0,0 +1,174 @@
+"""LLM 호출 경로의 동시성 장치(SingleFlight, LLMScheduler, DeadlineRunner)를 가짜 모델로 확인합니다.
+
+네트워크나 API 키 없이 FakeChatModel의 호출 횟수와 지연으로 세 가지를 봅니다.
+  1. 같은 프롬프트로 동시에 N번 부르면 제공자 호출은 한 번뿐인지 (스레드 call, asyncio acall)
+  2. 한 키가 대기열을 채워도 다른 키가 라운드 로빈으로 바로 허가받는지
+  3. 느린 호출에 헤지가 나가 먼저 끝난 쪽을 쓰는지, 마감을 넘기면 LLMTimeout으로 끝나는지
+
+    python tests/bench_llm_concurrency.py [--callers 50] [--latency 0.2]
+
+하나라도 기대와 다르면 종료 코드 1.
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from fake_llm import FakeChatModel
+from llm_coalescer import SingleFlight
+from llm_deadline import DeadlineRunner, LLMTimeout
+from llm_scheduler import LLMScheduler
+
+PROMPT = "sector-7 / 문을 연다"
+
+
+# --- 1. 호출 합치기 ---
+def bench_coalesce(callers, latency):
+    failures = []
+    llm = FakeChatModel(latency=f"fixed:{latency}")
+    flight = SingleFlight(enabled=True)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=callers) as pool:
+        results = list(pool.map(lambda _: flight.call(PROMPT, lambda: llm.invoke(PROMPT)).content, range(callers)))
+    elapsed = time.perf_counter() - started
+    stats = flight.stats()
+    print(f"[coalesce] call  callers={callers} provider_calls={llm.calls} merged={stats['merged']} elapsed={elapsed:.2f}s")
+    if llm.calls != 1 or len(set(results)) != 1:
+        failures.append(f"call: {llm.calls} provider calls, {len(set(results))} distinct results")
+
+    async def run():
+        return await asyncio.gather(*[flight.acall(PROMPT, lambda: llm.ainvoke(PROMPT)) for _ in range(callers)])
+
+    before = llm.calls
+    started = time.perf_counter()
+    results = [message.content for message in asyncio.run(run())]
+    elapsed = time.perf_counter() - started
+    print(f"[coalesce] acall callers={callers} provider_calls={llm.calls - before} "
+          f"merged={flight.stats()['merged'] - stats['merged']} elapsed={elapsed:.2f}s")
+    if llm.calls - before != 1 or len(set(results)) != 1:
+        failures.append(f"acall: {llm.calls - before} provider calls, {len(set(results))} distinct results")
+    return failures
+
+
+# --- 2. 키 간 공정성 ---
+def bench_fairness(latency, flood=20, polite=4, slots=2):
+    """전체 동시 호출을 slots개로 묶고, 키 A가 flood개를 먼저 쌓은 뒤 키 B가 polite개를 보냅니다."""
+    failures = []
+    llm = FakeChatModel(latency=f"fixed:{latency}")
+    # 키당 속도 제한은 넉넉하게 두고 전체 동시 호출 수만 좁혀서, 대기 순서가 곧 라운드 로빈 순서가 되게 합니다.
+    scheduler = LLMScheduler(rate=1000.0, burst=1000, max_queue=flood + polite, budget=60.0, max_inflight=slots)
+    order, waits = [], {"A": [], "B": []}
+    lock = threading.Lock()
+
+    def caller(key):
+        enqueued = time.perf_counter()
+        scheduler.acquire(key)
+        with lock:
+            order.append(key)
+            waits[key].append(time.perf_counter() - enqueued)
+        try:
+            llm.invoke(PROMPT)
+        finally:
+            scheduler.release()
+
+    with ThreadPoolExecutor(max_workers=flood + polite) as pool:
+        futures = [pool.submit(caller, "A") for _ in range(flood)]
+        time.sleep(latency / 2)  # A의 대기열이 쌓인 뒤에 B가 도착
+        futures += [pool.submit(caller, "B") for _ in range(polite)]
+        for future in futures:
+            future.result()
+
+    sequence = "".join(order)
+    last_b = sequence.rindex("B")
+    print(f"[fairness] slots={slots} order={sequence}")
+    for key in ("A", "B"):
+        print(f"[fairness] key={key} calls={len(waits[key])} wait_avg={sum(waits[key]) / len(waits[key]):.2f}s "
+              f"wait_max={max(waits[key]):.2f}s")
+    # 라운드 로빈이면 B의 마지막 허가는 A의 대기열이 다 빠지기 훨씬 전에 나옵니다. (FIFO라면 맨 끝)
+    if last_b > slots + 2 * polite:
+        failures.append(f"key B finished at position {last_b} of {len(sequence)}")
+    if max(waits["B"]) >= max(waits["A"]):
+        failures.append("key B waited as long as the flooding key")
+    return failures
+
+
+# --- 3. 헤지와 마감 ---
+def scripted(latencies):
+    """FakeChatModel에 넘길 지연 함수. 목록을 차례로 쓰고, 다 쓰면 마지막 값을 반복합니다."""
+    remaining = list(latencies)
+    lock = threading.Lock()
+
+    def sample(rng):
+        with lock:
+            return remaining.pop(0) if len(remaining) > 1 else remaining[0]
+    return sample
+
+
+def bench_deadline(latency, samples=20):
+    failures = []
+    fast = latency / 10
+    # 빠른 호출로 p95를 채운 뒤, 느린 첫 호출 하나와 빠른 헤지를 보냅니다.
+    llm = FakeChatModel(latency=scripted([fast] * samples + [latency * 5, fast]))
+    runner = DeadlineRunner(hedge=True, min_samples=samples, threads=8)
+    for _ in range(samples):
+        runner.call(lambda: llm.invoke(PROMPT), time.monotonic() + 10)
+    started = time.perf_counter()
+    runner.call(lambda: llm.invoke(PROMPT), time.monotonic() + 10)
+    elapsed = time.perf_counter() - started
+    stats = runner.stats()
+    print(f"[deadline] hedge   p95={stats['latency_p95_seconds']:.3f}s slow_call={latency * 5:.2f}s elapsed={elapsed:.2f}s "
+          f"hedged={stats['hedged']} hedge_won={stats['hedge_won']}")
+    if stats["hedge_won"] != 1 or elapsed >= latency * 5:
+        failures.append(f"hedge: hedge_won={stats['hedge_won']} elapsed={elapsed:.2f}s")
+
+    # 스케줄러가 헤지 허가를 거절하면 첫 호출만 기다립니다.
+    llm = FakeChatModel(latency=scripted([latency * 2]))
+    started = time.perf_counter()
+    runner.call(lambda: llm.invoke(PROMPT), time.monotonic() + 10, hedge_permit=lambda: False)
+    elapsed = time.perf_counter() - started
+    print(f"[deadline] denied  provider_calls={llm.calls} elapsed={elapsed:.2f}s hedge_denied={runner.stats()['hedge_denied']}")
+    if llm.calls != 1 or runner.stats()["hedge_denied"] != 1:
+        failures.append(f"hedge denied: {llm.calls} provider calls")
+
+    # 마감이 제공자 지연보다 짧으면 마감 시각에 LLMTimeout으로 끝나고, 허가는 호출이 실제로 끝날 때 돌아옵니다.
+    llm = FakeChatModel(latency=f"fixed:{latency * 2}")
+    runner = DeadlineRunner(hedge=False, threads=8)
+    released = threading.Event()
+    started = time.perf_counter()
+    try:
+        runner.call(lambda: llm.invoke(PROMPT), time.monotonic() + latency / 2, release=released.set)
+        failures.append("timeout: call returned past its deadline")
+    except LLMTimeout:
+        pass
+    elapsed = time.perf_counter() - started
+    released_early = released.is_set()
+    released.wait(latency * 4)
+    print(f"[deadline] timeout deadline={latency / 2:.2f}s elapsed={elapsed:.2f}s timeout={runner.stats()['timeout']} "
+          f"released_at_deadline={released_early} released_later={released.is_set()}")
+    if elapsed >= latency or released_early or not released.is_set():
+        failures.append(f"timeout: elapsed={elapsed:.2f}s released_early={released_early}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--callers", type=int, default=50, help="같은 프롬프트로 동시에 부르는 호출 수")
+    parser.add_argument("--latency", type=float, default=0.2, help="가짜 모델 지연 (초)")
+    args = parser.parse_args()
+
+    failures = bench_coalesce(args.callers, args.latency)
+    failures += bench_fairness(args.latency)
+    failures += bench_deadline(args.latency)
+    for failure in failures:
+        print(f"FAIL {failure}")
+    print("OK" if not failures else "FAILED")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
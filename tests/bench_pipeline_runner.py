@@ -0,0 +1,55 @@
+"""LangGraph(ai_graph.invoke)와 직접 실행기(DirectPipeline)의 턴당 오버헤드 비교.
+
+API 키 없이 실행하므로 LLM 호출이 없고, 프레임워크 오버헤드만 측정됩니다.
+
+    python tests/bench_pipeline_runner.py [턴 수]
+"""
+import os
+import sys
+import time
+import asyncio
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+os.environ.setdefault("SESSION_BACKEND", "memory")
+
+from ai_engine import ai_engine_instance, build_pipeline, GameSessionManager
+
+COMMANDS = ["침대", "철사", "문", "환풍구", "조사"]
+
+
+def turn_inputs(turns):
+    session = GameSessionManager()
+    return [session.turn_input(COMMANDS[i % len(COMMANDS)]) for i in range(turns)]
+
+
+def bench_sync(runner, inputs):
+    started = time.perf_counter()
+    for turn in inputs:
+        runner.invoke(turn)
+    return (time.perf_counter() - started) / len(inputs)
+
+
+async def bench_async(runner, inputs):
+    started = time.perf_counter()
+    for turn in inputs:
+        await runner.ainvoke(turn)
+    return (time.perf_counter() - started) / len(inputs)
+
+
+if __name__ == "__main__":
+    turns = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    inputs = turn_inputs(turns)
+    runners = {name: build_pipeline(ai_engine_instance, name) for name in ("langgraph", "direct")}
+
+    # 두 실행기의 결과가 같은지 먼저 확인합니다.
+    for turn in inputs[:len(COMMANDS)]:
+        graph_result, direct_result = (runners[name].invoke(turn) for name in ("langgraph", "direct"))
+        assert {k: v for k, v in graph_result.items() if k != "messages"} == {k: v for k, v in direct_result.items() if k != "messages"}
+        assert [m.content for m in graph_result["messages"]] == [m.content for m in direct_result["messages"]]
+
+    print(f"turns={turns} (no API key)")
+    for name, runner in runners.items():
+        bench_sync(runner, inputs[:200])  # warm-up
+        sync_turn = bench_sync(runner, inputs)
+        async_turn = asyncio.run(bench_async(runner, inputs))
+        print(f"{name:10s}: invoke {sync_turn * 1e6:8.1f} us/turn  ainvoke {async_turn * 1e6:8.1f} us/turn")
@@ -0,0 +1,87 @@
+"""응답 인코딩 비교: UI 블록 생성, JSON 직렬화(json vs orjson), 압축(gzip/brotli) 크기와 시간.
+
+전형적인 응답 세 가지(/api/action 한 턴, /api/log 전체 기록, /api/actions 전체 공략 재생)를 만들어
+응답마다 걸리는 시간(µs)과 보내는 바이트 수를 출력합니다.
+
+    python tests/bench_response_codec.py
+"""
+import os
+import sys
+import json
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+os.environ.setdefault("SESSION_BACKEND", "memory")
+
+import response_codec
+from response_codec import compress
+from game_engine import SECTOR_DATA
+from image_assets import image_assets
+from ai_engine import GameSessionManager, sector_fragments
+
+
+def legacy_blocks(state, image_key):
+    # 기존 format_state_for_ui 방식: 응답마다 SECTOR_DATA를 찾아 두 블록을 새로 만든다.
+    sector_info = SECTOR_DATA.get(state["current_sector"], {})
+    return [{
+        "agent": "SYSTEM", "text": "", "type": "ui_update",
+        "status": "SYSTEM ONLINE" if not state["unlocked"] else "EXIT UNLOCKED",
+        "inventory": state.get("inventory", []),
+        "location": sector_info.get("name", "Unknown")
+    }, {
+        "agent": "비주얼 일러스트레이터",
+        "content": sector_info.get("short_desc", sector_info.get("desc", "격리 구역 시각화 중...")),
+        "type": "image",
+        **image_assets.fields(image_key)
+    }]
+
+
+def cached_blocks(state, image_key):
+    location, image_block = sector_fragments(state["current_sector"], image_key)
+    return [{
+        "agent": "SYSTEM", "text": "", "type": "ui_update",
+        "status": "SYSTEM ONLINE" if not state["unlocked"] else "EXIT UNLOCKED",
+        "inventory": state.get("inventory", []),
+        "location": location
+    }, image_block]
+
+
+def flask_default_dumps(obj):
+    # flask.jsonify 기본값 (ensure_ascii, sort_keys)
+    return json.dumps(obj, ensure_ascii=True, sort_keys=True, separators=(",", ":")).encode("utf-8")
+
+
+def payloads():
+    from tests.load_playthrough import playthrough_script
+
+    commands = playthrough_script()
+    session = GameSessionManager()
+    single = session.process_action(commands[0], cursor=None)
+    history = session.format_state_for_ui(0)
+    replay = GameSessionManager().process_actions(commands)
+    return {"action": single, "log": history, "actions(73)": replay}, session
+
+
+def measure(func, number=2000):
+    return timeit.timeit(func, number=number) / number * 1e6
+
+
+if __name__ == "__main__":
+    cases, session = payloads()
+    state, image_key = session.state, session.image_key()
+    print(f"UI blocks: legacy {measure(lambda: legacy_blocks(state, image_key), 20000):.2f} us, "
+          f"cached {measure(lambda: cached_blocks(state, image_key), 20000):.2f} us")
+    print(f"JSON backend: {response_codec.JSON_BACKEND}, brotli: {'yes' if response_codec.brotli else 'no'}\n")
+
+    print(f"{'payload':>13} {'stage':>10} {'bytes':>8} {'us':>9}")
+    for name, payload in cases.items():
+        rows = [
+            ("jsonify", flask_default_dumps(payload), measure(lambda: flask_default_dumps(payload))),
+            ("codec", response_codec.dumps(payload), measure(lambda: response_codec.dumps(payload))),
+        ]
+        body = rows[-1][1]
+        rows.append(("gzip", compress(body, "gzip"), measure(lambda: compress(body, "gzip"), 500)))
+        if response_codec.brotli is not None:
+            rows.append(("br", compress(body, "br"), measure(lambda: compress(body, "br"), 500)))
+        for stage, data, elapsed in rows:
+            print(f"{name:>13} {stage:>10} {len(data):>8} {elapsed:>9.1f}")
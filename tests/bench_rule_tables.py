@@ -0,0 +1,110 @@
+"""컴파일된 규칙 표(rule_tables.py)와 이전의 dict 순회 방식 apply_rule 비교.
+
+먼저 무작위 상태에서 두 구현의 결과가 (인벤토리 순서까지) 같은지 확인하고, 턴당 규칙 적용 시간을 잽니다.
+
+    python tests/bench_rule_tables.py [반복 수]
+"""
+import os
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from game_engine import SECTOR_DATA, ENDING_KEY, DEFAULT_FAIL_MSG, RULES, apply_rule
+
+
+# --- 이전 구현 (참고용) ---
+def select_rule(rule, sector_state):
+    if isinstance(rule.get("default"), dict):
+        return rule.get(sector_state) or rule["default"]
+    return rule
+
+
+def reference_apply_rule(sector, keyword, inventory, sector_states, unlocked):
+    sector_states = dict(sector_states)
+    state_key = str(sector)
+    rule = select_rule(SECTOR_DATA[sector]["keywords"][keyword], sector_states.get(state_key))
+    result = {
+        "inventory": list(inventory),
+        "sector_states": sector_states,
+        "unlocked": unlocked,
+        "current_sector": sector,
+    }
+
+    req_item = rule.get("req_item")
+    req_state = rule.get("req_state")
+    if (req_item and req_item not in inventory) or (req_state and sector_states.get(state_key) != req_state):
+        result["last_action"] = rule.get("fail_msg", DEFAULT_FAIL_MSG)
+        return result
+
+    message = rule.get("msg_success", rule.get("msg", DEFAULT_FAIL_MSG))
+    item = rule.get("get_item")
+    if item and item in inventory and not (rule.get("unlock") or rule.get("set_state") or rule.get("remove_item")):
+        result["last_action"] = f"이미 [{item}]을(를) 가지고 있습니다."
+        return result
+
+    new_inventory = result["inventory"]
+    if rule.get("remove_item") in new_inventory:
+        new_inventory.remove(rule["remove_item"])
+    if item and item not in new_inventory:
+        new_inventory.append(item)
+    if rule.get("set_state"):
+        sector_states[state_key] = rule["set_state"]
+    if rule.get("unlock"):
+        result["unlocked"] = True
+    action = rule.get("action", "")
+    if action.startswith("end_"):
+        sector_states[ENDING_KEY] = action[len("end_"):]
+    result["last_action"] = message
+    return result
+
+
+def random_cases(count, rng):
+    cases = []
+    states = RULES.states[1:]
+    for _ in range(count):
+        sector = rng.choice(RULES.sectors)
+        keyword = rng.choice(list(SECTOR_DATA[sector]["keywords"]))
+        inventory = rng.sample(RULES.items, rng.randint(0, 8))
+        sector_states = {str(sector): rng.choice(states)} if rng.random() < 0.5 else {}
+        cases.append((sector, keyword, inventory, sector_states, rng.random() < 0.3))
+    return cases
+
+
+if __name__ == "__main__":
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    cases = random_cases(iterations, random.Random(7))
+
+    for case in cases[:20000]:
+        assert apply_rule(*case) == reference_apply_rule(*case), case
+    print(f"equivalence: {min(len(cases), 20000)} random cases OK, items={len(RULES.items)} states={len(RULES.states) - 1}")
+    for warning in RULES.warnings:
+        print(f"content warning: {warning}")
+
+    def mask_adapter(sector, keyword, inventory, sector_states, unlocked):
+        # 이름 목록 -> 마스크 -> 이름 목록으로 바꾸는 방식 (비교용, 인벤토리가 인턴 순서로 바뀜)
+        state = RULES.state_ids.get(sector_states.get(str(sector)), 0)
+        mask = RULES.mask_of(inventory)
+        new_mask = RULES.apply(sector, keyword, mask, state, unlocked)[0]
+        return RULES.items_of(new_mask) if new_mask != mask else inventory
+
+    for name, func in (("dict rules", reference_apply_rule), ("mask adapt", mask_adapter), ("compiled", apply_rule)):
+        started = time.perf_counter()
+        for case in cases:
+            func(*case)
+        print(f"{name:10s}: {(time.perf_counter() - started) / len(cases) * 1e6:6.2f} us/rule")
+
+    # 정수 하나에 담긴 상태: 마스크/상태 배열만으로 규칙을 적용
+    packed = [(RULES.pack(s, RULES.mask_of(i), RULES.states_of(ss)[0], u, 0), s, k) for s, k, i, ss, u in cases]
+    started = time.perf_counter()
+    for value, sector, keyword in packed:
+        sector, inventory, states, unlocked, ending = RULES.unpack(value)
+        RULES.apply(sector, keyword, inventory, states[RULES.sector_index[sector]], unlocked)
+    print(f"{'packed':10s}: {(time.perf_counter() - started) / len(cases) * 1e6:6.2f} us/rule (unpack 포함)")
+    masks = [(s, k, RULES.mask_of(i), RULES.state_ids.get(ss.get(str(s)), 0), u) for s, k, i, ss, u in cases]
+    started = time.perf_counter()
+    for case in masks:
+        RULES.apply(*case)
+    print(f"{'bits only':10s}: {(time.perf_counter() - started) / len(cases) * 1e6:6.2f} us/rule")
+    print(f"state size: {max(v.bit_length() for v, _, _ in packed)} bits packed")
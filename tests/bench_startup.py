@@ -0,0 +1,114 @@
+"""서버 시작 시간과 gunicorn 워커당 메모리(RSS/PSS) 측정.
+
+1) `import server`에 걸리는 시간을 새 프로세스로 여러 번 잽니다. 비교용으로 무거운 LLM 모듈
+   (langgraph, langchain_google_genai)을 미리 import하는 경우(예전 방식)도 함께 잽니다.
+2) gunicorn을 --preload 켜고/끄고 띄워서 워커별 RSS와 PSS(공유 페이지를 나눠 센 값)를 /proc에서 읽습니다.
+   PSS 합계가 실제로 쓰는 메모리에 가깝습니다. (Linux 전용)
+
+    python tests/bench_startup.py [--workers 4] [--repeat 5]
+"""
+import os
+import sys
+import time
+import socket
+import argparse
+import statistics
+import subprocess
+import urllib.request
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+ENV = {**os.environ, "SESSION_BACKEND": "memory", "PYTHONDONTWRITEBYTECODE": "1"}
+
+
+def time_import(code, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=ENV, check=True)
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def memory_kb(pid):
+    """/proc/<pid>/smaps_rollup에서 (Rss, Pss) kB."""
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            name, _, rest = line.partition(":")
+            if name in ("Rss", "Pss"):
+                values[name] = int(rest.split()[0])
+    return values["Rss"], values["Pss"]
+
+
+def children(pid):
+    with open(f"/proc/{pid}/task/{pid}/children") as f:
+        return [int(child) for child in f.read().split()]
+
+
+def measure_gunicorn(workers, preload):
+    port = free_port()
+    started = time.perf_counter()
+    master = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "--workers", str(workers), "--bind", f"127.0.0.1:{port}", "server:app"],
+        cwd=ROOT, env={**ENV, "GUNICORN_PRELOAD": "1" if preload else "0"},
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        # 첫 응답까지의 시간을 재고, 워커가 모두 뜰 때까지 기다립니다.
+        ready = None
+        deadline = time.monotonic() + 60
+        while time.monotonic() < deadline:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/api/stats", timeout=5) as response:
+                    response.read()
+                ready = ready or time.perf_counter() - started
+                if len(children(master.pid)) >= workers:
+                    break
+            except OSError:
+                time.sleep(0.05)
+        if ready is None:
+            raise RuntimeError("gunicorn이 시작되지 않았습니다.")
+        time.sleep(1.0)  # 늦게 뜬 워커의 import가 끝나도록
+        pids = children(master.pid)
+        samples = [memory_kb(pid) for pid in pids]
+        master_rss, master_pss = memory_kb(master.pid)
+        return {
+            "ready_s": ready,
+            "workers": len(pids),
+            "worker_rss_mb": statistics.mean(rss for rss, _ in samples) / 1024,
+            "worker_pss_mb": statistics.mean(pss for _, pss in samples) / 1024,
+            "total_pss_mb": (master_pss + sum(pss for _, pss in samples)) / 1024,
+            "master_rss_mb": master_rss / 1024,
+        }
+    finally:
+        master.terminate()
+        master.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    lazy = time_import("import server", args.repeat)
+    eager = time_import("import langgraph.graph, langchain_google_genai, server", args.repeat)
+    print(f"import server (lazy LLM modules)   : {lazy * 1000:7.0f} ms")
+    print(f"import server (eager, old behavior): {eager * 1000:7.0f} ms")
+
+    print(f"\ngunicorn --workers {args.workers}")
+    print(f"{'mode':10s} {'ready s':>8s} {'worker RSS MB':>14s} {'worker PSS MB':>14s} {'total PSS MB':>13s}")
+    for preload in (False, True):
+        row = measure_gunicorn(args.workers, preload)
+        print(f"{'preload' if preload else 'no-preload':10s} {row['ready_s']:8.2f} {row['worker_rss_mb']:14.1f} "
+              f"{row['worker_pss_mb']:14.1f} {row['total_pss_mb']:13.1f}")
+
+
+if __name__ == "__main__":
+    main()
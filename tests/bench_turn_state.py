@@ -0,0 +1,91 @@
+"""턴당 그래프 입력 크기에 따른 할당량/지연 비교.
+
+이전 방식(대화 기록 20개를 포함한 GameState 전체를 ai_graph.invoke에 넘김)과
+현재 방식(명령어와 게임 필드만 넘기고 기록은 세션 링 버퍼에 둠)을 API 키 없이 비교합니다.
+
+    python tests/bench_turn_state.py [턴 수]
+"""
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+os.environ.setdefault("SESSION_BACKEND", "memory")
+
+from langchain_core.messages import HumanMessage, AIMessage
+
+from ai_engine import ai_engine_instance, GameSessionManager
+
+# 실행기 설정(PIPELINE_RUNNER)과 무관하게 LangGraph 경로를 잽니다.
+ai_graph = ai_engine_instance.build_graph()
+
+COMMANDS = ["침대", "철사", "문", "환풍구", "조사"]
+
+
+def legacy_turn(state, user_input):
+    # 이전 process_action: 기록을 state에 쌓고 state 전체를 그래프에 넘김
+    state["messages"].append(HumanMessage(content=user_input))
+    if len(state["messages"]) > 20:
+        state["messages"] = state["messages"][-20:]
+    state["command"] = user_input
+    history = state["messages"]
+    result = ai_graph.invoke(state)
+    result["messages"] = history + result["messages"]
+    return result
+
+
+def legacy_state():
+    state = GameSessionManager().state
+    state["messages"] = [AIMessage(content="[SYSTEM]: " + "로그 " * 40) for _ in range(20)]
+    return state
+
+
+def measure(turn, turns):
+    # 턴마다 peak를 초기화해 한 턴 동안 일시적으로 잡힌 메모리를 잽니다.
+    tracemalloc.start()
+    transient = 0
+    for i in range(turns):
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+        turn(COMMANDS[i % len(COMMANDS)])
+        _, peak = tracemalloc.get_traced_memory()
+        transient += peak - base
+    tracemalloc.stop()
+
+    # 할당 추적은 지연에 영향을 주므로 지연은 따로 잽니다.
+    started = time.perf_counter()
+    for i in range(turns):
+        turn(COMMANDS[i % len(COMMANDS)])
+    return (time.perf_counter() - started) / turns, transient / turns
+
+
+def bench_legacy(turns):
+    holder = {"state": legacy_state()}
+
+    def turn(command):
+        holder["state"] = legacy_turn(holder["state"], command)
+
+    return measure(turn, turns)
+
+
+def bench_current(turns):
+    session = GameSessionManager()
+    for _ in range(20):
+        session.append_message(AIMessage(content="[SYSTEM]: " + "로그 " * 40))
+
+    def turn(command):
+        # process_action에서 UI 포맷팅을 뺀 부분
+        session.append_message(HumanMessage(content=command))
+        session.apply_turn(ai_graph.invoke(session.turn_input(command)))
+
+    return measure(turn, turns)
+
+
+if __name__ == "__main__":
+    turns = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+    print(f"turns={turns} (no API key, history=20)")
+    for name, bench in (("legacy (full state)", bench_legacy), ("current (turn only)", bench_current)):
+        per_turn, transient = bench(turns)
+        print(f"{name:20s}: {per_turn * 1e6:8.1f} us/turn  {transient / 1024:7.1f} KiB peak alloc/turn")
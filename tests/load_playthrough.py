@@ -0,0 +1,152 @@
+"""가짜 LLM으로 전체 플레이스루(21개 구역)를 동시에 재생하는 오프라인 부하 테스트.
+
+플레이어마다 /api/init 후 솔버가 찾은 최단 경로의 명령어를 /api/action으로 보내고,
+중간중간 /api/hint를 부릅니다. 엔드포인트별 p50/p95/p99와 초당 요청 수를 출력합니다.
+
+    python tests/load_playthrough.py --players 32 --concurrency 8
+    python tests/load_playthrough.py --url http://localhost:5000   # 실행 중인 서버 대상
+    python tests/load_playthrough.py --max-p95-ms 800             # 넘으면 종료 코드 1 (회귀 게이트)
+
+기본으로 LLM_BACKEND=fake, SESSION_BACKEND=memory로 실행합니다. (--url 대상 서버는 직접 설정)
+플레이어마다 다른 API 키를 쓰므로 키별 속도 제한(LLM_RATE_PER_KEY)이 그대로 적용됩니다.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+os.environ.setdefault("LLM_BACKEND", "fake")
+os.environ.setdefault("SESSION_BACKEND", "memory")
+
+
+def playthrough_script():
+    """시작 상태에서 솔버의 다음 한 수를 따라가 엔딩까지의 명령어 목록을 만듭니다."""
+    from ai_engine import ai_engine_instance, GameSessionManager
+    from hint_solver import hint_solver
+
+    state = GameSessionManager().state
+    commands = []
+    while True:
+        command = hint_solver.next_step(state["current_sector"], state["inventory"], state["sector_states"], state["unlocked"])
+        if command is None:
+            return commands
+        commands.append(command)
+        state.update(ai_engine_instance.logic_node({**state, "command": command}))
+
+
+class InProcessClient:
+    """Flask test_client로 server.app을 직접 호출합니다."""
+
+    def __init__(self):
+        import server
+        self.app = server.app
+
+    def post(self, path, headers, body=None):
+        response = self.app.test_client().post(path, json=body, headers=headers)
+        return response.status_code, response.get_json()
+
+
+class HttpClient:
+    def __init__(self, url):
+        self.url = url.rstrip("/")
+
+    def post(self, path, headers, body=None):
+        data = json.dumps(body or {}).encode("utf-8")
+        request = urllib.request.Request(self.url + path, data=data, method="POST",
+                                         headers={"Content-Type": "application/json", **headers})
+        try:
+            with urllib.request.urlopen(request, timeout=120) as response:
+                return response.status, json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            return e.code, None
+
+
+class Recorder:
+    def __init__(self):
+        self.samples = {}
+        self.errors = {}
+        self._lock = threading.Lock()
+
+    def timed(self, endpoint, call):
+        started = time.perf_counter()
+        status, data = call()
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.samples.setdefault(endpoint, []).append(elapsed)
+            if status != 200:
+                self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+        return data
+
+    def report(self, wall):
+        rows = {}
+        for endpoint, samples in sorted(self.samples.items()):
+            samples.sort()
+            pick = lambda q: samples[min(len(samples) - 1, int(len(samples) * q))] * 1000
+            rows[endpoint] = {
+                "count": len(samples),
+                "errors": self.errors.get(endpoint, 0),
+                "p50_ms": pick(0.50),
+                "p95_ms": pick(0.95),
+                "p99_ms": pick(0.99),
+                "rps": len(samples) / wall,
+            }
+        return rows
+
+
+def play(client, recorder, player, commands, hint_every):
+    headers = {"X-Gemini-API-Key": f"load-{player}"}
+    data = recorder.timed("/api/init", lambda: client.post("/api/init", headers))
+    headers["X-Session-Id"] = data["session_id"]
+    for turn, command in enumerate(commands, 1):
+        recorder.timed("/api/action", lambda: client.post("/api/action", headers, {"command": command}))
+        if hint_every and turn % hint_every == 0:
+            recorder.timed("/api/hint", lambda: client.post("/api/hint", headers))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--players", type=int, default=16, help="재생할 플레이스루 수")
+    parser.add_argument("--concurrency", type=int, default=8, help="동시에 진행하는 플레이어 수")
+    parser.add_argument("--hint-every", type=int, default=10, help="N턴마다 /api/hint 호출 (0이면 안 함)")
+    parser.add_argument("--url", help="실행 중인 서버 주소 (없으면 프로세스 안에서 Flask 앱 호출)")
+    parser.add_argument("--max-p95-ms", type=float, help="어느 엔드포인트든 p95가 이 값을 넘으면 종료 코드 1")
+    args = parser.parse_args()
+
+    commands = playthrough_script()
+    client = HttpClient(args.url) if args.url else InProcessClient()
+    recorder = Recorder()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        futures = [pool.submit(play, client, recorder, player, commands, args.hint_every) for player in range(args.players)]
+        for future in futures:
+            future.result()
+    wall = time.perf_counter() - started
+
+    rows = recorder.report(wall)
+    print(f"players={args.players} concurrency={args.concurrency} turns/player={len(commands)} "
+          f"latency={os.environ.get('FAKE_LLM_LATENCY', 'default')} wall={wall:.2f}s")
+    print(f"{'endpoint':14s} {'count':>6s} {'err':>4s} {'p50 ms':>8s} {'p95 ms':>8s} {'p99 ms':>8s} {'rps':>8s}")
+    for endpoint, row in rows.items():
+        print(f"{endpoint:14s} {row['count']:6d} {row['errors']:4d} {row['p50_ms']:8.1f} {row['p95_ms']:8.1f} {row['p99_ms']:8.1f} {row['rps']:8.1f}")
+
+    if not args.url:
+        # 캐시/합치기/속도 제한이 결과에 얼마나 영향을 줬는지 함께 봅니다.
+        from ai_engine import ai_engine_instance
+        cache, merged, scheduler = ai_engine_instance.narrative_cache.stats(), ai_engine_instance.coalescer.stats(), ai_engine_instance.scheduler.stats()
+        print(f"narrative_cache hit_rate={cache['hit_rate']:.2f}  coalesced={merged['merged']}  "
+              f"scheduler wait_p95={scheduler['wait_p95_seconds'] * 1000:.0f}ms timed_out={scheduler['timed_out']}")
+
+    failed = any(row["errors"] for row in rows.values())
+    if args.max_p95_ms is not None:
+        failed = failed or any(row["p95_ms"] > args.max_p95_ms for row in rows.values())
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
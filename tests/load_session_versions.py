@@ -0,0 +1,103 @@
+"""여러 프로세스가 한 세션을 동시에 바꿀 때 공유 SQLite 백엔드가 턴을 잃지 않는지 확인합니다.
+
+프로세스(= gunicorn 워커)마다 자기 SessionStore로 같은 세션을 읽고 process_action -> save를 반복합니다.
+첫 프로세스는 솔버가 찾은 플레이스루 명령을, 나머지는 상태를 바꾸지 않는 명령을 보냅니다.
+저장은 write-behind라 버전 충돌이 자주 나며, 백엔드가 이긴 쪽 상태 위에 진 쪽 턴을 다시 적용해야 합니다.
+
+    python tests/load_session_versions.py --workers 4 --turns 60 --think 0.01
+
+확인하는 것 (하나라도 틀리면 종료 코드 1):
+  - 모든 턴의 로그(명령 + 내레이션)가 남고, 프로세스별 명령 순서가 그대로인지
+  - 게임 필드(구역, 인벤토리, 구역 상태)가 플레이스루를 혼자 실행한 결과와 같은지
+API 키 없이 실행하므로 LLM은 부르지 않습니다. (내레이션은 시스템 문장)
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import multiprocessing
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+# 검증을 위해 모든 로그를 기록에 남깁니다. (spawn된 프로세스도 이 값을 물려받음)
+os.environ.setdefault("SESSION_HISTORY_SIZE", "100000")
+
+GAME_FIELDS = ("current_sector", "inventory", "sector_states", "unlocked")
+
+
+def open_store(path):
+    from session_backend import SQLiteBackend
+    from session_store import SessionStore
+    return SessionStore(backend=SQLiteBackend(path, 1800))
+
+
+def worker(path, token, commands, think):
+    store = open_store(path)
+    for command in commands:
+        time.sleep(think)
+        session_manager = store.get(token)
+        with session_manager.lock:
+            session_manager.process_action(command)
+            store.save(token, session_manager)
+    store.backend.close()
+    return store.backend.stats()
+
+
+def solo_fields(commands):
+    from ai_engine import GameSessionManager
+    session_manager = GameSessionManager()
+    for command in commands:
+        session_manager.process_action(command)
+    return {field: session_manager.state[field] for field in GAME_FIELDS}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--turns", type=int, default=60, help="상태를 바꾸지 않는 프로세스의 턴 수")
+    parser.add_argument("--think", type=float, default=0.01, help="턴 사이 간격 (초). 기록 주기(SESSION_FLUSH_INTERVAL)와 비슷하면 충돌이 잦습니다")
+    parser.add_argument("--db", default=os.path.join(tempfile.gettempdir(), "session_versions_check.sqlite3"))
+    args = parser.parse_args()
+
+    from tests.load_playthrough import playthrough_script
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(args.db + suffix):
+            os.remove(args.db + suffix)
+
+    script = playthrough_script()
+    plans = [script] + [[f"#{index}-{turn}" for turn in range(args.turns)] for index in range(1, args.workers)]
+    store = open_store(args.db)
+    token, session_manager = store.create()
+    base_seq = session_manager.state["log_seq"]
+
+    started = time.perf_counter()
+    with multiprocessing.get_context("spawn").Pool(args.workers) as pool:
+        stats = pool.starmap(worker, [(args.db, token, plan, args.think) for plan in plans])
+    elapsed = time.perf_counter() - started
+
+    final = open_store(args.db).get(token)
+    commands = [msg.content for msg in final.state["messages"] if type(msg).__name__ == "HumanMessage"]
+    total = sum(len(plan) for plan in plans)
+    failures = []
+    if final.state["log_seq"] - base_seq != 2 * total:
+        failures.append(f"log_seq {final.state['log_seq'] - base_seq} != {2 * total}")
+    for index, plan in enumerate(plans):
+        kept = [command for command in commands if command in set(plan)]
+        if kept != plan:
+            failures.append(f"worker {index}: {len(kept)}/{len(plan)} commands kept in order")
+    expected = solo_fields(script)
+    for field in GAME_FIELDS:
+        if final.state[field] != expected[field]:
+            failures.append(f"{field}: {final.state[field]!r} != {expected[field]!r}")
+
+    print(f"workers={args.workers} turns={total} elapsed={elapsed:.2f}s")
+    print(f"rebased={sum(stat['rebased'] for stat in stats)} conflicts={sum(stat['conflicts'] for stat in stats)} "
+          f"merged={sum(stat['merged'] for stat in stats)} write_errors={sum(stat['write_errors'] for stat in stats)}")
+    for failure in failures:
+        print(f"FAIL {failure}")
+    print("OK" if not failures else "FAILED")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
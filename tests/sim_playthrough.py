@@ -0,0 +1,311 @@
+"""LLM·Flask 없이 게임 규칙(game_engine.RULES)만으로 플레이스루를 돌리는 헤드리스 시뮬레이터.
+
+프로세스 풀에서 두 가지를 동시에 실행합니다.
+
+1) 전수 탐색: 시작 상태에서 도달 가능한 모든 상태(구역, 인벤토리, 구역 상태들, 출구, 엔딩)를 BFS로 열거하고
+   엔딩에서 거꾸로 도달 가능성을 구해 막힌 상태(어떤 엔딩에도 갈 수 없는 상태), 도달할 수 없는 엔딩·아이템·
+   구역 상태·구역, 엔딩별 최단 턴 수를 보고합니다. 도달 가능한 모든 상태에서 서버가 쓰는 game_engine.apply_rule
+   (이름 목록)이 여기서 쓰는 RULES.apply(비트마스크)와 같은 결과를 내는지도 확인합니다. (다르면 문제로 보고)
+2) 무작위 플레이: 구역의 명령(키워드 + 출구) 중 하나를 고르게 골라 엔딩까지 플레이하고
+   엔딩별 턴 수 분포와 초당 시뮬레이션 턴 수를 보고합니다.
+
+명령 해석은 logic_node와 같습니다. (출구가 열려 있으면 이동이 키워드보다 우선)
+
+    python tests/sim_playthrough.py                          # 무작위 20000판 + 전수 탐색
+    python tests/sim_playthrough.py --games 200000 --workers 8
+    python tests/sim_playthrough.py --strict                 # 문제가 있으면 종료 코드 1 (콘텐츠 변경 게이트)
+"""
+import os
+import sys
+import time
+import random
+import argparse
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from game_engine import RULES, apply_rule
+
+START_SECTOR = 0
+EXAMPLES = 5
+
+
+def sector_commands(rules=RULES):
+    """구역 -> (명령어, 키워드 또는 None, 출구 도착 구역 또는 None) 튜플."""
+    table = {}
+    for sector in rules.sectors:
+        keywords = rules.keywords[sector]
+        names = list(keywords) + [command for command, _ in rules.exits[sector] if command not in keywords]
+        table[sector] = tuple(
+            (name, name if name in keywords else None, rules.find_exit(sector, name)) for name in names
+        )
+    return table
+
+
+COMMANDS = sector_commands()
+START = (START_SECTOR, 0, bytes(len(RULES.sectors)), False, 0)
+
+
+def step(state, command):
+    """상태 튜플 (구역, 인벤토리 비트마스크, 구역 상태 bytes, 출구 개방, 엔딩 id)에 명령 하나를 적용합니다."""
+    sector, inventory, states, unlocked, ending = state
+    _, keyword, target = command
+    if unlocked and target is not None:
+        return (target, inventory, states, False, ending)
+    if keyword is None:
+        return state
+    index = RULES.sector_index[sector]
+    inventory, sector_state, unlocked, ending, _ = RULES.apply(sector, keyword, inventory, states[index], unlocked)
+    if sector_state != states[index]:
+        states = states[:index] + bytes((sector_state,)) + states[index + 1:]
+    return (sector, inventory, states, unlocked, ending)
+
+
+def path_to(parent, state):
+    commands = []
+    while parent[state] is not None:
+        state, command = parent[state]
+        commands.append(command)
+    return commands[::-1]
+
+
+def describe(state):
+    sector, inventory, _, unlocked, _ = state
+    return f"구역 {sector}, 출구 {'열림' if unlocked else '닫힘'}, 인벤토리 {RULES.items_of(inventory)}"
+
+
+def engine_mismatch(state, keyword):
+    """state에서 keyword 규칙을 두 경로로 적용해 결과가 다르면 설명 문자열, 같으면 None."""
+    sector, inventory, states, unlocked, ending = state
+    index = RULES.sector_index[sector]
+    mask, sector_state, unlocked_after, ending_after, message = RULES.apply(sector, keyword, inventory, states[index], unlocked)
+    expected = {
+        "inventory": RULES.items_of(mask),
+        "sector_states": RULES.states_dict(states[:index] + bytes((sector_state,)) + states[index + 1:], ending_after or ending),
+        "unlocked": unlocked_after,
+        "last_action": message,
+    }
+    result = apply_rule(sector, keyword, RULES.items_of(inventory), RULES.states_dict(states, ending), unlocked)
+    actual = {
+        # 인벤토리 순서는 경로마다 다르므로(획득 순서 / 비트 순서) 내용만 비교합니다.
+        "inventory": sorted(result["inventory"], key=RULES.item_bits.get),
+        "sector_states": result["sector_states"],
+        "unlocked": result["unlocked"],
+        "last_action": result["last_action"],
+    }
+    if actual == expected:
+        return None
+    fields = [field for field in expected if actual[field] != expected[field]]
+    return f"{describe(state)} '{keyword}': {', '.join(f'{field} {actual[field]!r} != {expected[field]!r}' for field in fields)}"
+
+
+# --- Exhaustive ---
+def explore(_=None):
+    """도달 가능한 모든 상태를 열거하고 내용 문제를 찾습니다. (프로세스 풀 작업)"""
+    started = time.perf_counter()
+    parent = {START: None}
+    depth = {START: 0}
+    edges = {}
+    transitions = 0
+    queue = deque([START])
+    while queue:
+        state = queue.popleft()
+        if state[4]:
+            continue
+        successors = []
+        for command in COMMANDS[state[0]]:
+            transitions += 1
+            successor = step(state, command)
+            if successor == state:
+                continue
+            successors.append(successor)
+            if successor not in parent:
+                parent[successor] = (state, command[0])
+                depth[successor] = depth[state] + 1
+                queue.append(successor)
+        edges[state] = successors
+
+    # 엔딩에서 거꾸로 BFS: 엔딩에 갈 수 있는 상태
+    reverse = {}
+    for state, successors in edges.items():
+        for successor in successors:
+            reverse.setdefault(successor, []).append(state)
+    alive = {state for state in parent if state[4]}
+    queue = deque(alive)
+    while queue:
+        for previous in reverse.get(queue.popleft(), ()):
+            if previous not in alive:
+                alive.add(previous)
+                queue.append(previous)
+
+    dead = [state for state in parent if state not in alive]
+    # 막힌 상태로 처음 들어서는 전이 (여기서부터 되돌릴 수 없음)
+    entries = [state for state in dead if parent[state] is not None and parent[state][0] in alive]
+    entries.sort(key=depth.get)
+
+    items = 0
+    sector_states = set()
+    for states in {state[2] for state in parent}:
+        sector_states.update((RULES.sectors[i], value) for i, value in enumerate(states) if value)
+    for state in parent:
+        items |= state[1]
+    declared = {
+        (sector, value)
+        for sector in RULES.sectors
+        for table in RULES.keywords[sector].values()
+        for rule in set(table)
+        for value in (rule.set_state, rule.req_state)
+        if value
+    }
+    shortest = {}
+    for state in parent:
+        if state[4] and (state[4] not in shortest or depth[state] < depth[shortest[state[4]]]):
+            shortest[state[4]] = state
+    seconds = time.perf_counter() - started
+
+    pairs = [(state, keyword) for state in parent if not state[4] for _, keyword, _ in COMMANDS[state[0]] if keyword]
+    mismatches = [mismatch for mismatch in (engine_mismatch(state, keyword) for state, keyword in pairs) if mismatch]
+
+    return {
+        "states": len(parent),
+        "transitions": transitions,
+        "seconds": seconds,
+        "dead": len(dead),
+        "dead_entries": [(describe(state), path_to(parent, state)[-3:], depth[state]) for state in entries[:EXAMPLES]],
+        "endings": {RULES.endings[ending]: (depth[state], path_to(parent, state)) for ending, state in shortest.items()},
+        "unreachable_endings": [name for i, name in enumerate(RULES.endings) if i and i not in shortest],
+        "unreachable_items": RULES.items_of(((1 << len(RULES.items)) - 1) & ~items),
+        "unreachable_states": sorted(f"{sector}:{RULES.states[value]}" for sector, value in declared - sector_states),
+        "unreachable_sectors": sorted(set(RULES.sectors) - {state[0] for state in parent}),
+        "engine_pairs": len(pairs),
+        "engine_mismatches": len(mismatches),
+        "mismatch_examples": mismatches[:EXAMPLES],
+    }
+
+
+# --- Random ---
+def play_random(seed, games, max_turns):
+    """고른 확률로 명령을 골라 games판을 플레이합니다. (프로세스 풀 작업)"""
+    rng = random.Random(seed)
+    choice = rng.choice
+    apply = RULES.apply
+    sector_index = RULES.sector_index
+    commands = COMMANDS
+    turns_by_ending = {}
+    stuck = 0
+    total_turns = 0
+    items = 0
+    started = time.perf_counter()
+    for _ in range(games):
+        sector, inventory, states, unlocked, ending = START_SECTOR, 0, bytearray(len(RULES.sectors)), False, 0
+        turn = 0
+        while turn < max_turns and not ending:
+            turn += 1
+            _, keyword, target = choice(commands[sector])
+            if unlocked and target is not None:
+                sector, unlocked = target, False
+            elif keyword is not None:
+                index = sector_index[sector]
+                inventory, states[index], unlocked, ending, _ = apply(sector, keyword, inventory, states[index], unlocked)
+                items |= inventory
+        total_turns += turn
+        if ending:
+            turns_by_ending.setdefault(RULES.endings[ending], Counter())[turn] += 1
+        else:
+            stuck += 1
+    return {
+        "games": games,
+        "turns": total_turns,
+        "seconds": time.perf_counter() - started,
+        "turns_by_ending": turns_by_ending,
+        "stuck": stuck,
+        "items": items,
+    }
+
+
+def percentile(counter, q):
+    target = q * (sum(counter.values()) - 1)
+    seen = 0
+    for value in sorted(counter):
+        seen += counter[value]
+        if seen > target:
+            return value
+    return 0
+
+
+def merge(results):
+    merged = {"games": 0, "turns": 0, "seconds": 0.0, "turns_by_ending": {}, "stuck": 0, "items": 0}
+    for result in results:
+        for field in ("games", "turns", "seconds", "stuck"):
+            merged[field] += result[field]
+        merged["items"] |= result["items"]
+        for ending, counter in result["turns_by_ending"].items():
+            merged["turns_by_ending"].setdefault(ending, Counter()).update(counter)
+    return merged
+
+
+def report(exhaustive, randomized, wall):
+    print(f"[exhaustive] {exhaustive['states']} states, {exhaustive['transitions']} transitions "
+          f"in {exhaustive['seconds']:.2f}s ({exhaustive['transitions'] / exhaustive['seconds']:,.0f} turns/s)")
+    for ending, (turns, path) in sorted(exhaustive["endings"].items()):
+        print(f"  ending {ending:5s}: shortest {turns} turns")
+    print(f"  apply_rule vs RULES.apply: {exhaustive['engine_pairs']} (state, keyword) pairs, {exhaustive['engine_mismatches']} mismatches")
+    problems = []
+    if exhaustive["unreachable_endings"]:
+        problems.append(f"unreachable endings: {exhaustive['unreachable_endings']}")
+    if exhaustive["unreachable_items"]:
+        problems.append(f"unreachable items: {exhaustive['unreachable_items']}")
+    if exhaustive["unreachable_states"]:
+        problems.append(f"unreachable sector states: {exhaustive['unreachable_states']}")
+    if exhaustive["unreachable_sectors"]:
+        problems.append(f"unreachable sectors: {exhaustive['unreachable_sectors']}")
+    if exhaustive["dead"]:
+        problems.append(f"dead-end states (no ending reachable): {exhaustive['dead']}")
+    if exhaustive["engine_mismatches"]:
+        problems.append(f"apply_rule differs from RULES.apply: {exhaustive['engine_mismatches']} (state, keyword) pairs")
+    for problem in problems:
+        print(f"  PROBLEM {problem}")
+    for example in exhaustive["mismatch_examples"]:
+        print(f"    {example}")
+    for where, last_commands, turns in exhaustive["dead_entries"]:
+        print(f"    dead end after {turns} turns, last commands {last_commands}: {where}")
+    for warning in RULES.warnings:
+        print(f"  WARNING {warning}")
+
+    print(f"\n[random] {randomized['games']} games, {randomized['turns']:,} turns "
+          f"({randomized['turns'] / randomized['seconds']:,.0f} turns/s per process, "
+          f"{randomized['turns'] / wall:,.0f} turns/s overall)")
+    print(f"  {'ending':6s} {'games':>8s} {'min':>6s} {'p50':>6s} {'p90':>6s} {'p99':>6s} {'max':>6s}")
+    for ending, counter in sorted(randomized["turns_by_ending"].items()):
+        print(f"  {ending:6s} {sum(counter.values()):8d} {min(counter):6d} {percentile(counter, 0.5):6d} "
+              f"{percentile(counter, 0.9):6d} {percentile(counter, 0.99):6d} {max(counter):6d}")
+    if randomized["stuck"]:
+        print(f"  {randomized['stuck']} games hit --max-turns without an ending")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--games", type=int, default=20000, help="무작위 플레이 판 수")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--max-turns", type=int, default=20000, help="한 판의 최대 턴 수")
+    parser.add_argument("--seed", type=int, default=7734)
+    parser.add_argument("--strict", action="store_true", help="막힌 상태나 도달 불가 항목이 있으면 종료 코드 1")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    batches = max(1, args.workers * 4)
+    sizes = [args.games // batches + (i < args.games % batches) for i in range(batches)]
+    with ProcessPoolExecutor(args.workers) as pool:
+        exhaustive = pool.submit(explore)
+        randoms = [pool.submit(play_random, args.seed + i, size, args.max_turns) for i, size in enumerate(sizes) if size]
+        randomized = merge(future.result() for future in randoms)
+        exhaustive = exhaustive.result()
+    problems = report(exhaustive, randomized, time.perf_counter() - started)
+    if args.strict and problems:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()